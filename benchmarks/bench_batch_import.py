@@ -0,0 +1,90 @@
+"""批量导入基准：逐个串行导入（旧流程）对比进程池并行拆分 + 一次提交
+
+    python benchmarks/bench_batch_import.py [--files 300] [--kb 256] [--jobs 0]
+
+在临时目录中生成 files 个 UTF-8 / GBK 混合的小说文件，分别导入到两个新项目，
+并校验两种方式得到的章节顺序和内容完全一致。
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from novelcore.engine import Project  # noqa: E402
+
+
+def make_file(path, index, size_kb):
+    paragraph = f"　　第{index}本书里，他推开门，屋里的灯还亮着，桌上放着一封没有拆开的信。\n"
+    chapter = paragraph * 40
+    parts = []
+    size = 0
+    i = 0
+    while size < size_kb * 1024:
+        i += 1
+        parts.append(f"第{i}章 标题{i}\n")
+        parts.append(chapter)
+        size += len(chapter) * 3
+    encoding = 'gbk' if index % 2 else 'utf-8'
+    with open(path, 'w', encoding=encoding) as f:
+        f.write("".join(parts))
+
+
+def import_serial(project, file_paths):
+    """旧流程：每个文件单独拆分、写入并更新 config.ini"""
+    for file_path in file_paths:
+        project.add_file(file_path, include_filename=True)
+
+
+def import_batch(project, file_paths, jobs):
+    project.add_files(file_paths, include_filename=True, workers=jobs or None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--kb", type=int, default=256, help="每个文件大约多少 KB")
+    parser.add_argument("--jobs", type=int, default=0, help="并行进程数 (0 为 CPU 核数)")
+    parser.add_argument("--packed", action="store_true", help="项目使用单文件打包格式")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="bench_import_")
+    try:
+        source_dir = os.path.join(work_dir, "src")
+        os.makedirs(source_dir)
+        file_paths = []
+        for i in range(args.files):
+            path = os.path.join(source_dir, f"book{i:04d}.txt")
+            make_file(path, i, args.kb)
+            file_paths.append(path)
+        total_mb = sum(os.path.getsize(p) for p in file_paths) / 1048576
+        print(f"{args.files} 个文件, 共 {total_mb:.1f} MB, CPU {os.cpu_count()} 核")
+
+        projects = {}
+        for label, run in (("串行逐个导入", lambda p: import_serial(p, file_paths)),
+                           ("并行批量导入", lambda p: import_batch(p, file_paths, args.jobs))):
+            folder = os.path.join(work_dir, label)
+            os.makedirs(folder)
+            project = Project(folder, packed=args.packed)
+            start = time.perf_counter()
+            run(project)
+            seconds = time.perf_counter() - start
+            projects[label] = project
+            print(f"{label}: {seconds:.2f}s, {total_mb / seconds:.1f} MB/s, {len(project.chapter_order)} 章")
+
+        serial, batch = projects.values()
+        same = serial.chapter_order == batch.chapter_order and all(
+            serial.chapter_contents.get(name) == batch.chapter_contents.get(name) for name in serial.chapter_order)
+        print("结果一致" if same else "结果不一致!")
+        for project in projects.values():
+            project.chapter_contents.close()
+        return 0 if same else 1
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
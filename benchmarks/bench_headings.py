@@ -0,0 +1,85 @@
+"""章节标题识别微基准：逐行 re.match（旧实现）对比预编译组合正则 finditer
+
+    python benchmarks/bench_headings.py [--mb 8] [--repeat 3]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from novelcore.engine import split_into_chapters  # noqa: E402
+
+
+def legacy_split_into_chapters(content):
+    """旧版 NovelMergerApp.split_into_chapters：每行两次未编译的 re.match"""
+    chapters = []
+    chapter_name = None
+    chapter_content = []
+
+    lines = content.split('\n')
+    for line in lines:
+        stripped_line = line.strip()
+        if re.match(r"^第(\d+|[一二三四五六七八九十百千万]+)章.*", stripped_line) or re.match(r"^正文.*$", stripped_line):
+            if chapter_name:
+                chapters.append((chapter_name, "\n".join(chapter_content)))
+            chapter_name = stripped_line
+            chapter_content = []
+        else:
+            chapter_content.append(line)
+
+    if chapter_name:
+        chapters.append((chapter_name, "\n".join(chapter_content)))
+
+    return chapters
+
+
+def make_novel(size_mb):
+    paragraph = "　　他推开门，屋里的灯还亮着，桌上放着一封没有拆开的信。\n"
+    lines_per_chapter = 80
+    chapter = paragraph * lines_per_chapter
+    parts = []
+    size = 0
+    i = 0
+    while size < size_mb * 1024 * 1024:
+        i += 1
+        parts.append(f"第{i}章 第{i}个标题\n")
+        parts.append(chapter)
+        size += len(chapter.encode('utf-8'))
+    return "".join(parts)
+
+
+def bench(func, content, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chapters = func(content)
+        best = min(best, time.perf_counter() - start)
+    return best, len(chapters)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=8, help="合成小说大小 (MB)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    content = make_novel(args.mb)
+    line_count = content.count('\n') + 1
+    print(f"合成小说: {len(content.encode('utf-8')) / 1048576:.1f} MB, {line_count} 行")
+
+    results = {}
+    for label, func in (("旧实现 (逐行 re.match)", legacy_split_into_chapters),
+                        ("新实现 (组合正则 finditer)", split_into_chapters)):
+        seconds, chapters = bench(func, content, args.repeat)
+        results[label] = seconds
+        print(f"{label}: {seconds:.3f}s, {line_count / seconds:,.0f} 行/秒, {chapters} 章")
+
+    old, new = results.values()
+    print(f"加速比: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
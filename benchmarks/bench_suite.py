@@ -0,0 +1,297 @@
+"""端到端基准：在合成语料上测量各阶段的吞吐量和峰值内存，结果存为可跨版本对比的 JSON
+
+    python benchmarks/bench_suite.py [--preset smoke|standard|full] [--out results.json]
+    python benchmarks/bench_suite.py --compare old.json [--load new.json] [--threshold 0.1]
+
+阶段与界面操作一一对应，全部不依赖 Tk：
+  open_file               转码为 UTF-8 并读取末尾的项目编码
+  split_into_chapters     流式拆分（只拆不写）
+  save_chapter_files      拆分并写入章节文件 / project.db，生成 config.ini
+  load_chapter_contents   重新加载项目并读出全部章节
+  save_file               全量合并保存
+  save_file_incremental   修改中间一章后增量保存
+
+每个语料跑 --repeat 遍取最快的一遍计时，再用 tracemalloc 单独跑一遍记录各阶段的 Python 峰值内存
+（tracemalloc 本身会拖慢速度，所以不和计时放在同一遍）。语料按固定种子生成，
+--corpus-dir 指定目录时生成一次后重复使用。
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from corpus import CorpusSpec, parse_size, write_corpus  # noqa: E402
+from novelcore import profiling  # noqa: E402
+from novelcore.engine import Project, convert_to_utf8, iter_chapters, read_project_code  # noqa: E402
+
+RESULT_FORMAT = 1
+STAGES = ("open_file", "split_into_chapters", "save_chapter_files", "load_chapter_contents",
+          "save_file", "save_file_incremental")
+
+SMOKE = [
+    CorpusSpec("utf8-100-1k", 100, parse_size("1KB")),
+    CorpusSpec("gbk-500-2m", 500, parse_size("2MB"), "gbk", duplicates=0.1, zhengwen=0.1),
+    CorpusSpec("big5-500-2m", 500, parse_size("2MB"), "big5", duplicates=0.1, zhengwen=0.1),
+]
+STANDARD = SMOKE + [
+    CorpusSpec("utf8-10k-50m", 10000, parse_size("50MB"), duplicates=0.05, zhengwen=0.05),
+    CorpusSpec("gbk-5k-50m", 5000, parse_size("50MB"), "gbk", duplicates=0.05, zhengwen=0.05),
+    CorpusSpec("big5-5k-50m", 5000, parse_size("50MB"), "big5", duplicates=0.05, zhengwen=0.05),
+]
+FULL = STANDARD + [
+    CorpusSpec("utf8-50k-500m", 50000, parse_size("500MB"), duplicates=0.05, zhengwen=0.02),
+    CorpusSpec("gbk-20k-200m", 20000, parse_size("200MB"), "gbk", duplicates=0.05, zhengwen=0.02),
+    CorpusSpec("big5-20k-200m", 20000, parse_size("200MB"), "big5", duplicates=0.05, zhengwen=0.02),
+]
+PRESETS = {"smoke": SMOKE, "standard": STANDARD, "full": FULL}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def prepare_corpus(spec, corpus_dir):
+    """生成语料文件；目录中已有同参数的文件时直接使用"""
+    path = os.path.join(corpus_dir, spec.name + ".txt")
+    meta_path = path + ".json"
+    if os.path.exists(path) and os.path.exists(meta_path):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            if json.load(f) == spec.to_dict():
+                return path
+    write_corpus(path, spec)
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(spec.to_dict(), f, ensure_ascii=False)
+    return path
+
+
+def run_pipeline(corpus_path, work_dir, packed, on_stage):
+    """按顺序执行全部阶段；on_stage(阶段名) 返回包住该阶段的上下文管理器"""
+    book = os.path.join(work_dir, "book.txt")
+    shutil.copyfile(corpus_path, book)
+
+    with on_stage("open_file"):
+        convert_to_utf8(book)
+        read_project_code(book)
+
+    with on_stage("split_into_chapters"):
+        chapters = sum(1 for _ in iter_chapters(book))
+
+    folder = os.path.join(work_dir, "project")
+    os.makedirs(folder)
+    project = Project(folder, book, packed=packed)
+    with on_stage("save_chapter_files"):
+        project.import_chapters(iter_chapters(book, matcher=project.matcher))
+    project.chapter_contents.close()
+
+    project = Project(folder, book)
+    with on_stage("load_chapter_contents"):
+        project.load()
+        for name in project.chapter_order:
+            project.chapter_contents.get(name)
+
+    with on_stage("save_file"):
+        project.write_merged(incremental=False)
+
+    middle = project.chapter_order[len(project.chapter_order) // 2]
+    project.write_chapter(middle, project.chapter_contents.get(middle) + "\n（修订）")
+    with on_stage("save_file_incremental"):
+        project.write_merged(incremental=True)
+    project.chapter_contents.close()
+    return chapters
+
+
+def stage_timer(seconds, counters):
+    """计时并用 profiling 收集该阶段的计数器"""
+    @contextlib.contextmanager
+    def on_stage(name):
+        with profiling.profile(name) as report:
+            started = time.perf_counter()
+            yield
+            seconds[name] = time.perf_counter() - started
+        counters[name] = dict(report.counters)
+    return on_stage
+
+
+def stage_memory(peaks):
+    """tracemalloc 记录每个阶段的峰值（相对阶段开始时）"""
+    @contextlib.contextmanager
+    def on_stage(name):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        yield
+        peaks[name] = tracemalloc.get_traced_memory()[1] - base
+    return on_stage
+
+
+def bench_corpus(spec, corpus_path, repeat, packed, memory):
+    size = os.path.getsize(corpus_path)
+    best = {}
+    counters = {}
+    chapters = 0
+    for _ in range(repeat):
+        work_dir = tempfile.mkdtemp(prefix="bench_suite_")
+        try:
+            seconds, run_counters = {}, {}
+            chapters = run_pipeline(corpus_path, work_dir, packed, stage_timer(seconds, run_counters))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        for name, value in seconds.items():
+            if name not in best or value < best[name]:
+                best[name] = value
+                counters[name] = run_counters[name]
+
+    peaks = {}
+    if memory:
+        work_dir = tempfile.mkdtemp(prefix="bench_suite_")
+        tracemalloc.start()
+        try:
+            run_pipeline(corpus_path, work_dir, packed, stage_memory(peaks))
+        finally:
+            tracemalloc.stop()
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    stages = {}
+    for name in STAGES:
+        seconds = best[name]
+        stages[name] = {
+            "seconds": round(seconds, 6),
+            "mb_per_s": round(size / 1048576 / seconds, 3) if seconds else None,
+            "peak_bytes": peaks.get(name),
+            "counters": counters[name],
+        }
+    return {"corpus": spec.name, "spec": spec.to_dict(), "bytes": size, "chapters": chapters, "stages": stages}
+
+
+def max_rss_bytes():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_suite(specs, corpus_dir, repeat, packed, memory):
+    results = {
+        "format": RESULT_FORMAT,
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+        "packed": packed,
+        "corpora": [],
+    }
+    for spec in specs:
+        corpus_path = prepare_corpus(spec, corpus_dir)
+        entry = bench_corpus(spec, corpus_path, repeat, packed, memory)
+        results["corpora"].append(entry)
+        print_corpus(entry)
+    results["max_rss_bytes"] = max_rss_bytes()
+    return results
+
+
+def print_corpus(entry):
+    print(f"{entry['corpus']}: {entry['bytes'] / 1048576:.1f} MB, {entry['chapters']} 章")
+    for name, stage in entry["stages"].items():
+        peak = stage["peak_bytes"]
+        peak_text = f"{peak / 1048576:8.1f} MB" if peak is not None else "       -"
+        print(f"  {name:24s} {stage['seconds']:9.3f}s {stage['mb_per_s'] or 0:9.1f} MB/s  峰值 {peak_text}")
+
+
+def compare(old, new, threshold, min_seconds=0.05):
+    """逐个 (语料, 阶段) 对比耗时和峰值内存，返回变慢或内存增加超过 threshold 的条目数
+
+    前后都短于 min_seconds 的阶段误差太大，不判定是否变慢。
+    """
+    print(f"对比: {old.get('revision') or '?'} ({old['started']}) -> {new.get('revision') or '?'} ({new['started']})")
+    old_corpora = {entry["corpus"]: entry for entry in old["corpora"]}
+    regressions = 0
+    for entry in new["corpora"]:
+        previous = old_corpora.get(entry["corpus"])
+        if previous is None:
+            print(f"{entry['corpus']}: 旧结果中没有此语料")
+            continue
+        if previous["spec"] != entry["spec"]:
+            print(f"{entry['corpus']}: 语料参数不同，跳过")
+            continue
+        print(entry["corpus"])
+        for name, stage in entry["stages"].items():
+            before = previous["stages"].get(name)
+            if not before:
+                continue
+            ratio = stage["seconds"] / before["seconds"] if before["seconds"] else 1.0
+            marks = []
+            if ratio > 1 + threshold and stage["seconds"] >= min_seconds:
+                marks.append("变慢")
+            if stage["peak_bytes"] and before["peak_bytes"] and stage["peak_bytes"] > before["peak_bytes"] * (1 + threshold):
+                marks.append("内存增加")
+            regressions += bool(marks)
+            print(f"  {name:24s} {before['seconds']:9.3f}s -> {stage['seconds']:9.3f}s  x{ratio:5.2f}  {' '.join(marks)}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="smoke")
+    parser.add_argument("--only", action="append", metavar="NAME", help="只跑指定名称的语料（可重复）")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--packed", action="store_true", help="项目使用单文件打包格式")
+    parser.add_argument("--no-memory", action="store_true", help="不跑 tracemalloc 那一遍")
+    parser.add_argument("--corpus-dir", help="语料存放目录（默认临时目录，用完删除）")
+    parser.add_argument("--out", help="结果 JSON 路径")
+    parser.add_argument("--compare", metavar="OLD", help="与之前的结果 JSON 对比")
+    parser.add_argument("--load", metavar="NEW", help="不运行，直接读取这份结果与 --compare 对比")
+    parser.add_argument("--threshold", type=float, default=0.10, help="超过此比例算作回退")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="短于此耗时的阶段不判定变慢")
+    args = parser.parse_args(argv)
+
+    if args.load:
+        with open(args.load, 'r', encoding='utf-8') as f:
+            results = json.load(f)
+    else:
+        specs = [spec for spec in PRESETS[args.preset] if not args.only or spec.name in args.only]
+        corpus_dir = args.corpus_dir or tempfile.mkdtemp(prefix="bench_corpus_")
+        os.makedirs(corpus_dir, exist_ok=True)
+        try:
+            results = run_suite(specs, corpus_dir, max(1, args.repeat), args.packed, not args.no_memory)
+        finally:
+            if not args.corpus_dir:
+                shutil.rmtree(corpus_dir, ignore_errors=True)
+        results["preset"] = args.preset
+        if args.out:
+            with open(args.out, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            print(f"结果已保存: {args.out}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            old = json.load(f)
+        regressions = compare(old, results, args.threshold, args.min_seconds)
+        print(f"回退 {regressions} 项" if regressions else "没有回退")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""合成小说语料：固定随机种子，同样的参数总是生成同样的文件
+
+    python benchmarks/corpus.py out.txt --chapters 3000 --size 20MB --encoding gbk --duplicates 0.1
+
+文件边生成边写出，500 MB 的语料也不会占用同样多的内存。
+"""
+import argparse
+import os
+import random
+import sys
+
+PARAGRAPHS = {
+    # 简体（UTF-8 / GBK）
+    "simplified": [
+        "　　他推开门，屋里的灯还亮着，桌上放着一封没有拆开的信。",
+        "　　雨一直下到半夜，街上只剩下几盏昏黄的路灯和偶尔驶过的车。",
+        "　　她把那本旧书放回书架，转身的时候听见楼下有人在叫她的名字。",
+        "　　山路很长，走到第三天的傍晚，他们终于看见了远处的城墙。",
+    ],
+    # 繁体（Big5 只能编码繁体字）
+    "traditional": [
+        "　　他推開門，屋裡的燈還亮著，桌上放著一封沒有拆開的信。",
+        "　　雨一直下到半夜，街上只剩下幾盞昏黃的路燈和偶爾駛過的車。",
+        "　　她把那本舊書放回書架，轉身的時候聽見樓下有人在叫她的名字。",
+        "　　山路很長，走到第三天的傍晚，他們終於看見了遠處的城牆。",
+    ],
+}
+TITLE_WORDS = ["风雪", "归途", "旧信", "长夜", "山城", "来客", "灯火", "渡口", "残局", "春雷"]
+TRADITIONAL_TITLE_WORDS = ["風雪", "歸途", "舊信", "長夜", "山城", "來客", "燈火", "渡口", "殘局", "春雷"]
+
+
+def parse_size(text):
+    """"500KB" / "20MB" / "1GB" / "4096" -> 字节数"""
+    text = text.strip().upper()
+    for suffix, factor in (("GB", 1 << 30), ("MB", 1 << 20), ("KB", 1 << 10), ("B", 1)):
+        if text.endswith(suffix):
+            return int(float(text[:-len(suffix)]) * factor)
+    return int(text)
+
+
+class CorpusSpec:
+    """语料参数；name 用于结果文件中区分不同语料"""
+
+    def __init__(self, name, chapters, size, encoding="utf-8", duplicates=0.0, zhengwen=0.0, code=True, seed=1):
+        self.name = name
+        self.chapters = chapters
+        self.size = size
+        self.encoding = encoding
+        self.duplicates = duplicates  # 与前面某章同名（去掉"第N章"后）的比例
+        self.zhengwen = zhengwen  # 使用 "正文 标题" 形式标题的比例
+        self.code = code  # 末尾是否附24位项目编码
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def write_corpus(path, spec):
+    """生成语料并返回文件大小（字节）"""
+    rng = random.Random(spec.seed)
+    traditional = spec.encoding.lower().replace("-", "") in ("big5", "big5hkscs", "cp950")
+    paragraphs = PARAGRAPHS["traditional" if traditional else "simplified"]
+    words = TRADITIONAL_TITLE_WORDS if traditional else TITLE_WORDS
+    # 估算每章正文需要多少段，使总大小接近 spec.size
+    bytes_per_char = 2 if spec.encoding.lower() != "utf-8" else 3
+    paragraph_bytes = (len(paragraphs[0]) + 1) * bytes_per_char
+    budget = spec.size // max(1, spec.chapters)
+    per_chapter = budget // paragraph_bytes
+    # 章节比一段还短时（如 100 章 1 KB）正文只取一段的开头几个字
+    short = max(1, budget // bytes_per_char) if not per_chapter else 0
+
+    titles = []
+    with open(path, "w", encoding=spec.encoding, newline="\n") as f:
+        for i in range(1, spec.chapters + 1):
+            if titles and rng.random() < spec.duplicates:
+                title = rng.choice(titles)
+            else:
+                title = f"{rng.choice(words)}{rng.choice(words)}{i}"
+                titles.append(title)
+            if rng.random() < spec.zhengwen:
+                heading = f"正文 {title}"
+            else:
+                heading = f"第{i}章 {title}"
+            if short:
+                body = rng.choice(paragraphs)[:short]
+            else:
+                body = "\n".join(rng.choice(paragraphs) for _ in range(per_chapter))
+            f.write(f"{heading}\n{body}\n")
+        if spec.code:
+            f.write("%024x" % rng.getrandbits(96))
+    return os.path.getsize(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output")
+    parser.add_argument("--chapters", type=int, default=1000)
+    parser.add_argument("--size", default="10MB")
+    parser.add_argument("--encoding", default="utf-8", help="utf-8 / gbk / big5")
+    parser.add_argument("--duplicates", type=float, default=0.0)
+    parser.add_argument("--zhengwen", type=float, default=0.0)
+    parser.add_argument("--no-code", action="store_true", help="末尾不附24位项目编码")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    spec = CorpusSpec(os.path.basename(args.output), args.chapters, parse_size(args.size), args.encoding,
+                      args.duplicates, args.zhengwen, not args.no_code, args.seed)
+    size = write_corpus(args.output, spec)
+    print(f"{args.output}: {size / 1048576:.1f} MB, {spec.chapters} 章, {spec.encoding}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
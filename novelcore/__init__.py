@@ -0,0 +1,55 @@
+"""小说整合工具核心库（无界面），供 txt.py 和命令行共用
+
+公开的名称在第一次访问时才导入所在模块（PEP 562），import novelcore 本身不加载 sqlite3 等模块。
+"""
+import importlib
+
+_EXPORTS = {
+    "engine": [
+        "Project",
+        "clean_chapter_name",
+        "content_code",
+        "convert_to_utf8",
+        "create_project_folder",
+        "generate_24bit_code",
+        "handle_duplicate_names",
+        "iter_chapters",
+        "open_cached",
+        "open_existing",
+        "open_novel",
+        "project_folder_for",
+        "read_project_code",
+        "save_novel",
+        "search_projects",
+        "shared_pool",
+        "split_into_chapters",
+        "strip_project_code",
+    ],
+    "blobs": ["BlobPool", "SharedStore", "share_folder", "unshare_folder"],
+    "dedup": ["FingerprintIndex", "fingerprint"],
+    "encoding": ["EncodingCache", "detect_file_encoding"],
+    "headings": ["BUILTIN_RULES", "HeadingMatcher", "build_matcher"],
+    "names": ["NameRegistry"],
+    "order": ["ChapterIndex"],
+    "packed": ["PackedStore", "open_store", "pack_folder", "unpack_folder"],
+    "registry": ["IniRegistry", "ProjectRegistry", "open_registry"],
+    "search": ["SearchIndex"],
+    "store": ["ChapterStore"],
+    "tasks": ["Cancelled", "TaskRunner"],
+    "logs": ["LogBuffer", "enable_file_log"],
+}
+_MODULE_OF = {name: module for module, names in _EXPORTS.items() for name in names}
+__all__ = sorted(_MODULE_OF)
+
+
+def __getattr__(name):
+    module = _MODULE_OF.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,89 @@
+"""批量导入：多个文件在进程池中并行检测编码、解码和拆分章节
+
+结果按文件的原始顺序依次交回调用方，导入结果与逐个串行导入完全一致；
+章节的写入、取名和 config.ini 仍在调用方进程中完成。
+子进程检测到的编码随结果交回，由调用方进程登记到编码缓存，整批结束后保存一次。
+"""
+import os
+
+from . import encoding as _encoding
+from .headings import HeadingMatcher
+
+_matchers = {}
+
+
+def _matcher_for(rules):
+    # 每个子进程只编译一次同一组规则
+    key = tuple(rules)
+    matcher = _matchers.get(key)
+    if matcher is None:
+        matcher = _matchers[key] = HeadingMatcher(rules)
+    return matcher
+
+
+def split_file(file_path, rules):
+    """子进程中执行：返回 (编码缓存的键, 编码, [(原始标题, 正文)])
+
+    子进程不写编码缓存文件（各自保存会互相覆盖），只查询继承来的缓存，检测结果交回调用方。
+    """
+    from .engine import iter_chapters
+
+    key = _encoding.EncodingCache.key(file_path)
+    encoding = _encoding.default_cache.get(key) or _encoding.detect_file_encoding(file_path, _encoding.EncodingCache())
+    chapters = list(iter_chapters(file_path, encoding or 'utf-8', 'ignore', _matcher_for(rules)))
+    return key, encoding, chapters
+
+
+def default_workers(file_count):
+    return max(1, min(file_count, os.cpu_count() or 1))
+
+
+def iter_split_files(file_paths, matcher, workers=None):
+    """按 file_paths 的顺序产出 (文件路径, 章节列表或异常)；编码缓存在全部产出后保存一次"""
+    cache = _encoding.default_cache
+    with cache.deferred():
+        for file_path, result in _iter_split_files(file_paths, matcher, workers):
+            if not isinstance(result, Exception):
+                key, encoding, result = result
+                if encoding:
+                    cache.put(key, encoding)
+            yield file_path, result
+
+
+def _iter_split_files(file_paths, matcher, workers=None):
+    """按 file_paths 的顺序产出 (文件路径, split_file 的结果或异常)
+
+    workers 为 1 或只有一个文件时在当前进程中串行拆分；否则最多同时处理
+    workers * 2 个文件，已拆分但尚未取走的结果不会无限堆积在内存中。
+    """
+    file_paths = list(file_paths)
+    if workers is None:
+        workers = default_workers(len(file_paths))
+
+    if workers <= 1 or len(file_paths) <= 1:
+        for file_path in file_paths:
+            try:
+                yield file_path, split_file(file_path, matcher.rules)
+            except Exception as e:
+                yield file_path, e
+        return
+
+    from concurrent.futures import ProcessPoolExecutor  # 延迟导入：只有并行导入时才需要
+
+    window = workers * 2
+    pending = []
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        next_index = 0
+        while next_index < len(file_paths) or pending:
+            while next_index < len(file_paths) and len(pending) < window:
+                file_path = file_paths[next_index]
+                pending.append((file_path, executor.submit(split_file, file_path, matcher.rules)))
+                next_index += 1
+            file_path, future = pending.pop(0)
+            try:
+                yield file_path, future.result()
+            except Exception as e:
+                yield file_path, e
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,540 @@
+"""内容寻址的共享章节存储：所有项目共用一个对象目录，相同的章节内容只存一份
+
+    项目文件夹/.blobs/objects/ab/ab12….txt   章节内容，以 SHA-256 命名，写入后不再修改
+    项目文件夹/.blobs/refs.db               (项目 ID, 章节名) -> 哈希 的引用表（SQLite，WAL）
+
+使用共享存储的项目文件夹中只有 config.ini（[ChapterOrder] 之外另有按序号记录哈希的
+[ChapterHashes] 段）、blobs.json 标记和元数据 .json。某个哈希的引用计数就是引用表中的行数，
+章节被删除或改写后不再被引用的对象在事务提交后删除（回滚时保留）；gc() 清理中途崩溃留下的对象和已删除项目的引用。
+
+引用按 blobs.json 中的项目 ID 登记，与项目文件夹的路径无关：整个"项目文件夹"移动到别的
+盘符或网络路径后引用仍然有效。标记中同时记下上次打开时的路径，原位置仍有同一 ID 的项目时
+视为复制，另起 ID 并复制一份引用。引用表丢失时按 config.ini 的 [ChapterHashes] 重建。
+"""
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import uuid
+
+from .profiling import count, stage
+from .store import CONFIG_NAME, ChapterStore, read_project_config, write_chapter_order
+from .viewer import TextSource, open_source
+
+BLOB_DIR_NAME = ".blobs"
+MARKER_NAME = "blobs.json"
+HASH_SECTION = "ChapterHashes"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS refs (
+    project TEXT NOT NULL,
+    name TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (project, name)
+);
+CREATE INDEX IF NOT EXISTS refs_hash ON refs (hash);
+"""
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobPool:
+    """对象目录 + 引用表；同一目录在进程内只打开一次（见 pool_at）"""
+
+    def __init__(self, root):
+        self.root = root
+        self.objects = os.path.join(root, "objects")
+        os.makedirs(self.objects, exist_ok=True)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._pending = set()  # 事务中释放的哈希，提交后再检查引用计数并删除对象
+        self.users = 0  # 经 pool_at 取得、尚未 release_pool 的次数
+        self.conn = sqlite3.connect(os.path.join(root, "refs.db"), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def object_path(self, digest):
+        return _object_path(self.root, digest)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """把多次引用修改合并为一个事务"""
+        with self._lock:
+            if self._depth == 0:
+                self.conn.execute("BEGIN")
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.conn.execute("ROLLBACK")
+                    self._pending.clear()
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self.conn.execute("COMMIT")
+                pending, self._pending = self._pending, set()
+                for digest in pending:
+                    self._collect(digest)
+
+    # 对象
+    def put(self, content):
+        """保存内容并返回哈希；已有相同内容时不再写入"""
+        data = content.encode('utf-8')
+        digest = content_hash(data)
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            count("blobs_reused")
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with stage("chapter_write"), open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        count("blobs_written")
+        count("chars_written", len(content))
+        return digest
+
+    def read(self, digest):
+        with open(self.object_path(digest), 'rb') as f:
+            data = f.read()
+        count("chapter_reads")
+        return data.decode('utf-8')
+
+    def _remove_object(self, digest):
+        try:
+            os.remove(self.object_path(digest))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            return False  # Windows 上正被查看（mmap）的对象删不掉，留给下次 gc
+        return True
+
+    # 引用
+    def refs(self, project):
+        with self._lock:
+            return dict(self.conn.execute("SELECT name, hash FROM refs WHERE project = ?", (project,)))
+
+    def refcount(self, digest):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM refs WHERE hash = ?", (digest,)).fetchone()[0]
+
+    def set_ref(self, project, name, digest):
+        """登记引用，返回该章节原来引用的哈希"""
+        with self.batch():
+            row = self.conn.execute("SELECT hash FROM refs WHERE project = ? AND name = ?", (project, name)).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO refs VALUES (?, ?, ?)", (project, name, digest))
+        return row[0] if row else None
+
+    def drop_ref(self, project, name):
+        with self.batch():
+            row = self.conn.execute("SELECT hash FROM refs WHERE project = ? AND name = ?", (project, name)).fetchone()
+            self.conn.execute("DELETE FROM refs WHERE project = ? AND name = ?", (project, name))
+        return row[0] if row else None
+
+    def rename_project(self, old, new):
+        with self.batch():
+            self.conn.execute("UPDATE refs SET project = ? WHERE project = ?", (new, old))
+
+    def copy_project(self, source, target):
+        with self.batch():
+            self.conn.execute("INSERT OR REPLACE INTO refs SELECT ?, name, hash FROM refs WHERE project = ?",
+                              (target, source))
+
+    def live_projects(self):
+        """与对象目录同级的项目文件夹中登记的项目 ID"""
+        parent = os.path.dirname(self.root)
+        projects = set()
+        for entry in os.scandir(parent):
+            if entry.is_dir() and entry.path != self.root:
+                project_id = read_marker(entry.path).get("id")
+                if project_id:
+                    projects.add(project_id)
+        return projects
+
+    def drop_project(self, project):
+        """删除项目的全部引用，返回不再被引用而删除的对象数"""
+        with self.batch():
+            digests = {row[0] for row in self.conn.execute("SELECT hash FROM refs WHERE project = ?", (project,))}
+            self.conn.execute("DELETE FROM refs WHERE project = ?", (project,))
+            for digest in digests:
+                self.release(digest)
+        return sum(not os.path.exists(self.object_path(digest)) for digest in digests)
+
+    def release(self, digest):
+        """对象可能已不再被引用：事务中先记下，提交后引用计数为 0 才删除"""
+        with self._lock:
+            if self._depth:
+                self._pending.add(digest)
+            else:
+                self._collect(digest)
+
+    def _collect(self, digest):
+        if self.refcount(digest):
+            return False
+        removed = self._remove_object(digest)
+        if removed:
+            count("blobs_removed")
+        return removed
+
+    def gc(self, prune_missing=True):
+        """清理：已删除项目的引用（prune_missing）+ 没有任何引用的对象，返回删除的对象数
+
+        项目是否还在按对象目录同级的 blobs.json 判断；一个项目都找不到时不删除引用，
+        以免对象目录被单独复制到别处后误删全部对象。
+        """
+        live = self.live_projects() if prune_missing else None
+        with self.batch():
+            if live:
+                projects = [row[0] for row in self.conn.execute("SELECT DISTINCT project FROM refs")]
+                for project in projects:
+                    if project not in live:
+                        self.conn.execute("DELETE FROM refs WHERE project = ?", (project,))
+            referenced = {row[0] for row in self.conn.execute("SELECT DISTINCT hash FROM refs")}
+        removed = 0
+        for entry in os.scandir(self.objects):
+            if not entry.is_dir():
+                continue
+            for item in os.scandir(entry.path):
+                digest, ext = os.path.splitext(item.name)
+                if ext == ".tmp" or (ext == ".txt" and digest not in referenced):
+                    removed += self._remove_object(digest) if ext == ".txt" else _remove(item.path)
+        return removed
+
+    def stats(self):
+        """(对象数, 引用数)"""
+        with self._lock:
+            refs = self.conn.execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+            objects = self.conn.execute("SELECT COUNT(DISTINCT hash) FROM refs").fetchone()[0]
+        return objects, refs
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
+
+
+def pool_at(root):
+    root = os.path.abspath(root)
+    with _pools_lock:
+        pool = _pools.get(root)
+        if pool is None:
+            pool = _pools[root] = BlobPool(root)
+        pool.users += 1
+        return pool
+
+
+def release_pool(pool):
+    """与 pool_at 配对；最后一个使用者释放时关闭引用表，下次 pool_at 重新打开"""
+    with _pools_lock:
+        pool.users -= 1
+        if pool.users > 0:
+            return
+        if _pools.get(pool.root) is pool:
+            del _pools[pool.root]
+    pool.close()
+
+
+def pool_for(project_folder):
+    """项目文件夹对应的共享对象目录：与项目文件夹同级的 .blobs"""
+    return pool_at(os.path.join(os.path.dirname(os.path.abspath(project_folder)), BLOB_DIR_NAME))
+
+
+def is_shared(project_folder):
+    return os.path.exists(os.path.join(project_folder, MARKER_NAME))
+
+
+def _object_path(root, digest):
+    return os.path.join(root, "objects", digest[:2], f"{digest}.txt")
+
+
+def read_marker(project_folder):
+    try:
+        with open(os.path.join(project_folder, MARKER_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_marker(project_folder, marker):
+    marker_path = os.path.join(project_folder, MARKER_NAME)
+    with open(marker_path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(marker, f, ensure_ascii=False)
+    os.replace(marker_path + ".tmp", marker_path)
+
+
+def _same_folder(a, b):
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+class SharedStore(ChapterStore):
+    """接口与 ChapterStore 相同；章节内容在共享对象目录中，项目只记录 章节名 -> 哈希
+
+    版本标记就是内容哈希：内容不变版本就不变，合并、检索、指纹都不会因为重写而重算。
+    """
+
+    shared = True
+
+    def __init__(self, project_folder, pool=None, **options):
+        super().__init__(project_folder, **options)
+        os.makedirs(project_folder, exist_ok=True)
+        self._owns_pool = pool is None  # 自己经 pool_for 取得的才在 close() 时释放
+        self.pool = pool or pool_for(project_folder)
+        self.project_key = self._attach()
+        self._refs = self.pool.refs(self.project_key)
+        if not self._refs:
+            self._refs = self._rebuild_refs()
+
+    def _attach(self):
+        """读取（必要时创建或更新）blobs.json，返回项目 ID"""
+        folder = os.path.abspath(self.project_folder)
+        marker = read_marker(self.project_folder)
+        project_id = marker.get("id")
+        if not project_id:
+            project_id = uuid.uuid4().hex
+            # 早期的标记没有 ID，引用以项目文件夹的绝对路径登记
+            self.pool.rename_project(folder, project_id)
+        elif marker.get("folder") not in (None, folder):
+            old = marker["folder"]
+            if read_marker(old).get("id") == project_id and not _same_folder(old, folder):
+                # 原位置的项目还在：这是一份复制，两边各自修改不能互相影响
+                new_id = uuid.uuid4().hex
+                self.pool.copy_project(project_id, new_id)
+                project_id = new_id
+        updated = {"id": project_id, "folder": folder, "pool": os.path.relpath(self.pool.root, folder)}
+        if updated != marker:
+            _write_marker(self.project_folder, updated)
+        return project_id
+
+    def _rebuild_refs(self):
+        """引用表中没有本项目时，按 config.ini 的 [ChapterHashes] 重新登记仍然存在的对象"""
+        chapter_order, extra_sections = read_project_config(self.config_path)
+        hashes = extra_sections.get(HASH_SECTION) or {}
+        refs = {}
+        for i, chapter_name in enumerate(chapter_order):
+            digest = hashes.get(str(i + 1))
+            if digest and os.path.exists(self.pool.object_path(digest)):
+                refs[chapter_name] = digest
+        if refs:
+            with self.pool.batch():
+                for chapter_name, digest in refs.items():
+                    self.pool.set_ref(self.project_key, chapter_name, digest)
+        return refs
+
+    def path(self, chapter_name):
+        digest = self._refs.get(chapter_name)
+        return self.pool.object_path(digest) if digest else None
+
+    @contextlib.contextmanager
+    def batch(self):
+        try:
+            with self.pool.batch():
+                yield self
+        except BaseException:
+            # 事务已回滚（或将随外层回滚），内存中的引用按引用表恢复
+            self._refs = self.pool.refs(self.project_key)
+            raise
+
+    # read_config 沿用 ChapterStore 的实现：[ChapterHashes] 留在其它段中，写回时按当前引用重新生成
+    def write_config(self, chapter_order, extra_sections=None):
+        sections = dict(extra_sections or {})
+        sections[HASH_SECTION] = {str(i + 1): self._refs.get(name, "") for i, name in enumerate(chapter_order)}
+        write_chapter_order(self.config_path, chapter_order, sections)
+
+    def _store(self, chapter_name, digest, content):
+        # 缓存条目为 (哈希, 0, 内容)：对象不可变，哈希相同缓存就有效
+        self._drop(chapter_name)
+        self._cache[chapter_name] = (digest, 0, content)
+        self._chars += len(content)
+        while self._chars > self.max_chars and len(self._cache) > 1:
+            _, (_, _, old) = self._cache.popitem(last=False)
+            self._chars -= len(old)
+
+    def get(self, chapter_name, default=None):
+        digest = self._refs.get(chapter_name)
+        if digest is None:
+            return default
+        with self._lock:
+            entry = self._cache.get(chapter_name)
+            if entry and entry[0] == digest:
+                self._cache.move_to_end(chapter_name)
+                self.hits += 1
+                return entry[2]
+        try:
+            content = self.pool.read(digest)
+        except FileNotFoundError:
+            # 引用已被其它进程改写，按引用表重新读取
+            digest = self.versions().get(chapter_name)
+            if digest is None or not os.path.exists(self.pool.object_path(digest)):
+                return default
+            content = self.pool.read(digest)
+        with self._lock:
+            self.misses += 1
+            self._store(chapter_name, digest, content)
+        return content
+
+    def __contains__(self, chapter_name):
+        return chapter_name in self._refs
+
+    def open_source(self, chapter_name):
+        digest = self._refs.get(chapter_name)
+        if digest is None or not os.path.exists(self.pool.object_path(digest)):
+            return TextSource('')
+        return open_source(self.pool.object_path(digest))
+
+    def write(self, chapter_name, content, cache=True):
+        digest = self.pool.put(content)
+        with self.batch():
+            old = self.pool.set_ref(self.project_key, chapter_name, digest)
+            self._refs[chapter_name] = digest
+            if old and old != digest:
+                self.pool.release(old)
+        count("files_written")
+        with self._lock:
+            if cache:
+                self._store(chapter_name, digest, content)
+            else:
+                self._drop(chapter_name)
+
+    def delete(self, chapter_name):
+        """删除章节：去掉引用，对象没有其它引用时一并删除"""
+        self.pop(chapter_name)
+        with self.batch():
+            old = self.pool.drop_ref(self.project_key, chapter_name)
+            self._refs.pop(chapter_name, None)
+            if old:
+                self.pool.release(old)
+
+    def names(self):
+        return list(self._refs)
+
+    def versions(self):
+        """章节名 -> 内容哈希（重新读取引用表，其它进程的修改也能看到）"""
+        self._refs = self.pool.refs(self.project_key)
+        return dict(self._refs)
+
+    def close(self):
+        super().close()
+        if self._owns_pool:
+            self._owns_pool = False
+            release_pool(self.pool)
+
+
+class SharedReader:
+    """只读访问共享存储的项目：按 config.ini 的 [ChapterHashes] 直接读对象，
+    不登记项目、不打开引用表，也不改写 blobs.json（跨项目搜索用）"""
+
+    shared = True
+
+    def __init__(self, project_folder):
+        self.project_folder = project_folder
+        self.config_path = os.path.join(project_folder, CONFIG_NAME)
+        pool = read_marker(project_folder).get("pool") or os.path.join(os.pardir, BLOB_DIR_NAME)
+        self.root = os.path.normpath(os.path.join(project_folder, pool))
+        chapter_order, extra_sections = self.read_config()
+        hashes = extra_sections.get(HASH_SECTION) or {}
+        self._hashes = {name: hashes[str(i + 1)] for i, name in enumerate(chapter_order) if hashes.get(str(i + 1))}
+
+    def read_config(self):
+        return read_project_config(self.config_path)
+
+    def get(self, chapter_name, default=None):
+        digest = self._hashes.get(chapter_name)
+        if not digest:
+            return default
+        try:
+            with open(_object_path(self.root, digest), 'rb') as f:
+                return f.read().decode('utf-8')
+        except OSError:
+            return default
+
+    def close(self):
+        pass
+
+
+def share_folder(project_folder, log=None):
+    """把文件夹布局或打包格式的项目转换为共享存储，返回章节数
+
+    合并索引和指纹随之迁移（版本标记换成内容哈希，与 pack_folder 相同），清单作废，下次加载时重建。
+    """
+    from .packed import PackedStore, _migrate_meta, _remove_meta_files, is_packed
+
+    if is_shared(project_folder):
+        raise FileExistsError(f"项目已使用共享存储: {project_folder}")
+    packed = is_packed(project_folder)
+    source = PackedStore(project_folder) if packed else ChapterStore(project_folder)
+    target = None
+    try:
+        chapter_order, extra_sections = source.read_config()
+        chapter_names = source.names()
+        old_versions = source.versions()
+        if packed:
+            _remove_meta_files(project_folder)  # 打包前残留的旧文件不能当作当前的元数据
+        target = SharedStore(project_folder)
+        with target.batch():
+            for chapter_name in chapter_names:
+                target.write(chapter_name, source[chapter_name], cache=False)
+        target.write_config(chapter_order, extra_sections)
+        # 文件夹布局的元数据文件就是共享存储的，原地改写其中的版本标记
+        _migrate_meta(source, target, old_versions)
+        _remove_meta_files(project_folder, manifest_only=True)
+    finally:
+        if target is not None:
+            target.close()
+        source.close()
+
+    if packed:
+        os.remove(source.db_path)
+    else:
+        for chapter_name in chapter_names:
+            os.remove(source.path(chapter_name))
+    if log:
+        log(f"项目已改用共享存储: {len(chapter_names)} 个章节 -> {target.pool.root}")
+    return len(chapter_names)
+
+
+def unshare_folder(project_folder, log=None):
+    """把共享存储的项目导出为每章一个 .txt + config.ini，并释放它在共享目录中的引用
+
+    合并索引和指纹中的版本标记换成文件夹布局的 [mtime_ns, 大小]，清单作废。
+    """
+    from .packed import _migrate_meta, _remove_meta_files
+
+    source = SharedStore(project_folder)
+    try:
+        chapter_order, extra_sections = source.read_config()
+        extra_sections.pop(HASH_SECTION, None)
+        chapter_names = source.names()
+        old_versions = source.versions()
+        target = ChapterStore(project_folder)
+        for chapter_name in chapter_names:
+            target.write(chapter_name, source[chapter_name], cache=False)
+        target.write_config(chapter_order, extra_sections)
+        _migrate_meta(source, target, old_versions)
+        _remove_meta_files(project_folder, manifest_only=True)
+        removed = source.pool.drop_project(source.project_key)
+    finally:
+        source.close()
+    os.remove(os.path.join(project_folder, MARKER_NAME))
+    if log:
+        log(f"项目已导出为文件夹布局: {len(chapter_names)} 个章节，释放 {removed} 个共享对象")
+    return len(chapter_names)
@@ -0,0 +1,264 @@
+"""命令行入口：python -m novelcore {split,merge,add,reorder,pack,unpack,share,unshare,gc,search} ..."""
+import argparse
+import os
+import sys
+
+from .blobs import is_shared, share_folder, unshare_folder
+from .encoding import use_cache_dir
+from .engine import open_existing, open_novel, project_folder_for, save_novel, search_projects, shared_pool
+from .headings import BUILTIN_RULES
+from .logs import DEBUG, INFO, WARNING, emit, enable_file_log
+from .packed import is_packed, open_reader, pack_folder, unpack_folder
+from .profiling import profile
+from .registry import DEFAULT_REGISTRY, open_registry
+from .search import snippet
+
+
+_console_level = INFO  # -v 时为 DEBUG
+
+
+def _print_log(message, level=INFO):
+    emit(message, level)
+    if level >= _console_level:
+        print(message, file=sys.stderr if level >= WARNING else sys.stdout)
+
+
+def _quiet_log(message, level=INFO):
+    emit(message, level)
+    if level >= WARNING:
+        print(message, file=sys.stderr)
+
+
+def _load(args):
+    project = open_existing(args.novel, args.base_dir, _print_log if args.verbose else _quiet_log)
+    if project is None or not project.chapter_order:
+        print(f"未找到项目或项目为空: {args.novel}", file=sys.stderr)
+        return None
+    return project
+
+
+def cmd_split(args, registry):
+    rules = [name.strip() for name in args.rules.split(",") if name.strip()] if args.rules else None
+    project = open_novel(args.novel, registry, args.base_dir, _print_log, heading_rules=rules,
+                         packed="shared" if args.shared else True if args.packed else None)
+    if project is None:
+        return 1
+    print(f"共 {len(project.chapter_order)} 章 -> {project.project_folder}")
+    return 0
+
+
+def cmd_merge(args, registry):
+    project = _load(args)
+    if project is None:
+        return 1
+    if args.output:
+        project.loaded_file = args.output
+    save_novel(project, registry, incremental=not args.full)
+    return 0
+
+
+def cmd_add(args, registry):
+    project = _load(args)
+    if project is None:
+        return 1
+    project.log = _print_log
+    project.duplicate_policy = args.duplicates
+    if args.whole:
+        # 指纹和章节顺序在全部文件加入后只写一次
+        for file_path in args.files:
+            project.add_file_as_chapter(file_path, args.include_filename, persist=False)
+        project.save_fingerprints()
+        project.flush_order()
+    else:
+        project.add_files(args.files, args.include_filename, args.jobs)
+    return 0
+
+
+def cmd_reorder(args, registry):
+    project = _load(args)
+    if project is None:
+        return 1
+    count = len(project.chapter_order)
+    if not (1 <= args.src <= count and 1 <= args.dst <= count):
+        print(f"章节序号超出范围 1-{count}", file=sys.stderr)
+        return 1
+    chapter = project.move_chapter(args.src - 1, args.dst - 1)
+    print(f"章节 '{chapter}' 已移动到第{args.dst}章")
+    return 0
+
+
+def cmd_pack(args, registry):
+    project_folder = project_folder_for(args.novel, args.base_dir)
+    if not os.path.isdir(project_folder):
+        print(f"未找到项目文件夹: {project_folder}", file=sys.stderr)
+        return 1
+    if is_packed(project_folder):
+        print(f"项目已是打包格式: {project_folder}", file=sys.stderr)
+        return 1
+    if is_shared(project_folder):
+        print(f"项目使用共享存储，请先 unshare: {project_folder}", file=sys.stderr)
+        return 1
+    pack_folder(project_folder, _print_log)
+    return 0
+
+
+def cmd_unpack(args, registry):
+    project_folder = project_folder_for(args.novel, args.base_dir)
+    if not is_packed(project_folder):
+        print(f"项目不是打包格式: {project_folder}", file=sys.stderr)
+        return 1
+    unpack_folder(project_folder, _print_log)
+    return 0
+
+
+def cmd_share(args, registry):
+    project_folder = project_folder_for(args.novel, args.base_dir)
+    if not os.path.isdir(project_folder):
+        print(f"未找到项目文件夹: {project_folder}", file=sys.stderr)
+        return 1
+    if is_shared(project_folder):
+        print(f"项目已使用共享存储: {project_folder}", file=sys.stderr)
+        return 1
+    share_folder(project_folder, _print_log)
+    return 0
+
+
+def cmd_unshare(args, registry):
+    project_folder = project_folder_for(args.novel, args.base_dir)
+    if not is_shared(project_folder):
+        print(f"项目未使用共享存储: {project_folder}", file=sys.stderr)
+        return 1
+    unshare_folder(project_folder, _print_log)
+    return 0
+
+
+def cmd_gc(args, registry):
+    pool = shared_pool(args.base_dir)
+    removed = pool.gc()
+    objects, refs = pool.stats()
+    print(f"已删除 {removed} 个无引用对象；现有 {objects} 个对象，{refs} 个引用 -> {pool.root}")
+    return 0
+
+
+def _print_hits(query, hits, store, label=""):
+    for chapter_name, positions in hits:
+        content = store.get(chapter_name) or ""
+        print(f"{label}{chapter_name}: {len(positions)} 处  …{snippet(content, positions[0], len(query))}…")
+
+
+def cmd_search(args, registry):
+    query = args.query.strip()
+    if not args.novel:
+        # 所有已登记并建立过索引的项目
+        results = search_projects(registry, query, args.base_dir, args.limit)
+        for novel_path, project_folder, hits in results:
+            store = open_reader(project_folder)
+            try:
+                _print_hits(query, hits, store, f"{os.path.basename(novel_path)} / ")
+            finally:
+                store.close()
+        print(f"{len(results)} 个项目中有匹配")
+        return 0
+
+    project = _load(args)
+    if project is None:
+        return 1
+    project.log = _print_log if args.verbose else _quiet_log
+    project.update_search_index()
+    hits = project.search(query, args.limit)
+    _print_hits(query, hits, project.chapter_contents)
+    print(f"{len(hits)} 章中有匹配")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="novelcore", description="小说整合工具（命令行版）")
+    parser.add_argument("--registry", default=DEFAULT_REGISTRY, help="项目登记文件 (默认 data.db，以 .ini 结尾则直接使用旧格式)")
+    parser.add_argument("--base-dir", default=None, help="项目文件夹所在目录 (默认脚本目录)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出详细日志")
+    parser.add_argument("--log-file", default=None, help="同时写入按大小轮转的 JSON 日志文件")
+    parser.add_argument("--profile", nargs="?", const="-", default=None, metavar="JSON",
+                        help="统计各阶段耗时和计数，摘要输出到 stderr，报告写入 JSON 文件 (省略时输出到 stdout)")
+    parser.add_argument("--cprofile", action="store_true", help="配合 --profile，在报告中附带 cProfile 结果")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("split", help="拆分小说为章节项目（已登记则直接加载）")
+    p.add_argument("novel")
+    p.add_argument("--rules", help=f"章节标题规则，逗号分隔 (可选: {', '.join(BUILTIN_RULES)})")
+    p.add_argument("--packed", action="store_true", help="新项目使用单文件打包格式 (project.db)")
+    p.add_argument("--shared", action="store_true", help="新项目使用所有项目共享的内容寻址存储 (.blobs)")
+    p.set_defaults(func=cmd_split)
+
+    p = sub.add_parser("merge", help="按章节顺序合并回小说文件")
+    p.add_argument("novel")
+    p.add_argument("-o", "--output", help="输出路径 (默认覆盖原文件)")
+    p.add_argument("--full", action="store_true", help="忽略偏移索引，全量重写")
+    p.set_defaults(func=cmd_merge)
+
+    p = sub.add_parser("add", help="向项目追加章节文件")
+    p.add_argument("novel")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--include-filename", action="store_true", help="章节名加上导入文件名前缀")
+    p.add_argument("--whole", action="store_true", help="整个文件作为一个章节，不拆分")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="并行拆分的进程数 (默认 CPU 核数，1 为串行)")
+    p.add_argument("--duplicates", choices=("flag", "skip", "off"), default="flag",
+                   help="与已有章节重复或近似重复时: flag 提示后照常导入 (默认), skip 跳过, off 不检测")
+    p.set_defaults(func=cmd_add)
+
+    p = sub.add_parser("reorder", help="移动章节（序号从1开始）")
+    p.add_argument("novel")
+    p.add_argument("src", type=int)
+    p.add_argument("dst", type=int)
+    p.set_defaults(func=cmd_reorder)
+
+    p = sub.add_parser("pack", help="把项目转换为单文件打包格式 (project.db)")
+    p.add_argument("novel")
+    p.set_defaults(func=cmd_pack)
+
+    p = sub.add_parser("unpack", help="把打包的项目导出为每章一个 .txt + config.ini")
+    p.add_argument("novel")
+    p.set_defaults(func=cmd_unpack)
+
+    p = sub.add_parser("share", help="把项目转换为共享的内容寻址存储 (.blobs)")
+    p.add_argument("novel")
+    p.set_defaults(func=cmd_share)
+
+    p = sub.add_parser("unshare", help="把共享存储的项目导出为每章一个 .txt + config.ini")
+    p.add_argument("novel")
+    p.set_defaults(func=cmd_unshare)
+
+    p = sub.add_parser("gc", help="清理共享存储中没有引用的对象")
+    p.set_defaults(func=cmd_gc)
+
+    p = sub.add_parser("search", help="全文搜索（先增量更新项目的索引）")
+    p.add_argument("query")
+    p.add_argument("novel", nargs="?", help="省略时在所有已登记并建立过索引的项目中搜索")
+    p.add_argument("--limit", type=int, default=None, help="最多返回多少章")
+    p.set_defaults(func=cmd_search)
+
+    return parser
+
+
+def main(argv=None):
+    global _console_level
+    args = build_parser().parse_args(argv)
+    _console_level = DEBUG if args.verbose else INFO
+    if args.log_file:
+        enable_file_log(args.log_file)
+    registry = open_registry(args.registry)
+    use_cache_dir(os.path.dirname(os.path.abspath(args.registry)))
+    if not args.profile:
+        return args.func(args, registry)
+
+    with profile(args.command, cprofile=args.cprofile) as report:
+        result = args.func(args, registry)
+    print(report.summary(), file=sys.stderr)
+    if args.profile == "-":
+        print(report.to_json())
+    else:
+        report.save(args.profile)
+    return result
+
+
+if __name__ == "__main__":
+    sys.exit(main())
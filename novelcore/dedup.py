@@ -0,0 +1,162 @@
+"""导入时的重复章节检测：规范化文本的精确哈希 + 按句子计算的 MinHash
+
+规范化去掉空白和标点、统一全角半角和大小写，所以只是换行、缩进、标点不同的章节精确哈希相同。
+近似重复看两章句子集合的 Jaccard 相似度，用 MinHash 签名估计：夹带几行广告或改动少数句子，
+相同的句子仍占绝大多数，相似度仍然很高。
+签名分成 BANDS 段放入哈希表（LSH），只和至少有一段完全相同的章节比较，
+每章的查找与已有章节数基本无关，不做两两比较。
+"""
+import base64
+import hashlib
+import random
+import re
+import sys
+import unicodedata
+from array import array
+
+PERMUTATIONS = 32  # MinHash 签名长度
+BANDS = 8  # 相似度 0.8 的两章约 99% 会落入同一段；0.5 以下很少成为候选
+ROWS = PERMUTATIONS // BANDS
+THRESHOLD = 0.8  # 估计的相似度不低于此值算作近似重复
+MIN_SENTENCE = 4  # 短于此长度的句子（"嗯。" 之类）不作为特征
+
+INDEX_KEY = "fingerprints"  # 项目元数据中保存指纹的键
+
+_SENTENCE_END = re.compile(r'[\n。！？!?；;…]+|\.{2,}')
+_NOISE = re.compile(r'[\W_]+')
+_MASK = (1 << 64) - 1
+_rng = random.Random(20240601)  # 固定种子：保存的签名在不同进程、不同版本间可比
+# multiply-add-shift 哈希族：(a * h + b) mod 2^64 取高 32 位，a 为奇数
+_PERMS = [(_rng.getrandbits(64) | 1, _rng.getrandbits(64)) for _ in range(PERMUTATIONS)]
+
+
+def normalize(text):
+    """NFKC（全角转半角）+ 小写 + 去掉空白和标点"""
+    return _NOISE.sub('', unicodedata.normalize('NFKC', text).lower())
+
+
+def sentences(text):
+    """规范化后的句子（全部拼起来即 normalize(text)）"""
+    return [_NOISE.sub('', s) for s in _SENTENCE_END.split(unicodedata.normalize('NFKC', text).lower())]
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def minhash(parts):
+    """句子集合的 MinHash 签名（PERMUTATIONS 个 32 位整数）；没有可用的句子时返回空元组"""
+    hashes = {_hash64(s) for s in parts if len(s) >= MIN_SENTENCE}
+    if not hashes:
+        return ()
+    return tuple(min([(a * h + b) & _MASK for h in hashes]) >> 32 for a, b in _PERMS)
+
+
+def fingerprint(text):
+    """(规范化文本的哈希, MinHash 签名)；没有文字的章节哈希为空，不参与比较"""
+    parts = sentences(text)
+    normalized = ''.join(parts)
+    exact = hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest() if normalized else ""
+    return exact, minhash(parts)
+
+
+def similarity(a, b):
+    """两个签名估计的 Jaccard 相似度"""
+    return sum(x == y for x, y in zip(a, b)) / PERMUTATIONS
+
+
+def _encode(signature):
+    data = array('I', signature)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return base64.b64encode(data.tobytes()).decode('ascii')
+
+
+def _decode(text):
+    data = array('I')
+    data.frombytes(base64.b64decode(text))
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return tuple(data)
+
+
+class FingerprintIndex:
+    """章节名 -> (版本标记, 精确哈希, 签名)，附带按精确哈希和签名分段的查找表"""
+
+    def __init__(self):
+        self.entries = {}
+        self._exact = {}  # 精确哈希 -> 章节名集合
+        self._bands = [{} for _ in range(BANDS)]  # 第 i 段签名 -> 章节名集合
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls()
+        for name, (version, exact, signature) in (data or {}).items():
+            index.add(name, (exact, _decode(signature)), version)
+        return index
+
+    def to_dict(self):
+        return {name: [version, exact, _encode(signature)]
+                for name, (version, exact, signature) in self.entries.items()}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    @staticmethod
+    def _band_keys(signature):
+        return [signature[i * ROWS:(i + 1) * ROWS] for i in range(BANDS)] if signature else []
+
+    def add(self, name, fp, version=None):
+        self.remove(name)
+        exact, signature = fp
+        self.entries[name] = (version, exact, signature)
+        if exact:
+            self._exact.setdefault(exact, set()).add(name)
+        for band, key in zip(self._bands, self._band_keys(signature)):
+            band.setdefault(key, set()).add(name)
+
+    def remove(self, name):
+        entry = self.entries.pop(name, None)
+        if entry is None:
+            return
+        _, exact, signature = entry
+        if exact:
+            self._exact[exact].discard(name)
+            if not self._exact[exact]:
+                del self._exact[exact]
+        for band, key in zip(self._bands, self._band_keys(signature)):
+            band[key].discard(name)
+            if not band[key]:
+                del band[key]
+
+    def set_version(self, name, version):
+        _, exact, signature = self.entries[name]
+        self.entries[name] = (version, exact, signature)
+
+    def find(self, fp, threshold=THRESHOLD):
+        """返回 (已有章节名, 相似度)，完全重复时相似度为 1.0；没有重复时返回 None"""
+        exact, signature = fp
+        same = self._exact.get(exact) if exact else None
+        if same:
+            return min(same), 1.0
+        best = None
+        seen = set()
+        for band, key in zip(self._bands, self._band_keys(signature)):
+            for name in band.get(key, ()):
+                if name in seen:
+                    continue
+                seen.add(name)
+                score = similarity(signature, self.entries[name][2])
+                if score >= threshold and (best is None or (-score, name) < (-best[1], best[0])):
+                    best = (name, score)
+        return best
+
+    def stale(self, versions):
+        """返回 (版本变化或缺少指纹的章节名, 已不存在的章节名)"""
+        changed = [name for name, version in versions.items()
+                   if name not in self.entries or self.entries[name][0] != version]
+        removed = [name for name in self.entries if name not in versions]
+        return changed, removed
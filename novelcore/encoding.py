@@ -0,0 +1,211 @@
+"""快速编码检测：BOM / 严格 UTF-8 优先，其余只对有限样本运行 chardet，结果按 (路径, 大小, 修改时间) 缓存
+
+默认缓存只在内存中；打开登记表后调用 use_cache_dir(登记表所在目录)，
+缓存即保存为其旁边的 encodings.json，下次启动仍然有效。文件大小或修改时间变化后对应条目自然失效。
+批量导入时在 deferred() 范围内只改内存、结束时保存一次；保存时先合并文件中其它进程写入的条目。
+"""
+import codecs
+import contextlib
+import json
+import os
+import threading
+
+from .profiling import count, stage
+
+BLOCK_SIZE = 64 * 1024
+SAMPLE_LIMIT = 1024 * 1024  # chardet 最多只看这么多字节
+CACHE_LIMIT = 4096
+CACHE_NAME = "encodings.json"
+
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+# chardet 常把 GBK 文本报成 GB2312，用超集解码避免丢字
+WIDER = {'gb2312': 'gb18030', 'gbk': 'gb18030', 'ascii': 'utf-8'}
+
+
+def bom_encoding(head):
+    for bom, name in BOMS:
+        if head.startswith(bom):
+            return name
+    return None
+
+
+def is_utf8_file(f):
+    """从头到尾增量校验严格 UTF-8，遇到第一个非法字节立即返回 False"""
+    decoder = codecs.getincrementaldecoder('utf-8')('strict')
+    try:
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                decoder.decode(b'', final=True)
+                return True
+            decoder.decode(block)
+    except UnicodeDecodeError:
+        return False
+
+
+def sample_encoding(f, limit=SAMPLE_LIMIT):
+    """用 UniversalDetector 增量检测，置信度足够（detector.done）即停止"""
+    from chardet.universaldetector import UniversalDetector  # 延迟导入
+
+    detector = UniversalDetector()
+    read = 0
+    while read < limit and not detector.done:
+        block = f.read(min(BLOCK_SIZE, limit - read))
+        if not block:
+            break
+        read += len(block)
+        detector.feed(block)
+    detector.close()
+    encoding = detector.result.get('encoding')
+    if not encoding:
+        return None
+    return WIDER.get(encoding.lower(), encoding.lower())
+
+
+class EncodingCache:
+    """(绝对路径, 大小, mtime_ns) -> 编码；可选持久化到 JSON 文件"""
+
+    def __init__(self, path=None, limit=CACHE_LIMIT):
+        self.path = path
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._deferred = 0  # deferred() 嵌套层数
+        self._dirty = False
+        self._entries = self._read(path) if path else {}
+
+    @staticmethod
+    def _read(path):
+        entries = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for key, encoding in json.load(f):
+                    entries[tuple(key)] = encoding
+        except (OSError, ValueError, TypeError):
+            return {}
+        return entries
+
+    @staticmethod
+    def key(file_path, st=None):
+        st = st or os.stat(file_path)
+        return (os.path.abspath(file_path), st.st_size, st.st_mtime_ns)
+
+    def get(self, key):
+        with self._lock:
+            return self._entries.get(key)
+
+    def _put(self, entries, key, encoding):
+        # 同一路径只保留最新的一条
+        for old in [k for k in entries if k[0] == key[0]]:
+            del entries[old]
+        entries[key] = encoding
+        while len(entries) > self.limit:
+            del entries[next(iter(entries))]
+
+    def put(self, key, encoding):
+        with self._lock:
+            if self._entries.get(key) == encoding:
+                return
+            self._put(self._entries, key, encoding)
+            self._dirty = True
+            if self._deferred:
+                return
+        self.save()
+
+    @contextlib.contextmanager
+    def deferred(self):
+        """范围内的 put 只改内存，结束时保存一次"""
+        with self._lock:
+            self._deferred += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._deferred -= 1
+                done = self._deferred == 0
+            if done:
+                self.save()
+
+    def save(self):
+        """有新条目时写入文件；文件中其它进程写入的条目一并保留，同一路径以本进程的为准"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = self._read(self.path)
+            for key, encoding in self._entries.items():
+                self._put(entries, key, encoding)
+            self._entries = entries
+            self._dirty = False
+            data = [[list(key), encoding] for key, encoding in entries.items()]
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+
+default_cache = EncodingCache()
+
+
+def use_cache_dir(directory):
+    """把默认缓存换成 directory 下的持久化文件（一般与登记表放在一起），返回新的缓存"""
+    global default_cache
+    path = os.path.join(os.path.abspath(directory), CACHE_NAME)
+    if default_cache.path != path:
+        default_cache = EncodingCache(path)
+    return default_cache
+
+
+def detect_file_encoding(file_path, cache=None):
+    """返回文件编码名；无法判断时返回 None"""
+    cache = cache or default_cache
+    key = EncodingCache.key(file_path)
+    encoding = cache.get(key)
+    if encoding:
+        count("encoding_cache_hits")
+        return encoding
+
+    with stage("detect"), open(file_path, 'rb') as f:
+        encoding = bom_encoding(f.read(4))
+        if not encoding:
+            f.seek(0)
+            if is_utf8_file(f):
+                encoding = 'utf-8'
+            else:
+                f.seek(0)
+                encoding = sample_encoding(f)
+        count("bytes_scanned", f.tell())
+
+    if encoding:
+        cache.put(key, encoding)
+    return encoding
+
+
+def transcode_file(src_path, dst_path, encoding, errors='ignore', block_size=BLOCK_SIZE * 16):
+    """分块增量解码并以 UTF-8 写出，内存占用与文件大小无关；返回写出的字符数"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    written = 0
+    with stage("transcode"), open(src_path, 'rb') as src, open(dst_path, 'w', encoding='utf-8', newline='') as dst:
+        while True:
+            block = src.read(block_size)
+            text = decoder.decode(block, final=not block)
+            if text:
+                written += dst.write(text)
+            if not block:
+                break
+        dst.flush()
+        os.fsync(dst.fileno())
+        count("bytes_read", src.tell())
+        count("fsyncs")
+    return written
+
+
+def remember_encoding(file_path, encoding, cache=None):
+    """文件内容已知（例如刚转码写出）时直接登记，下次打开无需检测"""
+    (cache or default_cache).put(EncodingCache.key(file_path), encoding)
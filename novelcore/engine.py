@@ -0,0 +1,847 @@
+"""小说拆分/合并核心逻辑（不依赖 tkinter / ctypes，可用于批处理）"""
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from datetime import datetime
+
+from .batch import iter_split_files
+from .encoding import detect_file_encoding as _detect_file_encoding, remember_encoding, transcode_file
+from .headings import DEFAULT_MATCHER, SECTION as HEADING_SECTION, rules_from_section
+from .logs import DEBUG, ERROR, INFO, WARNING, emit
+from .manifest import MANIFEST_KEY, build_manifest, is_valid as manifest_is_valid, merge_entries
+from .merge import INDEX_KEY as MERGE_INDEX_KEY, MergeIndex, write_merged
+from .names import NameRegistry
+from .order import ChapterIndex
+from .profiling import count, stage, timed
+
+# 存储、检索、指纹等模块（sqlite3 等）在第一次用到时才导入，界面启动时不加载
+
+# 仓库根目录（txt.py 所在目录），项目文件夹统一放在这里
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECTS_DIR_NAME = "项目文件夹"
+
+CODE_PATTERN = re.compile(r'^[0-9a-fA-F]{24}$')
+COMMIT_CHAPTERS = 100  # 追加章节时每写这么多章提交一次，打包格式不会长时间占着存储的锁
+
+
+def _default_log(message, level=INFO):
+    # 没有指定回调时只写入 logging（见 logs.enable_file_log）
+    emit(message, level)
+
+
+def _noop_progress(done, total=None):
+    pass
+
+
+# 项目编码（文件末尾的24位十六进制）
+def generate_24bit_code():
+    return uuid.uuid4().hex[:24]
+
+
+def content_code(project_name, chapter_order, versions):
+    """由项目名、章节顺序和各章版本标记算出的24位编码
+
+    内容不变编码就不变，保存时不必重读章节即可判断合并文件是否需要重写。
+    共享存储中版本标记就是内容哈希，编码只取决于内容本身。
+    """
+    h = hashlib.blake2b(project_name.encode('utf-8'), digest_size=12)
+    for chapter_name in chapter_order:
+        h.update(b'\0' + chapter_name.encode('utf-8') + b'\0' + json.dumps(versions.get(chapter_name)).encode('utf-8'))
+    return h.hexdigest()
+
+
+def read_project_code(file_path):
+    try:
+        with open(file_path, 'rb') as f:
+            f.seek(-24, 2)
+            code = f.read(24).decode('utf-8')
+            if CODE_PATTERN.match(code):
+                return code
+            return None
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def strip_project_code(content):
+    """去除文本末尾可能存在的24位编码"""
+    if len(content) >= 24 and CODE_PATTERN.match(content[-24:]):
+        return content[:-24]
+    return content
+
+
+# 章节拆分与命名
+READ_CHUNK_CHARS = 1 << 20  # 流式读取时每块的字符数
+
+
+def iter_split_chunks(chunks, matcher=DEFAULT_MATCHER, strip_code=False):
+    """按章节标题切分文本块序列，逐章产出 (标题, 内容)
+
+    每块只用组合正则 finditer 扫描一次；当前章节的正文按段收集在列表里，章末才拼接一次，
+    未结束的行也分段保存，所以总耗时与文本长度成线性。
+    结果与 content.split('\\n') 后逐行判断标题完全一致。
+    """
+    title = None
+    parts = []  # 当前章节已扫描的正文片段；每段完整行之后单独追加一个 '\n'
+    tail = []   # 尚未遇到换行符的最后一行
+
+    def cut(text, last):
+        """扫描一段完整的行 text，产出已完整的章节；last 表示 text 是全文最后一段"""
+        nonlocal title, parts
+        body = 0
+        for m in matcher.finditer(text):
+            if title is not None:
+                if m.start() > body:
+                    parts.append(text[body:m.start() - 1])
+                elif parts:
+                    parts.pop()  # 标题在段首：去掉上一段末尾的换行
+                yield title, ''.join(parts)
+                parts = []
+            title = m.group().strip()
+            body = m.end() + 1
+        if title is None:
+            return  # 第一个标题之前的内容直接丢弃
+        if last:
+            parts.append(text[body:])
+        elif body <= len(text):  # body 越界说明本段以标题行结束，这一换行属于标题
+            parts.append(text[body:])
+            parts.append('\n')
+
+    for chunk in chunks:
+        limit = chunk.rfind('\n')
+        if limit < 0:
+            tail.append(chunk)
+            continue
+        tail.append(chunk[:limit])
+        yield from cut(''.join(tail), False)
+        tail = [chunk[limit + 1:]]
+
+    # 最后一行（没有换行符）：末尾可能是24位项目编码
+    text = ''.join(tail)
+    if strip_code:
+        text = strip_project_code(text)
+    yield from cut(text, True)
+    if title is not None:
+        yield title, ''.join(parts)
+
+
+def split_into_chapters(content, matcher=DEFAULT_MATCHER):
+    return list(iter_split_chunks((content,), matcher))
+
+
+def iter_chapters(file_path, encoding='utf-8', errors='strict', matcher=DEFAULT_MATCHER):
+    """流式拆分章节：分块读取文件，每遇到新标题就产出上一章，并去掉末尾的项目编码"""
+    count("bytes_read", os.path.getsize(file_path))
+    with open(file_path, 'r', encoding=encoding, errors=errors) as f:
+        # 只计读取和拆分的时间，不含调用方处理每章的时间
+        yield from timed(iter_split_chunks(iter(lambda: f.read(READ_CHUNK_CHARS), ''), matcher, strip_code=True),
+                         "read_split")
+
+
+def clean_chapter_name(name, matcher=DEFAULT_MATCHER):
+    return matcher.clean(name)
+
+
+def handle_duplicate_names(base_name, existing_names):
+    """单次查询用（O(n)）；连续取名请用 names.NameRegistry"""
+    if base_name not in existing_names:
+        return base_name
+
+    count = 1
+    pattern = re.compile(f"^{re.escape(base_name)}-(\\d+)$")
+    for name in existing_names:
+        match = pattern.match(name)
+        if match:
+            num = int(match.group(1))
+            if num >= count:
+                count = num + 1
+
+    return f"{base_name}-{count}"
+
+
+# 编码处理（检测见 encoding.py）
+def detect_file_encoding(file_path):
+    return _detect_file_encoding(file_path) or 'utf-8'
+
+
+def read_text_auto(file_path):
+    """读取任意编码的文本文件并返回字符串"""
+    with open(file_path, 'r', encoding=detect_file_encoding(file_path), errors='ignore') as f:
+        return f.read()
+
+
+def record_file_times(file_path, log=_default_log):
+    try:
+        creation_time = os.path.getctime(file_path)
+        modification_time = os.path.getmtime(file_path)
+        return (
+            datetime.fromtimestamp(creation_time).strftime('%Y-%m-%d %H:%M:%S'),
+            datetime.fromtimestamp(modification_time).strftime('%Y-%m-%d %H:%M:%S')
+        )
+    except Exception as e:
+        log(f"无法获取文件时间: {e}", WARNING)
+        return None, None
+
+
+def restore_file_times(file_path, creation_time, modification_time):
+    try:
+        if creation_time and modification_time:
+            creation_timestamp = datetime.strptime(creation_time, '%Y-%m-%d %H:%M:%S').timestamp()
+            modification_timestamp = datetime.strptime(modification_time, '%Y-%m-%d %H:%M:%S').timestamp()
+            os.utime(file_path, (creation_timestamp, modification_timestamp))
+    except Exception:
+        pass
+
+
+def convert_to_utf8(file_path, log=_default_log):
+    """非 UTF-8 文件流式转码为 UTF-8：写入同目录临时文件后 os.replace 原子替换"""
+    encoding = _detect_file_encoding(file_path)
+
+    if not encoding or encoding.lower() != 'utf-8':
+        filecreation_time, filemodification_time = record_file_times(file_path, log)
+        encodings = [encoding, 'utf-8', 'gbk', 'gb2312', 'big5']
+        temp_file = file_path + ".tmp"
+        converted = False
+
+        for enc in encodings:
+            try:
+                if enc:
+                    transcode_file(file_path, temp_file, enc)
+                    log(f"成功使用编码 {enc} 读取文件")
+                    converted = True
+                    break
+            except (UnicodeDecodeError, LookupError):
+                log(f"使用编码 {enc} 读取文件失败", WARNING)
+
+        if not converted:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            log("所有编码尝试均失败，无法读取文件", ERROR)
+            return False
+
+        os.replace(temp_file, file_path)
+
+        restore_file_times(file_path, filecreation_time, filemodification_time)
+        remember_encoding(file_path, 'utf-8')
+        return True
+    return True
+
+
+# 项目文件夹
+def project_folder_for(file_path, base_dir=None):
+    """返回小说对应的项目文件夹路径（不创建）"""
+    main_project_dir = os.path.join(base_dir or BASE_DIR, PROJECTS_DIR_NAME)
+    file_name = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(main_project_dir, file_name)
+
+
+def shared_pool(base_dir=None):
+    """所有项目共用的内容寻址对象目录（项目文件夹/.blobs）"""
+    from .blobs import BLOB_DIR_NAME, pool_at
+
+    return pool_at(os.path.join(base_dir or BASE_DIR, PROJECTS_DIR_NAME, BLOB_DIR_NAME))
+
+
+def create_project_folder(file_path, base_dir=None, log=_default_log):
+    """创建项目文件夹，统一放在脚本目录下的"项目文件夹"中"""
+    project_folder = project_folder_for(file_path, base_dir)
+    main_project_dir = os.path.dirname(project_folder)
+
+    # 确保主项目文件夹存在
+    if not os.path.exists(main_project_dir):
+        os.makedirs(main_project_dir)
+        log(f"创建主项目文件夹: {main_project_dir}")
+
+    # 创建单个项目文件夹
+    if not os.path.exists(project_folder):
+        os.makedirs(project_folder)
+        log(f"创建项目文件夹: {project_folder}")
+    else:
+        log(f"项目文件夹已存在: {project_folder}")
+
+    return project_folder
+
+
+class Project:
+    """一个小说项目：章节内容 + 章节顺序，存放在项目文件夹（每章一个 .txt、打包的 project.db 或共享存储）"""
+
+    def __init__(self, project_folder, loaded_file=None, log=None, packed=None):
+        from .packed import open_store
+
+        self.project_folder = project_folder
+        self.loaded_file = loaded_file
+        self.log = log or _default_log
+        self.progress = _noop_progress  # progress(已完成, 总数或 None)，可抛异常中止长操作
+        self.chapter_order = []  # 章节顺序（ChapterIndex，同时重建 self.names）
+        self.chapter_contents = open_store(project_folder, packed)  # 章节存储（按需读取）
+        self.config_extra = {}  # config.ini 中 ChapterOrder 以外的段
+        self.matcher = DEFAULT_MATCHER  # 章节标题规则
+        self.dirty = set()  # 上次合并保存后内容被改过的章节
+        self._merge_index = None  # 合并文件中各章的偏移（按需从项目元数据读取）
+        self.last_merge_stats = None
+        self._search_index = None  # 全文索引（search.db，首次使用时打开）
+        self.search_stale = True  # 章节内容改过后置位，下次搜索前再增量更新索引
+        # 导入时的重复章节检测："flag" 记录并照常导入，"skip" 跳过，"off" 不检测
+        self.duplicate_policy = "flag"
+        self.duplicates = []  # 本次运行中发现的重复 [(新章节名, 已有章节名, 相似度, 是否跳过)]
+        self._fingerprints = None  # 章节指纹（按需从项目元数据读取并补齐）
+        # 章节顺序的写回：autoflush 为 False 时只记录修改，由调用方择机 flush_order()
+        self.autoflush = True
+        self.order_dirty = False
+        self.order_changed_at = 0.0  # 最近一次修改的 time.monotonic()
+        self.order_mutations = 0
+        self.order_flushes = 0
+
+    @property
+    def chapter_order(self):
+        return self._chapter_order
+
+    @chapter_order.setter
+    def chapter_order(self, names):
+        if not isinstance(names, ChapterIndex):
+            names = ChapterIndex(names)
+        self._chapter_order = names
+        self.names = NameRegistry(names)  # 已占用章节名，取名 O(1)
+
+    @property
+    def packed(self):
+        return self.chapter_contents.packed
+
+    @property
+    def shared(self):
+        return self.chapter_contents.shared
+
+    @property
+    def config_path(self):
+        return self.chapter_contents.config_path
+
+    def chapter_path(self, chapter_name):
+        return self.chapter_contents.path(chapter_name)
+
+    def write_chapter(self, chapter_name, content):
+        self.chapter_contents.write(chapter_name, content)
+        self.dirty.add(chapter_name)
+        self.search_stale = True
+        if self.shared:
+            self.order_changed(0, persist=False)  # config.ini 的 [ChapterHashes] 随章节顺序一起写回
+        if self._fingerprints is not None:
+            self._fingerprints.remove(chapter_name)  # 内容变了，下次使用时重新计算
+
+    def save_chapter_files(self, chapters):
+        """逐章写入章节文件；chapters 可以是生成器，写完一章即释放一章"""
+        chapter_files = []
+        names = NameRegistry()
+        with self.chapter_contents.batch():
+            for raw_name, chapter_content in chapters:
+                cleaned_name = names.claim(self.matcher.clean(raw_name))
+                self.chapter_contents.write(cleaned_name, chapter_content, cache=False)
+                self.search_stale = True
+
+                chapter_files.append((cleaned_name, self.chapter_path(cleaned_name)))
+                self.log(f"保存章节: {cleaned_name}", DEBUG)
+                count("chapters")
+                self.progress(len(chapter_files))
+
+        return chapter_files
+
+    def create_config_ini(self, chapter_names):
+        self.chapter_contents.write_config(chapter_names, self.config_extra)
+        self.order_flushes += 1
+        self.log(f"创建配置文件: {self.config_path}")
+        return self.config_path
+
+    def load_config_ini(self):
+        """读取章节顺序，同时加载 [HeadingRules] 等其它配置"""
+        chapter_order, self.config_extra = self.chapter_contents.read_config()
+        self.matcher = rules_from_section(self.config_extra.get(HEADING_SECTION))
+        return chapter_order
+
+    def set_heading_rules(self, names):
+        """启用指定的内置标题规则，并随 config.ini 保存"""
+        section = {"enabled": ", ".join(names)}
+        self.matcher = rules_from_section(section)
+        self.config_extra[HEADING_SECTION] = section
+
+    def update_config_ini(self):
+        """立即写入章节顺序（原子替换 config.ini / 打包格式为一个事务）"""
+        if not self.project_folder or not self.chapter_order:
+            return
+
+        self.chapter_contents.write_config(self.chapter_order, self.config_extra)
+        self.order_dirty = False
+        self.order_flushes += 1
+        self.log("配置文件已更新")
+
+    def order_changed(self, count=1, persist=True):
+        """记录章节顺序的修改；autoflush 时立即写入，否则等待 flush_order()"""
+        self.order_mutations += count
+        self.order_dirty = True
+        self.order_changed_at = time.monotonic()
+        if persist and self.autoflush:
+            self.update_config_ini()
+
+    def flush_order(self):
+        """有未写入的顺序修改时写入，返回是否写入了"""
+        if not self.order_dirty:
+            return False
+        self.update_config_ini()
+        return True
+
+    def order_stats(self):
+        return {"mutations": self.order_mutations, "flushes": self.order_flushes, "pending": self.order_dirty}
+
+    def load_chapter_contents(self):
+        """清空缓存并返回按需加载的存储，章节内容在首次访问时才读取"""
+        self.chapter_contents.clear()
+        return self.chapter_contents
+
+    def load(self, warm=True):
+        """从 config.ini 加载项目（不读取章节内容）；warm 为 True 且清单仍然有效时直接使用清单"""
+        if warm and self.load_manifest():
+            self.log("按项目清单加载", DEBUG)
+            return
+        self.chapter_order = self.load_config_ini()
+        self.chapter_contents = self.load_chapter_contents()
+        self.save_manifest()
+
+    # 项目清单（见 manifest.py）
+    def load_manifest(self, validate=True):
+        """按清单恢复章节顺序、配置和合并索引，返回是否成功；validate 为 False 时不做校验"""
+        manifest = self.chapter_contents.read_meta(MANIFEST_KEY)
+        if not manifest:
+            return False
+        with stage("manifest_check"):
+            if validate and not manifest_is_valid(manifest, self.chapter_contents.versions(),
+                                                  self.chapter_contents.config_version()):
+                return False
+        self.config_extra = manifest["extra"]
+        self.matcher = rules_from_section(self.config_extra.get(HEADING_SECTION))
+        self.chapter_order = [chapter[0] for chapter in manifest["chapters"]]
+        self.chapter_contents = self.load_chapter_contents()
+        entries = merge_entries(manifest)
+        if entries is not None:
+            merge = manifest["merge"]
+            self._merge_index = MergeIndex(merge["output_path"], entries, merge["signature"], merge["code"])
+        return True
+
+    def validate_manifest(self):
+        """校验 load_manifest(validate=False) 用过的清单；已过期时重新加载，返回清单是否有效"""
+        manifest = self.chapter_contents.read_meta(MANIFEST_KEY)
+        if manifest_is_valid(manifest, self.chapter_contents.versions(), self.chapter_contents.config_version()):
+            return True
+        self.log("项目清单已过期，重新加载")
+        self._merge_index = None
+        self.load(warm=False)
+        return False
+
+    def save_manifest(self, versions=None):
+        if versions is None:
+            versions = self.chapter_contents.versions()
+        self.chapter_contents.write_meta(MANIFEST_KEY, build_manifest(
+            list(self.chapter_order), self.config_extra, versions, self.chapter_contents.config_version(),
+            self.merge_index))
+
+    def import_chapters(self, chapters):
+        """用拆分结果初始化项目（覆盖章节顺序），返回章节名列表"""
+        chapter_files = self.save_chapter_files(chapters)
+        chapter_names = [name for name, _ in chapter_files]
+        if not chapter_names:
+            return chapter_names
+
+        self.create_config_ini(chapter_names)
+        self.chapter_order = chapter_names
+        self.chapter_contents = self.load_chapter_contents()
+        return chapter_names
+
+    # 章节操作
+    def add_chapters(self, chapters, prefix=None, persist=True):
+        """追加拆分后的章节，返回最终使用的章节名列表；persist 为 False 时不写 config.ini
+
+        progress 中途抛出（取消）或出错时，已写入的章节照样提交并记入章节顺序，然后再抛出。
+        """
+        added = []
+        error = None
+        chapters = iter(chapters)
+        more = True
+        while more and error is None:
+            more = False
+            with self.chapter_contents.batch():
+                try:
+                    for raw_name, chapter_content in chapters:
+                        cleaned_name = self.matcher.clean(raw_name)
+                        if prefix:
+                            cleaned_name = f"{prefix}-{cleaned_name}"
+
+                        # 先定下最终的章节名，重复报告里用的就是实际写入的名字；跳过时不占用
+                        final_name = self.names.unique(cleaned_name)
+                        fp = self.check_duplicate(final_name, chapter_content)
+                        if fp is False:
+                            continue
+                        self.names.claim(final_name)
+                        self.write_chapter(final_name, chapter_content)
+                        if fp:
+                            self._fingerprints.add(final_name, fp)
+                        self.chapter_order.append(final_name)
+                        added.append(final_name)
+                        self.log(f"添加章节: {final_name}", DEBUG)
+                        count("chapters")
+                        self.progress(len(added))
+                        if len(added) % COMMIT_CHAPTERS == 0:
+                            more = True  # 提交这一段，界面线程可以在两段之间读取章节
+                            break
+                except BaseException as e:
+                    error = e  # 不让异常穿过 batch，否则打包格式会回滚已写入的章节
+
+        if added:
+            self.order_changed(len(added), persist)
+            if persist:
+                self.save_fingerprints()
+        if error is not None:
+            raise error
+        return added
+
+    def add_file(self, file_path, include_filename=False):
+        """流式拆分单个文件并逐章追加"""
+        file_name = os.path.basename(file_path)
+        chapters = iter_chapters(file_path, detect_file_encoding(file_path), 'ignore', self.matcher)
+        prefix = os.path.splitext(file_name)[0] if include_filename else None
+        added = self.add_chapters(chapters, prefix)
+        if not added:
+            self.log(f"文件 {file_name} 中未检测到章节", WARNING)
+            return added
+
+        self.log(f"文件 {file_name} 中检测到 {len(added)} 个章节，添加完成")
+        return added
+
+    def add_files(self, file_paths, include_filename=False, workers=None):
+        """批量导入：在进程池中并行拆分，按选择顺序追加，最后只写一次 config.ini
+
+        返回 {文件路径: 章节名列表}；单个文件出错只记录日志，不影响其它文件。
+        """
+        file_paths = list(file_paths)
+        results = {}
+        start = len(self.chapter_order)
+        error = None
+        # 不在外层包事务：等待进程池拆分结果时不占着存储的锁，已写入的章节按段提交
+        try:
+            split_results = timed(iter_split_files(file_paths, self.matcher, workers), "batch_split")
+            for done, (file_path, chapters) in enumerate(split_results, 1):
+                file_name = os.path.basename(file_path)
+                if isinstance(chapters, Exception):
+                    self.log(f"处理文件 {file_name} 时出错: {chapters}", ERROR)
+                else:
+                    prefix = os.path.splitext(file_name)[0] if include_filename else None
+                    added = results[file_path] = self.add_chapters(chapters, prefix, persist=False)
+                    if added:
+                        self.log(f"文件 {file_name} 中检测到 {len(added)} 个章节，添加完成")
+                    else:
+                        self.log(f"文件 {file_name} 中未检测到章节", WARNING)
+                self.progress(done, len(file_paths))
+        except BaseException as e:
+            error = e
+        # 中途取消或出错时，已写入的章节同样记入 config.ini（不看 order_dirty，总是写一次）
+        if len(self.chapter_order) > start:
+            self.save_fingerprints()
+            self.update_config_ini()
+        if error is not None:
+            raise error
+        return results
+
+    def add_file_as_chapter(self, file_path, include_filename=False, persist=True):
+        """把整个文件作为一个章节追加；逐个追加多个文件时可传 persist=False，最后由调用方
+        save_fingerprints() 并 flush_order() 一次"""
+        content = read_text_auto(file_path)
+        file_stem = os.path.splitext(os.path.basename(file_path))[0]
+        base_name = self.matcher.clean(file_stem)
+        if include_filename:
+            base_name = f"{file_stem}-{base_name}"
+
+        new_name = self.names.unique(base_name)
+        fp = self.check_duplicate(new_name, content)
+        if fp is False:
+            return None
+        self.names.claim(new_name)
+        with self.chapter_contents.batch():
+            self.write_chapter(new_name, content)
+            if fp:
+                self._fingerprints.add(new_name, fp)
+            self.chapter_order.append(new_name)
+            self.order_changed(persist=persist)
+            if persist:
+                self.save_fingerprints()
+        return new_name
+
+    def delete_chapter(self, index):
+        chapter_name = self.chapter_order[index]
+        self.chapter_contents.delete(chapter_name)
+        self.search_stale = True
+        if self._fingerprints is not None:
+            self._fingerprints.remove(chapter_name)
+        self.chapter_order.pop(index)
+        self.names.discard(chapter_name)
+        self.order_changed()
+        return chapter_name
+
+    def move_chapter(self, old_index, new_index, persist=True):
+        chapter = self.chapter_order.move(old_index, new_index)
+        self.order_changed(persist=persist)
+        return chapter
+
+    def swap_chapters(self, i, j):
+        self.chapter_order.swap(i, j)
+        self.order_changed()
+
+    # 重复章节检测
+    @property
+    def fingerprints(self):
+        """章节指纹索引；从元数据读取后，按章节版本补算缺少或已过期的指纹"""
+        if self._fingerprints is None:
+            from .dedup import INDEX_KEY as FINGERPRINT_KEY, FingerprintIndex, fingerprint
+
+            index = FingerprintIndex.from_dict(self.chapter_contents.read_meta(FINGERPRINT_KEY))
+            versions = self.chapter_contents.versions()
+            changed, removed = index.stale(versions)
+            for name in removed:
+                index.remove(name)
+            for done, name in enumerate(changed, 1):
+                content = self.chapter_contents.get(name)
+                if content is not None:
+                    index.add(name, fingerprint(content), versions[name])
+                self.progress(done, len(changed))
+            if changed:
+                self.log(f"已计算 {len(changed)} 个章节的指纹")
+            self._fingerprints = index
+        return self._fingerprints
+
+    def check_duplicate(self, chapter_name, content):
+        """导入前检查重复：返回 False 表示按 duplicate_policy 跳过，否则返回指纹（不检测时为 None）"""
+        if self.duplicate_policy == "off":
+            return None
+        from .dedup import fingerprint
+
+        fp = fingerprint(content)
+        match = self.fingerprints.find(fp)
+        if match is None:
+            return fp
+        existing, score = match
+        same = self.fingerprints.entries[existing][1] == fp[0]
+        kind = "重复" if same else f"近似重复（相似度约 {score:.0%}）"
+        skip = self.duplicate_policy == "skip"
+        self.duplicates.append((chapter_name, existing, score, skip))
+        count("duplicates")
+        if skip:
+            self.log(f"跳过章节 {chapter_name}：与 {existing} {kind}", WARNING)
+            return False
+        self.log(f"章节 {chapter_name} 与 {existing} {kind}", WARNING)
+        return fp
+
+    def save_fingerprints(self):
+        """把指纹连同章节当前的版本标记写入项目元数据"""
+        index = self._fingerprints
+        if index is None:
+            return
+        from .dedup import INDEX_KEY as FINGERPRINT_KEY
+
+        versions = self.chapter_contents.versions()
+        for name, (version, _, _) in list(index.entries.items()):
+            if version is None and name in versions:
+                index.set_version(name, versions[name])
+        self.chapter_contents.write_meta(FINGERPRINT_KEY, index.to_dict())
+
+    def close(self):
+        """关闭章节存储和全文索引的连接；切换项目或退出前调用，之后不应再使用本项目"""
+        self.chapter_contents.close()
+        if self._search_index is not None:
+            self._search_index.close()
+            self._search_index = None
+
+    # 全文检索
+    @property
+    def search_index(self):
+        if self._search_index is None:
+            from .search import open_index
+
+            self._search_index = open_index(self.project_folder)
+        return self._search_index
+
+    def update_search_index(self):
+        """按章节版本增量更新索引，只重建改过的章节，返回 (重建章数, 删除章数)
+
+        本次打开后已经同步过、且章节内容没有再改过时直接返回。
+        """
+        if not self.search_stale:
+            return 0, 0
+        rebuilt, removed = self.search_index.sync(self.chapter_contents, self.progress)
+        self.search_stale = False
+        if rebuilt or removed:
+            self.log(f"全文索引已更新: 重建 {rebuilt} 章，删除 {removed} 章")
+        return rebuilt, removed
+
+    def search(self, query, limit=None):
+        """全文搜索，按章节顺序返回 [(章节名, 命中的字符偏移)]，limit 为最多返回的章数"""
+        hits = self.search_index.search(query, self.chapter_contents.get)
+        return _in_chapter_order(hits, self.chapter_order)[:limit]
+
+    # 合并输出
+    @property
+    def merge_index(self):
+        if self._merge_index is None:
+            self._merge_index = MergeIndex.from_dict(self.chapter_contents.read_meta(MERGE_INDEX_KEY))
+        return self._merge_index
+
+    def content_code(self, versions=None):
+        if versions is None:
+            versions = self.chapter_contents.versions()
+        return content_code(os.path.basename(self.project_folder), self.chapter_order, versions)
+
+    def write_merged(self, output_path=None, incremental=True):
+        """按章节顺序合并为一个文件，末尾写入由内容得出的24位编码并返回
+
+        incremental 为 True 时利用上次保存的偏移索引，只重写变化的部分；
+        编码与上次相同且文件未被外部修改时不写入。
+        """
+        output_path = output_path or self.loaded_file
+        self.flush_order()
+        versions = self.chapter_contents.versions()
+        code = self.content_code(versions)
+        # 共享存储的版本标记就是内容哈希，改写成相同内容的章节不算变化
+        dirty = () if self.shared else self.dirty
+        self._merge_index, self.last_merge_stats = write_merged(
+            output_path, list(self.chapter_order), self.chapter_contents, code,
+            self.merge_index, dirty, versions, incremental, self.progress)
+        if self.last_merge_stats.mode != "unchanged":
+            self.chapter_contents.write_meta(MERGE_INDEX_KEY, self._merge_index.to_dict())
+            self.save_manifest(versions)
+        self.dirty.clear()
+        return code
+
+
+def open_novel(file_path, registry, base_dir=None, log=_default_log, heading_rules=None, packed=None,
+               progress=_noop_progress):
+    """打开小说：已登记的项目直接加载，否则拆分章节创建新项目。返回 Project 或 None
+
+    packed 为 None 时沿用项目文件夹现有的存储格式，True/False 指定新项目是否使用单文件打包格式，
+    "shared" 使用所有项目共享的内容寻址存储。
+    """
+    if not convert_to_utf8(file_path, log):
+        return None
+
+    code = read_project_code(file_path)
+    project_path = None
+
+    if code:
+        project_path = registry.get_project_by_code(code)
+        log(f"检测到项目编码: {code}")
+
+    project_folder = create_project_folder(file_path, base_dir, log)
+
+    if project_path and os.path.exists(project_path):
+        project = Project(project_folder, file_path, log)
+        project.load()
+        if project.chapter_order:
+            log(f"加载已有项目: {os.path.basename(file_path)}")
+            registry.save_project_code(file_path, code)
+            return project
+        # 编码由内容得出，复制或改名的小说编码相同但项目文件夹是空的，按新项目拆分
+        log(f"项目文件夹为空，重新拆分: {project_folder}", DEBUG)
+        project.close()
+
+    project = Project(project_folder, file_path, log, packed)
+    project.progress = progress
+    # 项目文件夹中已有配置时沿用其中的标题规则
+    project.load_config_ini()
+    if heading_rules:
+        project.set_heading_rules(heading_rules)
+
+    # 边读边拆边写，内存中最多只保留一章
+    if not project.import_chapters(iter_chapters(file_path, matcher=project.matcher)):
+        log("未检测到任何章节，可能格式不符合要求", WARNING)
+        return None
+
+    new_code = project.content_code()
+    registry.save_project_code(file_path, new_code)
+    log(f"新项目创建完成，编码: {new_code}")
+    return project
+
+
+def open_existing(file_path, base_dir=None, log=_default_log, packed=None):
+    """直接按项目文件夹加载（历史记录），不做拆分"""
+    if not os.path.exists(file_path):
+        log(f"文件不存在: {file_path}", ERROR)
+        return None
+
+    project = Project(create_project_folder(file_path, base_dir, log), file_path, log, packed)
+    project.load()
+    log(f"加载项目: {os.path.basename(file_path)}")
+    return project
+
+
+def open_cached(file_path, base_dir=None, log=_default_log):
+    """不做校验、直接按清单打开项目（历史记录），没有清单时返回 None
+
+    章节列表可以立即显示；之后应在后台调用 project.validate_manifest()。
+    """
+    project_folder = project_folder_for(file_path, base_dir)
+    if not os.path.isdir(project_folder) or not os.path.exists(file_path):
+        return None
+    project = Project(project_folder, file_path, log)
+    if not project.load_manifest(validate=False):
+        project.chapter_contents.close()
+        return None
+    log(f"加载项目: {os.path.basename(file_path)}")
+    return project
+
+
+def save_novel(project, registry, incremental=True):
+    """合并保存到 project.loaded_file 并登记新编码"""
+    code = project.write_merged(incremental=incremental)
+    registry.save_project_code(project.loaded_file, code)
+    stats = project.last_merge_stats
+    speed = f"{stats.bytes_written / 1048576:.1f} MB，{stats.seconds:.3f} 秒，{stats.bytes_per_second / 1048576:.1f} MB/s"
+    if stats.mode == "unchanged":
+        project.log("内容未变化，跳过写入")
+        return code
+    if stats.mode == "splice":
+        project.log(f"增量保存: 原地更新 {stats.chapters_written} 章，{speed}")
+    elif stats.mode == "tail":
+        project.log(f"增量保存: 从第{stats.rewrite_from+1}章起重写 {stats.chapters_written} 章，{speed}")
+    else:
+        project.log(f"全量保存: {stats.chapters_written} 章，{speed}")
+    project.log(f"文件已保存，新编码: {code}")
+    return code
+
+
+def _in_chapter_order(hits, chapter_order):
+    """{章节名: 偏移} -> 按章节顺序排列的 [(章节名, 偏移)]，不在顺序中的章节排在最后"""
+    position = {name: i for i, name in enumerate(chapter_order)}
+    return sorted(hits.items(), key=lambda item: (position.get(item[0], len(position)), item[0]))
+
+
+def search_projects(registry, query, base_dir=None, limit=None):
+    """在登记表中所有已建立索引的项目里搜索，返回 [(小说路径, 项目文件夹, [(章节名, 偏移)])]
+
+    只读取已有的 search.db，不会为没有索引的项目建立索引；索引和章节都以只读方式打开，
+    不会在其它项目的文件夹中创建或改写文件。每个项目的命中按章节顺序排列，limit 为每个项目最多返回的章数。
+    """
+    from .packed import open_reader
+    from .search import open_index as open_search_index, search_path
+
+    results = []
+    for entry in registry.read_history().values():
+        project_folder = project_folder_for(entry["path"], base_dir)
+        if not os.path.exists(search_path(project_folder)):
+            continue
+        index = open_search_index(project_folder, readonly=True)
+        store = open_reader(project_folder)
+        try:
+            hits = index.search(query, store.get)
+            if hits:
+                hits = _in_chapter_order(hits, store.read_config()[0])[:limit]
+        finally:
+            index.close()
+            store.close()
+        if hits:
+            results.append((entry["path"], project_folder, hits))
+    return results
@@ -0,0 +1,92 @@
+"""章节标题识别：预编译的组合正则，规则可在项目 config.ini 的 [HeadingRules] 中配置
+
+    [HeadingRules]
+    enabled = chapter, zhengwen, volume
+    part = Part\\s+\\d+          ; 其它键为自定义规则（标题前缀正则）
+"""
+import re
+
+SECTION = "HeadingRules"
+CN_NUM = "一二三四五六七八九十百千万"
+NUM = rf"(?:\d+|[{CN_NUM}]+)"
+
+# 名称 -> (标题前缀正则, 清理章节名时去掉的前缀正则)
+BUILTIN_RULES = {
+    "chapter": (rf"第{NUM}章", rf"第{NUM}章[:：\s]*"),
+    "zhengwen": (r"正文", r"正文[:：\s]*"),
+    "volume": (rf"第{NUM}卷", rf"第{NUM}卷[:：\s]*"),
+    "section": (rf"第{NUM}节", rf"第{NUM}节[:：\s]*"),
+    "hui": (rf"第{NUM}回", rf"第{NUM}回[:：\s]*"),
+    # 标题正则会嵌入 MULTILINE 的整块匹配中，空白只能是行内空白，不能跨行
+    "english": (r"(?i:chapter)[^\S\n]*\d+", r"(?i:chapter)[^\S\n]*\d+[.:：\s]*"),
+    "numbered": (r"\d{1,5}[.、][^\S\n]*\S", r"\d{1,5}[.、][^\S\n]*"),
+}
+DEFAULT_RULE_NAMES = ("chapter", "zhengwen")
+
+
+class HeadingMatcher:
+    """把所有规则合成一个正则：既能逐行判断，也能对整块文本做 MULTILINE finditer"""
+
+    def __init__(self, rules):
+        self.rules = list(rules)  # [(名称, 标题正则, 清理正则)]
+        if not self.rules:
+            raise ValueError("至少需要一条章节标题规则")
+        alternatives = "|".join(f"(?:{heading})" for _, heading, _ in self.rules)
+        # 标题按去掉首尾空白后的行判断，所以允许行首有除换行外的空白
+        self.line_pattern = re.compile(rf"^[^\S\n]*(?:{alternatives})[^\n]*", re.MULTILINE)
+        self.heading_pattern = re.compile(rf"(?:{alternatives})")
+        self.cleaners = [re.compile(rf"^(?:{clean})") for _, _, clean in self.rules]
+
+    def is_heading(self, stripped_line):
+        return self.heading_pattern.match(stripped_line) is not None
+
+    def finditer(self, text, pos=0, endpos=None):
+        """在 text[pos:endpos] 中查找标题行，pos 必须位于行首"""
+        if endpos is None:
+            endpos = len(text)
+        return self.line_pattern.finditer(text, pos, endpos)
+
+    def clean(self, name):
+        cleaned = name
+        for cleaner in self.cleaners:
+            cleaned = cleaner.sub("", cleaned, count=1)
+        cleaned = cleaned.strip()
+        if not cleaned:
+            cleaned = "未知章节"
+        return cleaned
+
+
+def build_matcher(names=DEFAULT_RULE_NAMES, custom=None):
+    rules = []
+    for name in names:
+        if name not in BUILTIN_RULES:
+            raise ValueError(f"未知的章节标题规则: {name}")
+        heading, clean = BUILTIN_RULES[name]
+        rules.append((name, heading, clean))
+    for name, pattern in (custom or {}).items():
+        re.compile(pattern)  # 尽早暴露无效正则
+        rules.append((name, pattern, rf"{pattern}[:：\s]*"))
+    return HeadingMatcher(rules)
+
+
+DEFAULT_MATCHER = build_matcher()
+
+
+def rules_from_section(section):
+    """从 [HeadingRules] 段构建匹配器；段为空时返回默认匹配器"""
+    if not section:
+        return DEFAULT_MATCHER
+    enabled = section.get("enabled")
+    names = [n.strip() for n in enabled.split(",") if n.strip()] if enabled else list(DEFAULT_RULE_NAMES)
+    custom = {key: value for key, value in section.items() if key != "enabled"}
+    return build_matcher(names, custom)
+
+
+def load_matcher(config_path):
+    import configparser  # 延迟导入
+
+    config = configparser.ConfigParser(interpolation=None)
+    config.read(config_path, encoding="utf-8")
+    if SECTION not in config:
+        return DEFAULT_MATCHER
+    return rules_from_section(dict(config[SECTION]))
@@ -0,0 +1,86 @@
+"""日志：回调约定为 log(message, level=INFO)，同时写入标准库 logging 的 "novelcore" 记录器
+
+  * emit：默认的日志回调，只转发给 logging（未配置处理器时不输出）；
+  * enable_file_log：按大小轮转的日志文件，每行一个 JSON 对象，界面和命令行都可使用；
+  * LogBuffer：线程安全的环形缓冲区，界面定时批量取出新日志显示。
+"""
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from logging import DEBUG, ERROR, INFO, WARNING
+
+LOGGER_NAME = "novelcore"
+DEFAULT_LOG_FILE = "novelcore.log"
+LEVEL_NAMES = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR}
+
+logger = logging.getLogger(LOGGER_NAME)
+# 库本身不向控制台输出（否则 WARNING 以上会经 logging.lastResort 再打印一遍），由调用方决定
+logger.addHandler(logging.NullHandler())
+
+
+def emit(message, level=INFO):
+    logger.log(level, message)
+
+
+class JsonFormatter(logging.Formatter):
+    """结构化日志：{"time", "level", "logger", "message", "thread"}，异常附带 "exc" """
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def enable_file_log(path=DEFAULT_LOG_FILE, level=DEBUG, max_bytes=5 * 1024 * 1024, backup_count=3):
+    """给 novelcore 记录器加上轮转日志文件（同一路径只添加一次），返回处理器"""
+    from logging.handlers import RotatingFileHandler  # 延迟导入（会连带导入 socket 等）
+
+    path = os.path.abspath(path)
+    for handler in logger.handlers:
+        if isinstance(handler, RotatingFileHandler) and handler.baseFilename == path:
+            return handler
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+    handler.setFormatter(JsonFormatter())
+    handler.setLevel(level)
+    logger.addHandler(handler)
+    if logger.level == logging.NOTSET or logger.level > level:
+        logger.setLevel(level)
+    return handler
+
+
+class LogBuffer:
+    """最多保留 capacity 条日志；任意线程可 append，界面线程用 drain() 取出尚未显示的部分"""
+
+    def __init__(self, capacity=1000):
+        self.entries = deque(maxlen=capacity)  # (时间字符串, 级别, 消息)
+        self._pending = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.dropped = 0  # 来不及显示就被挤出缓冲区的条数
+
+    def append(self, message, level=INFO):
+        entry = (datetime.now().strftime('%H:%M:%S'), level, message)
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self.entries.append(entry)
+            self._pending.append(entry)
+
+    def drain(self):
+        with self._lock:
+            pending = list(self._pending)
+            self._pending.clear()
+        return pending
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.entries)
@@ -0,0 +1,56 @@
+"""项目清单（manifest）：重新打开项目时免去解析 config.ini 和重建合并索引
+
+清单保存为项目元数据 manifest，记录：
+    config    config.ini（打包格式为其中的顺序记录）的版本标记
+    extra     config.ini 中 ChapterOrder 以外的段
+    files     扫描到的章节文件数（含不在章节顺序中的文件）
+    chapters  按章节顺序的 [章节名, 版本标记, 合并文件中的偏移, 字节数]；
+              版本标记在文件夹布局中为 [mtime_ns, 大小]，共享存储中为内容哈希，
+              章节在列表中的位置即章节 ID，没有合并偏移时后两项为 None
+    merge     合并文件的路径、签名和末尾编码
+
+校验只做一次目录扫描（store.versions()）加一次 config 的 stat：
+章节增删改或顺序变化都会使清单失效，此时按原来的方式加载并重写清单。
+"""
+
+MANIFEST_KEY = "manifest"
+FORMAT = 1
+
+
+def build_manifest(chapter_order, config_extra, versions, config_version, merge_index):
+    offsets = {}
+    for i, (name, offset, length, version) in enumerate(merge_index.entries):
+        if i < len(chapter_order) and chapter_order[i] == name and versions.get(name) == version:
+            offsets[i] = (offset, length)
+    chapters = []
+    for i, name in enumerate(chapter_order):
+        offset, length = offsets.get(i, (None, None))
+        chapters.append([name, versions.get(name), offset, length])
+    return {
+        "format": FORMAT,
+        "config": config_version,
+        "extra": config_extra,
+        "files": len(versions),
+        "chapters": chapters,
+        "merge": {"output_path": merge_index.output_path, "signature": merge_index.signature,
+                  "code": merge_index.code},
+    }
+
+
+def is_valid(manifest, versions, config_version):
+    """清单是否仍然描述项目当前的章节和顺序"""
+    if not manifest or manifest.get("format") != FORMAT or manifest.get("config") != config_version:
+        return False
+    if manifest.get("files") != len(versions):
+        return False
+    return all(name in versions and versions[name] == version for name, version, _, _ in manifest["chapters"])
+
+
+def merge_entries(manifest):
+    """由清单还原合并索引的条目；有章节缺少偏移时返回 None"""
+    entries = []
+    for name, version, offset, length in manifest["chapters"]:
+        if offset is None:
+            return None
+        entries.append([name, offset, length, version])
+    return entries
@@ -0,0 +1,260 @@
+"""合并输出：按章节顺序写出 "第N章：名称" + 正文，末尾附24位项目编码
+
+每次写出后记录每章在合并文件中的字节偏移（merge_index），下次保存时：
+  * 只有内容改动且字节长度不变的章节 -> 原地覆盖这几段；
+  * 否则从第一处变化的章节开始截断重写；
+  * 合并文件被外部修改或没有索引 -> 全量重写；
+  * 章节顺序、各章版本和编码都与索引一致 -> 文件就是最新的，不写入（unchanged）。
+
+全量重写先写入同目录的临时文件（大缓冲区），fsync 后 os.replace 替换原文件，
+中途崩溃不会留下被截断的小说。增量写入直接改动原文件，所以只用于小范围的修补：
+覆盖、截断和追加的字节合计超过正文的 INPLACE_RATIO（且不超过 INPLACE_MAX_BYTES）时
+同样走原子的全量重写。增量写入完成后同样 fsync；即使中途中断，文件签名对不上索引，
+下次保存会自动全量重写。
+"""
+import contextlib
+import os
+import shutil
+import tempfile
+import time
+
+from .profiling import count, stage
+
+INDEX_KEY = "merge_index"
+CODE_LENGTH = 24
+WRITE_BUFFER_SIZE = 4 * 1024 * 1024
+INPLACE_RATIO = 1 / 8  # 原地修改的字节数上限（相对于原正文）
+INPLACE_MAX_BYTES = 8 * 1024 * 1024  # 同时也不超过这个绝对值，修补内容先在内存中备好
+
+
+def chapter_segment(position, chapter_name, content):
+    """第 position 章（从0开始）在合并文件中的字节；换行与文本模式写出时一致"""
+    text = f"第{position+1}章：{chapter_name}\n{content}\n\n"
+    if os.linesep != "\n":
+        text = text.replace("\n", os.linesep)
+    return text.encode('utf-8')
+
+
+def fsync_dir(path):
+    """让 os.replace 的结果落盘（Windows 不支持对目录 fsync，直接跳过）"""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    count("fsyncs")
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def atomic_write(path, buffering=WRITE_BUFFER_SIZE):
+    """写入同目录临时文件，成功后 fsync 并原子替换 path；出错时删除临时文件，原文件不变"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb', buffering=buffering) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+            count("fsyncs")
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temp_path, 0o666 & ~umask)
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_path)
+        raise
+    fsync_dir(directory)
+
+
+def file_signature(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+class MergeIndex:
+    """合并文件的章节偏移索引：entries 为 [章节名, 偏移, 字节数, 版本标记]，code 为末尾的编码"""
+
+    def __init__(self, output_path=None, entries=None, signature=None, code=None):
+        self.output_path = output_path
+        self.entries = entries or []
+        self.signature = signature
+        self.code = code
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data:
+            return cls()
+        return cls(data.get("output_path"), data.get("entries"), data.get("signature"), data.get("code"))
+
+    def to_dict(self):
+        return {"output_path": self.output_path, "entries": self.entries, "signature": self.signature,
+                "code": self.code}
+
+    @property
+    def body_end(self):
+        """最后一章结束的位置（即编码开始的位置）"""
+        if not self.entries:
+            return 0
+        _, offset, length, _ = self.entries[-1]
+        return offset + length
+
+    def matches(self, output_path):
+        """索引是否仍然描述磁盘上的合并文件"""
+        if not self.signature or not self.output_path:
+            return False
+        if os.path.abspath(output_path) != self.output_path:
+            return False
+        try:
+            return file_signature(output_path) == self.signature
+        except OSError:
+            return False
+
+
+class MergeStats:
+    def __init__(self, mode):
+        self.mode = mode  # "full" / "tail" / "splice" / "unchanged"
+        self.bytes_written = 0
+        self.chapters_written = 0
+        self.rewrite_from = None  # 重写起点章节（从0开始），仅 tail 模式
+        self.seconds = 0.0
+
+    @property
+    def bytes_per_second(self):
+        return self.bytes_written / self.seconds if self.seconds > 0 else 0.0
+
+
+def _plan(index, chapter_order, dirty, versions):
+    """比较索引和当前章节，返回 (结构变化的起点, 只改了内容的章节位置列表)"""
+    entries = index.entries
+    structural = None
+    changed = []
+    for i, chapter_name in enumerate(chapter_order):
+        if i >= len(entries) or entries[i][0] != chapter_name:
+            structural = i
+            break
+        if chapter_name in dirty or versions.get(chapter_name) != entries[i][3]:
+            changed.append(i)
+    if structural is None and len(chapter_order) < len(entries):
+        structural = len(chapter_order)  # 末尾删除了章节
+    return structural, changed
+
+
+def _write_segments(f, index, chapter_order, contents, versions, start, stats, progress=None, segments=None):
+    """从 start 章开始顺序写出，并更新索引条目；segments 为已经生成好的各章字节"""
+    del index.entries[start:]
+    offset = f.tell()
+    for i in range(start, len(chapter_order)):
+        chapter_name = chapter_order[i]
+        if segments is not None:
+            segment = segments[i - start]
+        else:
+            segment = chapter_segment(i, chapter_name, contents.get(chapter_name, ''))
+        f.write(segment)
+        index.entries.append([chapter_name, offset, len(segment), versions.get(chapter_name)])
+        offset += len(segment)
+        stats.bytes_written += len(segment)
+        stats.chapters_written += 1
+        if progress:
+            progress(i + 1, len(chapter_order))
+
+
+def write_merged(output_path, chapter_order, contents, code, index=None, dirty=(), versions=None, incremental=True,
+                 progress=None):
+    """写出合并文件，返回 (新索引, MergeStats)
+
+    contents 只需支持 get(name, default)；增量模式下只读取需要重写的章节。
+    progress(done, total) 只在全量重写时调用，它抛出的异常会中止写入且不影响原文件。
+    """
+    with stage("merge_write"):
+        index, stats = _write_merged(output_path, chapter_order, contents, code, index, dirty, versions, incremental,
+                                     progress)
+    count("merge_bytes_written", stats.bytes_written)
+    count("merge_chapters_written", stats.chapters_written)
+    return index, stats
+
+
+def _write_merged(output_path, chapter_order, contents, code, index, dirty, versions, incremental, progress):
+    started = time.perf_counter()
+    versions = versions or {}
+    output_path = os.path.abspath(output_path)
+    code_bytes = code.encode('utf-8')
+
+    plan = None
+    if incremental and index is not None and index.matches(output_path):
+        plan = _plan(index, chapter_order, set(dirty), versions)
+
+    if plan == (None, []) and index.code == code:
+        stats = MergeStats("unchanged")
+        stats.seconds = time.perf_counter() - started
+        return index, stats
+
+    if plan is not None:
+        structural, changed = plan
+        rewrite_from = structural
+        # 原地修改的字节数：覆盖的段 + 截掉的旧尾部 + 新写的尾部，超出预算就走原子的全量重写
+        budget = min(int(index.body_end * INPLACE_RATIO), INPLACE_MAX_BYTES)
+        patched = 0
+        splices = []
+        for i in changed:
+            if rewrite_from is not None and i >= rewrite_from:
+                break
+            segment = chapter_segment(i, chapter_order[i], contents.get(chapter_order[i], ''))
+            if len(segment) != index.entries[i][2]:
+                rewrite_from = i
+                break
+            splices.append((i, segment))
+            patched += len(segment)
+            if patched > budget:
+                break
+        tail = []
+        if rewrite_from is not None and patched <= budget:
+            if rewrite_from < len(index.entries):
+                patched += index.body_end - index.entries[rewrite_from][1]
+            for i in range(rewrite_from, len(chapter_order)):
+                if patched > budget:
+                    break
+                segment = chapter_segment(i, chapter_order[i], contents.get(chapter_order[i], ''))
+                tail.append(segment)
+                patched += len(segment)
+        if patched > budget:
+            plan = None
+
+    if plan is not None:
+        stats = MergeStats("splice" if rewrite_from is None else "tail")
+        stats.rewrite_from = rewrite_from
+        with open(output_path, 'r+b') as f:
+            for i, segment in splices:
+                f.seek(index.entries[i][1])
+                f.write(segment)
+                index.entries[i][3] = versions.get(chapter_order[i])
+                stats.bytes_written += len(segment)
+                stats.chapters_written += 1
+            if rewrite_from is None:
+                f.seek(index.body_end)
+            else:
+                f.seek(index.entries[rewrite_from][1] if rewrite_from < len(index.entries) else index.body_end)
+                _write_segments(f, index, chapter_order, contents, versions, rewrite_from, stats, segments=tail)
+            f.write(code_bytes)
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+            count("fsyncs")
+            stats.bytes_written += len(code_bytes)
+    else:
+        index = MergeIndex(output_path)
+        stats = MergeStats("full")
+        with atomic_write(output_path) as f:
+            _write_segments(f, index, chapter_order, contents, versions, 0, stats, progress)
+            f.write(code_bytes)
+            stats.bytes_written += len(code_bytes)
+
+    index.signature = file_signature(output_path)
+    index.code = code
+    stats.seconds = time.perf_counter() - started
+    return index, stats
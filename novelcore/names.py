@@ -0,0 +1,40 @@
+"""章节名去重：基名 -> 下一个可用后缀，外加已占用名称集合，每次取名 O(1)"""
+
+
+class NameRegistry:
+    """与 handle_duplicate_names 规则一致：重名时取 "基名-N"，N 为已有最大后缀 + 1"""
+
+    def __init__(self, names=()):
+        self._taken = set()
+        self._next = {}  # 基名 -> 下一个后缀
+        for name in names:
+            self.add(name)
+
+    def __contains__(self, name):
+        return name in self._taken
+
+    def __len__(self):
+        return len(self._taken)
+
+    def add(self, name):
+        self._taken.add(name)
+        base, sep, suffix = name.rpartition('-')
+        if sep and suffix.isdecimal():
+            num = int(suffix)
+            if num >= self._next.get(base, 1):
+                self._next[base] = num + 1
+
+    def discard(self, name):
+        # 后缀计数不回退，保证之后生成的名字仍然唯一
+        self._taken.discard(name)
+
+    def unique(self, base_name):
+        if base_name not in self._taken:
+            return base_name
+        return f"{base_name}-{self._next.get(base_name, 1)}"
+
+    def claim(self, base_name):
+        """取得一个不重复的名字并登记"""
+        name = self.unique(base_name)
+        self.add(name)
+        return name
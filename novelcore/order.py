@@ -0,0 +1,240 @@
+"""章节顺序：分块列表 + 稳定的章节 ID + 章节名哈希
+
+顺序按块存放（每块最多 2 * BLOCK_SIZE 个 ID），插入、删除、移动只改动一两个块，
+块大小记在树状数组中，按位置定位和更新都是 O(log 块数)；章节名 -> ID 为哈希表。对外表现为章节名序列，
+可直接替代原来的 list（迭代、len、[]、append、insert、pop、==）。
+"""
+import itertools
+
+BLOCK_SIZE = 512
+
+
+class ChapterIndex:
+    def __init__(self, names=(), block_size=BLOCK_SIZE):
+        self.block_size = block_size
+        self._ids = itertools.count(1)
+        self._names = {}  # ID -> 章节名
+        self._by_name = {}  # 章节名 -> ID（重名时为其中一个）
+        self._extra = {}  # 重名章节名 -> 除 _by_name 中那个以外的个数
+        self._block_of = {}  # ID -> 所在的块
+        self._blocks = []
+        self._tree = [0]  # 各块大小的树状数组（下标从1开始）
+        self._len = 0
+        ids = [self._register(name) for name in names]
+        for i in range(0, len(ids), block_size):
+            self._adopt(ids[i:i + block_size])
+        self._len = len(ids)
+        self._rebuild()
+
+    # 章节名 / ID
+    def _register(self, name):
+        chapter_id = next(self._ids)
+        self._names[chapter_id] = name
+        if name in self._by_name:
+            self._extra[name] = self._extra.get(name, 0) + 1
+        else:
+            self._by_name[name] = chapter_id
+        return chapter_id
+
+    def _unregister(self, chapter_id):
+        name = self._names.pop(chapter_id)
+        del self._block_of[chapter_id]
+        extra = self._extra.get(name, 0)
+        if extra:
+            if extra == 1:
+                del self._extra[name]
+            else:
+                self._extra[name] = extra - 1
+        if self._by_name[name] == chapter_id:
+            del self._by_name[name]
+            if extra:
+                # 只有重名时才需要找另一个同名章节
+                self._by_name[name] = next(i for i, n in self._names.items() if n == name)
+        return name
+
+    def id_of(self, name):
+        """章节名对应的稳定 ID，不存在时返回 None"""
+        return self._by_name.get(name)
+
+    def name_of(self, chapter_id):
+        return self._names[chapter_id]
+
+    def id_at(self, index):
+        block, offset = self._locate(index)
+        return block[offset]
+
+    def index_of_id(self, chapter_id):
+        block = self._block_of[chapter_id]
+        for b, candidate in enumerate(self._blocks):
+            if candidate is block:
+                return self._prefix(b) + block.index(chapter_id)
+        raise KeyError(chapter_id)
+
+    def index(self, name):
+        """章节名的位置；与 list.index 一样，重名时返回第一个"""
+        chapter_id = self._by_name.get(name)
+        if chapter_id is None:
+            raise ValueError(f"{name!r} 不在章节列表中")
+        if name in self._extra:
+            return next(i for i, other in enumerate(self) if other == name)
+        return self.index_of_id(chapter_id)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    # 分块结构
+    def _adopt(self, block):
+        self._blocks.append(block)
+        for chapter_id in block:
+            self._block_of[chapter_id] = block
+
+    def _rebuild(self):
+        """块被拆分或删除后重建树状数组 O(块数)"""
+        size = len(self._blocks)
+        tree = [0] * (size + 1)
+        for i, block in enumerate(self._blocks, 1):
+            tree[i] += len(block)
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _add(self, b, delta):
+        i = b + 1
+        tree = self._tree
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, b):
+        """前 b 个块的章节总数"""
+        total = 0
+        tree = self._tree
+        while b > 0:
+            total += tree[b]
+            b -= b & -b
+        return total
+
+    def _find(self, index):
+        """位置 -> (块序号, 块内偏移)，index 必须小于总数"""
+        tree = self._tree
+        pos = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < len(tree) and tree[nxt] <= index:
+                pos = nxt
+                index -= tree[nxt]
+            step >>= 1
+        return pos, index
+
+    def _normalize(self, index, allow_end=False):
+        if index < 0:
+            index += self._len
+        limit = self._len if allow_end else self._len - 1
+        if not 0 <= index <= limit:
+            raise IndexError("章节位置超出范围")
+        return index
+
+    def _locate(self, index):
+        """位置 -> (块, 块内偏移)"""
+        b, offset = self._find(self._normalize(index))
+        return self._blocks[b], offset
+
+    def _insert_id(self, index, chapter_id):
+        index = self._normalize(index, allow_end=True)
+        if not self._blocks:
+            self._adopt([chapter_id])
+            self._rebuild()
+        else:
+            if index == self._len:
+                b = len(self._blocks) - 1
+                offset = len(self._blocks[b])
+            else:
+                b, offset = self._find(index)
+            block = self._blocks[b]
+            block.insert(offset, chapter_id)
+            self._block_of[chapter_id] = block
+            if len(block) > 2 * self.block_size:
+                tail = block[self.block_size:]
+                del block[self.block_size:]
+                self._blocks.insert(b + 1, tail)
+                for moved_id in tail:
+                    self._block_of[moved_id] = tail
+                self._rebuild()
+            else:
+                self._add(b, 1)
+        self._len += 1
+
+    def _remove_id(self, index):
+        b, offset = self._find(self._normalize(index))
+        block = self._blocks[b]
+        chapter_id = block.pop(offset)
+        if block:
+            self._add(b, -1)
+        else:
+            del self._blocks[b]
+            self._rebuild()
+        self._len -= 1
+        return chapter_id
+
+    # 序列接口
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        names = self._names
+        for block in self._blocks:
+            for chapter_id in block:
+                yield names[chapter_id]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        block, offset = self._locate(index)
+        return self._names[block[offset]]
+
+    def __setitem__(self, index, name):
+        """替换某个位置的章节（新章节，分配新 ID）"""
+        block, offset = self._locate(index)
+        self._unregister(block[offset])
+        chapter_id = self._register(name)
+        block[offset] = chapter_id
+        self._block_of[chapter_id] = block
+
+    def __eq__(self, other):
+        if isinstance(other, (ChapterIndex, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"ChapterIndex({list(self)!r})"
+
+    def insert(self, index, name):
+        """插入章节，返回新章节的 ID"""
+        chapter_id = self._register(name)
+        self._insert_id(index, chapter_id)
+        return chapter_id
+
+    def append(self, name):
+        return self.insert(self._len, name)
+
+    def extend(self, names):
+        for name in names:
+            self.append(name)
+
+    def pop(self, index=-1):
+        return self._unregister(self._remove_id(index))
+
+    def move(self, old_index, new_index):
+        """移动章节（ID 不变），返回章节名"""
+        chapter_id = self._remove_id(old_index)
+        self._insert_id(new_index, chapter_id)
+        return self._names[chapter_id]
+
+    def swap(self, i, j):
+        block_i, offset_i = self._locate(i)
+        block_j, offset_j = self._locate(j)
+        id_i, id_j = block_i[offset_i], block_j[offset_j]
+        block_i[offset_i], block_j[offset_j] = id_j, id_i
+        self._block_of[id_i], self._block_of[id_j] = block_j, block_i
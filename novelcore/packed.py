@@ -0,0 +1,297 @@
+"""单文件打包的项目存储：项目文件夹中只有一个 SQLite 文件 project.db
+
+章节内容、章节顺序和 config.ini 中的其它段都保存在同一个文件里，
+打开、保存和排序只需少量大块 I/O，便于在网络共享上复制和备份。
+接口与 store.ChapterStore 相同，可用 pack_folder / unpack_folder 在两种布局之间转换。
+"""
+import contextlib
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+from .profiling import count, stage
+from .store import CONFIG_NAME, ChapterStore, write_chapter_order
+from .viewer import TextSource
+
+PACKED_NAME = "project.db"
+SCHEMA_VERSION = "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chapters (
+    name TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    rev INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def packed_path(project_folder):
+    return os.path.join(project_folder, PACKED_NAME)
+
+
+def is_packed(project_folder):
+    return os.path.exists(packed_path(project_folder))
+
+
+class PackedStore:
+    """SQLite 中的 {章节名: 内容}；章节顺序以 JSON 列表存放在 meta 表中"""
+
+    packed = True
+    shared = False
+
+    def __init__(self, project_folder, readonly=False):
+        self.project_folder = project_folder
+        self.db_path = packed_path(project_folder)
+        self._lock = threading.RLock()
+        self._depth = 0  # batch() 嵌套层数，大于 0 时延迟提交
+        if readonly:
+            # 只读打开（跨项目搜索）：不建表、不写版本号，文件不存在时报错而不是新建
+            uri = pathlib.Path(os.path.abspath(self.db_path)).as_uri() + "?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None)
+            return
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.execute("INSERT OR IGNORE INTO meta VALUES ('version', ?)", (SCHEMA_VERSION,))
+
+    @property
+    def location(self):
+        return self.db_path
+
+    @property
+    def config_path(self):
+        return self.db_path
+
+    def path(self, chapter_name):
+        return f"{self.db_path}#{chapter_name}"
+
+    @contextlib.contextmanager
+    def batch(self):
+        """把多次写入合并为一个事务"""
+        with self._lock:
+            if self._depth == 0:
+                self.conn.execute("BEGIN")
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.conn.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self.conn.execute("COMMIT")
+
+    def get(self, chapter_name, default=None):
+        with self._lock:
+            row = self.conn.execute("SELECT content FROM chapters WHERE name = ?", (chapter_name,)).fetchone()
+        return row[0] if row else default
+
+    def __getitem__(self, chapter_name):
+        content = self.get(chapter_name)
+        if content is None:
+            raise KeyError(chapter_name)
+        return content
+
+    def __contains__(self, chapter_name):
+        with self._lock:
+            row = self.conn.execute("SELECT 1 FROM chapters WHERE name = ?", (chapter_name,)).fetchone()
+        return row is not None
+
+    def open_source(self, chapter_name):
+        """按行访问章节；内容已在 SQLite 中，直接按行切分"""
+        return TextSource(self.get(chapter_name, ''))
+
+    def write(self, chapter_name, content, cache=True):
+        # rev 取写入时刻，删除后重建的同名章节也不会与旧版本标记相同
+        with stage("chapter_write"), self.batch():
+            self.conn.execute("INSERT OR REPLACE INTO chapters VALUES (?, ?, ?)",
+                              (chapter_name, content, time.time_ns()))
+        count("rows_written")
+        count("chars_written", len(content))
+
+    def delete(self, chapter_name):
+        with self.batch():
+            self.conn.execute("DELETE FROM chapters WHERE name = ?", (chapter_name,))
+
+    def names(self):
+        with self._lock:
+            return [row[0] for row in self.conn.execute("SELECT name FROM chapters")]
+
+    def versions(self):
+        """章节名 -> 版本标记（最后写入时刻）"""
+        with self._lock:
+            return dict(self.conn.execute("SELECT name, rev FROM chapters"))
+
+    def read_meta(self, key, default=None):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (f"meta:{key}",)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def write_meta(self, key, value):
+        with self.batch():
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                              (f"meta:{key}", json.dumps(value, ensure_ascii=False)))
+
+    def pop(self, chapter_name, default=None):
+        # 没有自己的缓存（由 SQLite 页缓存负责），这里只为与 ChapterStore 接口一致
+        return default
+
+    def clear(self):
+        pass
+
+    def read_config(self):
+        with self._lock:
+            rows = dict(self.conn.execute("SELECT key, value FROM meta WHERE key IN ('order', 'extra')"))
+        return json.loads(rows.get("order", "[]")), json.loads(rows.get("extra", "{}"))
+
+    def write_config(self, chapter_order, extra_sections=None):
+        with stage("config_write"), self.batch():
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('order', ?)",
+                              (json.dumps(list(chapter_order), ensure_ascii=False),))
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('extra', ?)",
+                              (json.dumps(extra_sections or {}, ensure_ascii=False),))
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('config_rev', ?)", (str(time.time_ns()),))
+
+    def config_version(self):
+        """章节顺序的版本标记（最后写入时刻）"""
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'config_rev'").fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def open_store(project_folder, packed=None):
+    """打开项目存储；packed 为 "shared" 时使用共享的内容寻址存储（blobs.SharedStore），
+    为 None 时按文件夹中的 blobs.json / project.db 自动选择"""
+    from .blobs import SharedStore, is_shared
+
+    if packed is None:
+        packed = "shared" if is_shared(project_folder) else is_packed(project_folder)
+    if packed == "shared":
+        return SharedStore(project_folder)
+    if packed:
+        return PackedStore(project_folder)
+    return ChapterStore(project_folder)
+
+
+def open_reader(project_folder):
+    """只读访问项目的章节顺序和内容（read_config / get / close），不在项目文件夹中创建或改写任何文件"""
+    from .blobs import SharedReader, is_shared
+
+    if is_shared(project_folder):
+        return SharedReader(project_folder)
+    if is_packed(project_folder):
+        return PackedStore(project_folder, readonly=True)
+    return ChapterStore(project_folder)
+
+
+def _migrate_meta(source, target, old_versions):
+    """把合并索引和指纹搬到新布局，其中的版本标记换成新布局的标记
+
+    只有版本与转换前一致（转换时仍然有效）的条目才换成新标记，其余记为 None，下次使用时重算；
+    清单（manifest）记录的是旧布局的 config 和版本，不搬，下次加载时重建；
+    search.db 不在存储内，按版本标记同步时会整体重建一次。
+    """
+    from .dedup import INDEX_KEY as FINGERPRINT_KEY
+    from .merge import INDEX_KEY as MERGE_INDEX_KEY
+
+    new_versions = target.versions()
+
+    def remap(name, version):
+        if name in old_versions and old_versions[name] == version:
+            return new_versions.get(name)
+        return None
+
+    merge = source.read_meta(MERGE_INDEX_KEY)
+    if merge:
+        merge["entries"] = [[name, offset, length, remap(name, version)]
+                            for name, offset, length, version in merge.get("entries") or []]
+        target.write_meta(MERGE_INDEX_KEY, merge)
+    fingerprints = source.read_meta(FINGERPRINT_KEY)
+    if fingerprints:
+        target.write_meta(FINGERPRINT_KEY, {name: [remap(name, version), exact, signature]
+                                            for name, (version, exact, signature) in fingerprints.items()})
+
+
+def _remove_meta_files(project_folder, manifest_only=False):
+    """删除文件夹布局留下的元数据文件（已搬入 project.db 或已失效）；manifest_only 时只删清单"""
+    from .dedup import INDEX_KEY as FINGERPRINT_KEY
+    from .manifest import MANIFEST_KEY
+    from .merge import INDEX_KEY as MERGE_INDEX_KEY
+
+    keys = (MANIFEST_KEY,) if manifest_only else (MERGE_INDEX_KEY, FINGERPRINT_KEY, MANIFEST_KEY)
+    for key in keys:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(project_folder, f"{key}.json"))
+
+
+def pack_folder(project_folder, log=None):
+    """把 config.ini + 章节 .txt 导入 project.db，成功后删除原文件
+
+    合并索引和指纹随章节一起搬入（版本标记换成打包格式的），清单作废，下次加载时重建。
+    """
+    if is_packed(project_folder):
+        raise FileExistsError(f"项目已是打包格式: {packed_path(project_folder)}")
+
+    source = ChapterStore(project_folder)
+    chapter_order, extra_sections = source.read_config()
+    chapter_names = source.names()
+    old_versions = source.versions()
+    target = PackedStore(project_folder)
+    try:
+        with target.batch():
+            for chapter_name in chapter_names:
+                target.write(chapter_name, source[chapter_name])
+            target.write_config(chapter_order, extra_sections)
+            _migrate_meta(source, target, old_versions)
+    except BaseException:
+        target.close()
+        os.remove(target.db_path)
+        raise
+    target.close()
+
+    for chapter_name in chapter_names:
+        os.remove(source.path(chapter_name))
+    if os.path.exists(source.config_path):
+        os.remove(source.config_path)
+    _remove_meta_files(project_folder)
+    if log:
+        log(f"项目已打包: {len(chapter_names)} 个章节 -> {target.db_path}")
+    return len(chapter_names)
+
+
+def unpack_folder(project_folder, log=None):
+    """把 project.db 导出为 config.ini + 每章一个 .txt，成功后删除 project.db
+
+    合并索引和指纹同样导出（版本标记换成文件夹布局的），清单作废，下次加载时重建。
+    """
+    source = PackedStore(project_folder)
+    try:
+        chapter_order, extra_sections = source.read_config()
+        chapter_names = source.names()
+        old_versions = source.versions()
+        _remove_meta_files(project_folder)  # 打包前残留的旧文件不能当作当前的元数据
+        for chapter_name in chapter_names:
+            with open(os.path.join(project_folder, f"{chapter_name}.txt"), 'w', encoding='utf-8') as f:
+                f.write(source[chapter_name])
+        write_chapter_order(os.path.join(project_folder, CONFIG_NAME), chapter_order, extra_sections)
+        _migrate_meta(source, ChapterStore(project_folder), old_versions)
+    finally:
+        source.close()
+
+    os.remove(source.db_path)
+    if log:
+        log(f"项目已解包: {len(chapter_names)} 个章节 -> {project_folder}")
+    return len(chapter_names)
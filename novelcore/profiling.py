@@ -0,0 +1,127 @@
+"""性能统计：各阶段耗时、计数器和可选的 cProfile，每个操作生成一份 JSON 报告
+
+    with profiling.profile("split") as report:
+        ...                      # 期间 stage()/count() 都记入 report
+    print(report.to_json())
+
+没有进行中的 profile 时 stage() / count() 几乎没有开销，可以常驻在代码中。
+统计是进程级的（不区分线程）；进程池中的子进程不会计入。
+"""
+import contextlib
+import io
+import json
+import threading
+import time
+from datetime import datetime
+
+_lock = threading.Lock()
+_active = []  # 进行中的报告（可嵌套，全部都会计数）
+
+
+class Report:
+    def __init__(self, operation):
+        self.operation = operation
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self.seconds = 0.0
+        self.stages = {}  # 名称 -> [耗时, 次数]
+        self.counters = {}
+        self.profile_text = None
+
+    def add_stage(self, name, seconds):
+        entry = self.stages.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    def add_count(self, name, n):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self):
+        data = {
+            "operation": self.operation,
+            "started": self.started,
+            "seconds": round(self.seconds, 6),
+            "stages": {name: {"seconds": round(seconds, 6), "calls": calls}
+                       for name, (seconds, calls) in sorted(self.stages.items(), key=lambda item: -item[1][0])},
+            "counters": dict(sorted(self.counters.items())),
+        }
+        if self.profile_text:
+            data["profile"] = self.profile_text
+        return data
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_json())
+        return path
+
+    def summary(self):
+        """一行摘要，用于日志"""
+        stages = "，".join(f"{name} {seconds:.3f}s×{calls}"
+                          for name, (seconds, calls) in sorted(self.stages.items(), key=lambda item: -item[1][0]))
+        counters = "，".join(f"{name}={value}" for name, value in sorted(self.counters.items()))
+        return f"{self.operation} 共 {self.seconds:.3f}s；阶段: {stages or '无'}；计数: {counters or '无'}"
+
+
+@contextlib.contextmanager
+def profile(operation, cprofile=False, top=25):
+    """统计一个操作；cprofile 为 True 时同时用 cProfile 采样当前线程，前 top 项写入报告"""
+    report = Report(operation)
+    profiler = None
+    if cprofile:
+        import cProfile  # 延迟导入
+        profiler = cProfile.Profile()
+    with _lock:
+        _active.append(report)
+    started = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield report
+    finally:
+        if profiler:
+            profiler.disable()
+        report.seconds = time.perf_counter() - started
+        with _lock:
+            _active.remove(report)
+        if profiler:
+            import pstats
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+            report.profile_text = out.getvalue()
+
+
+@contextlib.contextmanager
+def stage(name):
+    if not _active:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        with _lock:
+            for report in _active:
+                report.add_stage(name, seconds)
+
+
+def count(name, n=1):
+    if not _active:
+        return
+    with _lock:
+        for report in _active:
+            report.add_count(name, n)
+
+
+def timed(iterable, name):
+    """逐项产出 iterable，并把花在取下一项上的时间记为 name 阶段（适合生成器）"""
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
@@ -0,0 +1,158 @@
+"""项目登记表：小说路径 ↔ 24位项目编码
+
+默认保存在 SQLite 文件 data.db（WAL 模式，按编码和路径建索引，查询 O(1)），
+第一次打开时自动从旧的 data.ini 迁移。IniRegistry 仍可直接读写 data.ini，
+解析结果按文件修改时间缓存，不再每次查询都重新解析。
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+DEFAULT_REGISTRY = "data.db"
+LEGACY_REGISTRY = "data.ini"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    section TEXT NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    code TEXT NOT NULL,
+    last_modified TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS projects_code ON projects (code);
+CREATE UNIQUE INDEX IF NOT EXISTS projects_section ON projects (section);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def read_ini(path):
+    """解析 data.ini，返回按文件顺序排列的 [(段名, 路径, 编码, 修改时间)]"""
+    import configparser  # 延迟导入：已迁移到 data.db 后不再需要
+
+    config = configparser.ConfigParser(interpolation=None)
+    if os.path.exists(path):
+        try:
+            config.read(path, encoding="utf-8")
+        except UnicodeDecodeError:
+            config.read(path, encoding="gbk")
+    return [(section, config.get(section, "path"), config.get(section, "code"),
+             config.get(section, "last_modified", fallback=""))
+            for section in config.sections()]
+
+
+class IniRegistry:
+    """直接使用 data.ini；内存中维护 编码->路径、路径->段名 两个索引"""
+
+    def __init__(self, path=LEGACY_REGISTRY):
+        self.path = path
+        self._signature = None
+        self._rows = []
+        self._by_code = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            st = os.stat(self.path)
+            signature = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            signature = None
+        if signature != self._signature:
+            self._rows = read_ini(self.path) if signature else []
+            self._by_code = {}
+            for section, path, code, _ in self._rows:
+                self._by_code.setdefault(code, path)
+            self._signature = signature
+        return self._rows
+
+    def get_project_by_code(self, code):
+        with self._lock:
+            self._load()
+            return self._by_code.get(code)
+
+    def save_project_code(self, file_path, code):
+        section = os.path.basename(file_path)
+        with self._lock:
+            rows = [row for row in self._load() if row[1] != file_path and row[0] != section]
+            rows.append((section, file_path, code, _now()))
+
+            import configparser  # 延迟导入
+            config = configparser.ConfigParser(interpolation=None)
+            for row_section, path, row_code, last_modified in rows:
+                config[row_section] = {"path": path, "code": row_code, "last_modified": last_modified}
+            with open(self.path, "w", encoding="utf-8") as f:
+                config.write(f)
+            self._signature = None
+
+    def read_history(self):
+        with self._lock:
+            return {section: {"path": path, "code": code} for section, path, code, _ in self._load()}
+
+
+class ProjectRegistry:
+    """SQLite 登记表；legacy_path 指向的 data.ini 会在首次打开时导入一次"""
+
+    def __init__(self, path=DEFAULT_REGISTRY, legacy_path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        if legacy_path is None:
+            legacy_path = os.path.join(os.path.dirname(path), LEGACY_REGISTRY)
+        self.migrate_from_ini(legacy_path)
+
+    def migrate_from_ini(self, ini_path):
+        """从 data.ini 导入（每个文件只导入一次），返回导入的条目数"""
+        with self._lock:
+            done = self.conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from_ini'").fetchone()
+            if done or not os.path.exists(ini_path):
+                return 0
+            rows = read_ini(ini_path)
+            self.conn.execute("BEGIN")
+            for section, path, code, last_modified in rows:
+                self._put(section, path, code, last_modified or _now())
+            self.conn.execute("INSERT INTO meta VALUES ('migrated_from_ini', ?)", (os.path.abspath(ini_path),))
+            self.conn.execute("COMMIT")
+            return len(rows)
+
+    def _put(self, section, file_path, code, last_modified):
+        # 与 data.ini 的行为一致：同一路径或同名段只保留最新一条，并排到最后
+        self.conn.execute("DELETE FROM projects WHERE path = ? OR section = ?", (file_path, section))
+        self.conn.execute("INSERT INTO projects (section, path, code, last_modified) VALUES (?, ?, ?, ?)",
+                          (section, file_path, code, last_modified))
+
+    def get_project_by_code(self, code):
+        with self._lock:
+            row = self.conn.execute("SELECT path FROM projects WHERE code = ? ORDER BY id LIMIT 1", (code,)).fetchone()
+        return row[0] if row else None
+
+    def save_project_code(self, file_path, code):
+        with self._lock:
+            self.conn.execute("BEGIN")
+            self._put(os.path.basename(file_path), file_path, code, _now())
+            self.conn.execute("COMMIT")
+
+    def read_history(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT section, path, code FROM projects ORDER BY id").fetchall()
+        return {section: {"path": path, "code": code} for section, path, code in rows}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def open_registry(path=DEFAULT_REGISTRY):
+    """.ini 路径使用 IniRegistry，其余使用 SQLite 登记表"""
+    if path.lower().endswith(".ini"):
+        return IniRegistry(path)
+    return ProjectRegistry(path)
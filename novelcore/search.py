@@ -0,0 +1,270 @@
+"""全文检索：按字符二元组（bigram）建立的倒排索引，每个项目一个 search.db
+
+正文中每个非空白字符与其后一个字符组成一个二元组（最后一个字符单独成组），
+倒排表记录二元组在各章节中的字符偏移。查询时取查询串的各个二元组，
+按偏移对齐求交得到命中位置，一般不需要再读章节内容；单字查询按前缀范围查找。
+查询串中连续空白的后几个字符不被任何二元组覆盖，这时用 read(章节名) 读出正文逐个核对候选位置。
+ASCII 字母不区分大小写，其它字符原样比较（中文无需分词）。
+
+索引记下每章建立时的版本标记（store.versions()），sync() 只重建变化了的章节、删除已不存在的章节。
+"""
+import json
+import os
+import pathlib
+import sqlite3
+import sys
+import threading
+from array import array
+
+SEARCH_NAME = "search.db"
+SYNC_BATCH = 200  # 每重建这么多章提交一次，中途取消时已完成的部分仍然有效
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    version TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    gram TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    positions BLOB NOT NULL,
+    PRIMARY KEY (gram, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc);
+"""
+
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+_LAST_CHAR = chr(0x10FFFF)
+
+
+def search_path(project_folder):
+    return os.path.join(project_folder, SEARCH_NAME)
+
+
+def normalize(text):
+    """只做不改变长度的规范化，保证偏移与原文一致"""
+    return text.translate(_ASCII_LOWER)
+
+
+def _pack(positions):
+    data = array('I', positions)
+    if sys.byteorder == 'big':
+        data.byteswap()  # 文件中统一为小端，索引可在不同机器间复制
+    return data.tobytes()
+
+
+def _unpack(blob):
+    data = array('I')
+    data.frombytes(blob)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return data
+
+
+def build_postings(text):
+    """二元组 -> 偏移列表"""
+    text = normalize(text)
+    postings = {}
+    for i, gram in enumerate(map(str.__add__, text, text[1:])):
+        if gram[0].isspace():
+            continue
+        positions = postings.get(gram)
+        if positions is None:
+            postings[gram] = [i]
+        else:
+            positions.append(i)
+    if text and not text[-1].isspace():
+        # 最后一个字符单独成组，单字查询也能找到它
+        postings[text[-1]] = [len(text) - 1]
+    return postings
+
+
+class SearchIndex:
+    def __init__(self, path, readonly=False):
+        """readonly 时以只读方式打开已有的索引（跨项目搜索），不建表也不改写文件"""
+        self.path = path
+        self._lock = threading.Lock()
+        if readonly:
+            uri = pathlib.Path(os.path.abspath(path)).as_uri() + "?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None)
+            return
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    # 更新
+    def _doc_id(self, name, version):
+        row = self.conn.execute("SELECT id FROM docs WHERE name = ?", (name,)).fetchone()
+        if row:
+            self.conn.execute("UPDATE docs SET version = ? WHERE id = ?", (version, row[0]))
+            self.conn.execute("DELETE FROM postings WHERE doc = ?", (row[0],))
+            return row[0]
+        return self.conn.execute("INSERT INTO docs (name, version) VALUES (?, ?)", (name, version)).lastrowid
+
+    def _put(self, name, version, text):
+        doc = self._doc_id(name, version)
+        self.conn.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                              ((gram, doc, _pack(positions)) for gram, positions in build_postings(text).items()))
+
+    def _remove(self, name):
+        row = self.conn.execute("SELECT id FROM docs WHERE name = ?", (name,)).fetchone()
+        if row:
+            self.conn.execute("DELETE FROM postings WHERE doc = ?", (row[0],))
+            self.conn.execute("DELETE FROM docs WHERE id = ?", (row[0],))
+
+    def update(self, name, text, version=""):
+        """重建一章的索引"""
+        with self._lock:
+            self.conn.execute("BEGIN")
+            self._put(name, version, text)
+            self.conn.execute("COMMIT")
+
+    def remove(self, name):
+        with self._lock:
+            self.conn.execute("BEGIN")
+            self._remove(name)
+            self.conn.execute("COMMIT")
+
+    def stale(self, versions):
+        """返回 (需要重建的章节名, 需要删除的章节名)"""
+        with self._lock:
+            known = dict(self.conn.execute("SELECT name, version FROM docs"))
+        changed = [name for name, version in versions.items() if known.get(name) != json.dumps(version)]
+        removed = [name for name in known if name not in versions]
+        return changed, removed
+
+    def sync(self, store, progress=None):
+        """按 store 当前的章节版本增量更新，返回 (重建章数, 删除章数)
+
+        progress(已完成, 总数) 抛出异常（取消）或出错时，已提交的批次保留，未提交的部分回滚，
+        下次 sync 从剩下的章节继续；不会留下版本已更新而倒排表不完整的章节。
+        """
+        versions = store.versions()
+        changed, removed = self.stale(versions)
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                for name in removed:
+                    self._remove(name)
+                for done, name in enumerate(changed, 1):
+                    content = store.get(name)
+                    if content is not None:
+                        self._put(name, json.dumps(versions.get(name)), content)
+                    if done % SYNC_BATCH == 0:
+                        self.conn.execute("COMMIT")
+                        self.conn.execute("BEGIN")
+                    if progress:
+                        progress(done, len(changed))
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+        return len(changed), len(removed)
+
+    # 查询
+    def _postings(self, gram):
+        """{文档 ID: 偏移数组}；单字符时合并所有以它开头的二元组"""
+        if len(gram) == 2:
+            rows = self.conn.execute("SELECT doc, positions FROM postings WHERE gram = ?", (gram,))
+            return {doc: _unpack(blob) for doc, blob in rows}
+        result = {}
+        rows = self.conn.execute("SELECT doc, positions FROM postings WHERE gram >= ? AND gram <= ?",
+                                 (gram, gram + _LAST_CHAR))
+        for doc, blob in rows:
+            result.setdefault(doc, array('I')).extend(_unpack(blob))
+        for positions in result.values():
+            positions[:] = array('I', sorted(positions))
+        return result
+
+    def search(self, query, read=None):
+        """返回 {章节名: [命中的字符偏移]}（不保证顺序，由调用方排序、截断）
+
+        查询串含连续空白时需要提供 read(章节名) -> 正文，用来核对索引覆盖不到的字符。
+        """
+        query = normalize(query.strip())
+        if not query:
+            return {}
+        # (查询串中的偏移, 二元组)；空白字符开头的二元组不在索引中
+        grams = [(j, query[j:j + 2]) for j in range(len(query) - 1) if not query[j].isspace()]
+        if not query[-1].isspace() and (len(query) == 1 or query[-2].isspace()):
+            grams.append((len(query) - 1, query[-1]))
+        # 前一个字符也是空白时，这个空白字符不在任何二元组中，索引无法确认
+        unchecked = [k for k in range(1, len(query)) if query[k].isspace() and query[k - 1].isspace()]
+        if unchecked and read is None:
+            raise ValueError("查询串含连续空白，需要提供 read 核对正文")
+
+        with self._lock:
+            lists = []
+            for j, gram in grams:
+                postings = self._postings(gram)
+                if not postings:
+                    return {}
+                lists.append((j, postings))
+            # 从最少的倒排表开始求交
+            lists.sort(key=lambda item: len(item[1]))
+            first_offset, first = lists[0]
+            hits = {}
+            for doc, positions in first.items():
+                starts = {p - first_offset for p in positions}
+                for j, postings in lists[1:]:
+                    other = postings.get(doc)
+                    if other is None:
+                        starts = None
+                        break
+                    starts.intersection_update(p - j for p in other)
+                    if not starts:
+                        break
+                if starts:
+                    hits[doc] = sorted(starts)
+            if not hits:
+                return {}
+            names = {}
+            ids = list(hits)
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                names.update(self.conn.execute(
+                    f"SELECT id, name FROM docs WHERE id IN ({','.join('?' * len(chunk))})", chunk))
+        result = {names[doc]: positions for doc, positions in hits.items()}
+        if unchecked:
+            result = _verify(result, query, unchecked, read)
+        return result
+
+
+def _verify(hits, query, unchecked, read):
+    """逐个核对索引覆盖不到的字符，去掉不匹配的候选位置"""
+    verified = {}
+    for name, positions in hits.items():
+        text = read(name)
+        if not text:
+            continue
+        kept = [p for p in positions
+                if all(p + k < len(text) and normalize(text[p + k]) == query[k] for k in unchecked)]
+        if kept:
+            verified[name] = kept
+    return verified
+
+
+def open_index(project_folder, readonly=False):
+    return SearchIndex(search_path(project_folder), readonly)
+
+
+def line_of(text, position):
+    """字符偏移 -> (行号从0开始, 列)"""
+    line = text.count('\n', 0, position)
+    return line, position - (text.rfind('\n', 0, position) + 1)
+
+
+def snippet(text, position, length, context=20):
+    """命中位置附近的一段文字（换成空格的单行）"""
+    start = max(0, position - context)
+    return text[start:position + length + context].replace('\n', ' ')
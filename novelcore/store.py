@@ -0,0 +1,233 @@
+"""文件夹布局的项目存储：每章一个 .txt + config.ini
+
+章节内容按需加载：只在访问时读取章节文件，LRU 缓存按字符数限额，并用 mtime/大小校验缓存是否过期。
+packed.PackedStore 提供相同接口的单文件存储。
+"""
+import contextlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from .merge import atomic_write
+from .profiling import count, stage
+from .viewer import TextSource, open_source
+
+CONFIG_NAME = "config.ini"
+DEFAULT_CACHE_CHARS = 32 * 1024 * 1024
+
+
+def write_chapter_order(config_path, chapter_names, extra_sections=None):
+    """写入 config.ini；extra_sections 为需要原样保留的其它段（如 [HeadingRules]）"""
+    import configparser  # 延迟导入
+
+    config = configparser.ConfigParser(interpolation=None)
+    config["ChapterOrder"] = {}
+
+    for i, name in enumerate(chapter_names):
+        config["ChapterOrder"][str(i+1)] = name
+
+    for section, values in (extra_sections or {}).items():
+        config[section] = values
+
+    # 先写临时文件再原子替换，中途崩溃不会留下半个 config.ini
+    with stage("config_write"), atomic_write(config_path, buffering=-1) as raw:
+        f = io.TextIOWrapper(raw, encoding='utf-8')
+        config.write(f)
+        f.flush()
+        f.detach()
+
+
+def read_project_config(config_path):
+    """读取 config.ini，返回 (章节顺序, 其它段)"""
+    if not os.path.exists(config_path):
+        return [], {}
+
+    import configparser  # 延迟导入
+    config = configparser.ConfigParser(interpolation=None)
+    with stage("config_read"):
+        config.read(config_path, encoding='utf-8')
+
+    extra_sections = {section: dict(config[section]) for section in config.sections() if section != "ChapterOrder"}
+    if "ChapterOrder" not in config:
+        return [], extra_sections
+
+    chapter_order = []
+    for key in sorted(config["ChapterOrder"], key=lambda k: int(k)):
+        chapter_order.append(config["ChapterOrder"][key])
+
+    return chapter_order, extra_sections
+
+
+def read_chapter_order(config_path):
+    return read_project_config(config_path)[0]
+
+
+class ChapterStore:
+    """可当作 {章节名: 内容} 字典使用（get / [] / in / pop），但不会一次性读入所有章节"""
+
+    packed = False
+    shared = False
+
+    def __init__(self, project_folder, max_chars=DEFAULT_CACHE_CHARS):
+        self.project_folder = project_folder
+        self.max_chars = max_chars
+        self._cache = OrderedDict()  # 章节名 -> (mtime_ns, size, 内容)
+        self._chars = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def location(self):
+        return self.project_folder
+
+    @property
+    def config_path(self):
+        return os.path.join(self.project_folder, CONFIG_NAME)
+
+    def path(self, chapter_name):
+        return os.path.join(self.project_folder, f"{chapter_name}.txt")
+
+    def read_config(self):
+        return read_project_config(self.config_path)
+
+    def write_config(self, chapter_order, extra_sections=None):
+        write_chapter_order(self.config_path, chapter_order, extra_sections)
+
+    def config_version(self):
+        """config.ini 的版本标记 [mtime_ns, 大小]，不存在时为 None"""
+        try:
+            st = os.stat(self.config_path)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def batch(self):
+        """批量写入的事务范围（文件夹布局无需事务）"""
+        return contextlib.nullcontext()
+
+    def close(self):
+        self.clear()
+
+    def _store(self, chapter_name, st, content):
+        self._drop(chapter_name)
+        self._cache[chapter_name] = (st.st_mtime_ns, st.st_size, content)
+        self._chars += len(content)
+        # 淘汰最久未用的章节，但至少保留刚放入的这一章
+        while self._chars > self.max_chars and len(self._cache) > 1:
+            _, (_, _, old) = self._cache.popitem(last=False)
+            self._chars -= len(old)
+
+    def _drop(self, chapter_name):
+        entry = self._cache.pop(chapter_name, None)
+        if entry:
+            self._chars -= len(entry[2])
+
+    def get(self, chapter_name, default=None):
+        chapter_path = self.path(chapter_name)
+        try:
+            st = os.stat(chapter_path)
+        except OSError:
+            with self._lock:
+                self._drop(chapter_name)
+            return default
+
+        with self._lock:
+            entry = self._cache.get(chapter_name)
+            if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                self._cache.move_to_end(chapter_name)
+                self.hits += 1
+                return entry[2]
+
+        with open(chapter_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        count("chapter_reads")
+        with self._lock:
+            self.misses += 1
+            self._store(chapter_name, st, content)
+        return content
+
+    def __getitem__(self, chapter_name):
+        content = self.get(chapter_name)
+        if content is None:
+            raise KeyError(chapter_name)
+        return content
+
+    def __contains__(self, chapter_name):
+        return os.path.exists(self.path(chapter_name))
+
+    def open_source(self, chapter_name):
+        """按行访问章节（mmap，不整章读入）；用完后需 close()"""
+        chapter_path = self.path(chapter_name)
+        if not os.path.exists(chapter_path):
+            return TextSource('')
+        return open_source(chapter_path)
+
+    def write(self, chapter_name, content, cache=True):
+        """写入章节文件；cache 为 True 时同时放入缓存"""
+        chapter_path = self.path(chapter_name)
+        with stage("chapter_write"), open(chapter_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        count("files_written")
+        count("chars_written", len(content))
+        with self._lock:
+            if cache:
+                self._store(chapter_name, os.stat(chapter_path), content)
+            else:
+                self._drop(chapter_name)
+
+    def delete(self, chapter_name):
+        """删除章节文件"""
+        self.pop(chapter_name)
+        chapter_path = self.path(chapter_name)
+        if os.path.exists(chapter_path):
+            os.remove(chapter_path)
+
+    def names(self):
+        """项目文件夹中实际存在的章节名"""
+        return [entry.name[:-4] for entry in os.scandir(self.project_folder)
+                if entry.is_file() and entry.name.endswith(".txt")]
+
+    def versions(self):
+        """章节名 -> 版本标记 [mtime_ns, 大小]，内容变化时标记随之变化"""
+        versions = {}
+        for entry in os.scandir(self.project_folder):
+            if entry.name.endswith(".txt") and entry.is_file():
+                st = entry.stat()
+                versions[entry.name[:-4]] = [st.st_mtime_ns, st.st_size]
+        return versions
+
+    def read_meta(self, key, default=None):
+        """读取项目附带的元数据（保存为项目文件夹中的 <key>.json）"""
+        try:
+            with open(os.path.join(self.project_folder, f"{key}.json"), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return default
+
+    def write_meta(self, key, value):
+        meta_path = os.path.join(self.project_folder, f"{key}.json")
+        # json.dumps 走 C 编码器，比 json.dump 逐段写入快一个数量级
+        with stage("meta_write"), open(meta_path + ".tmp", 'w', encoding='utf-8') as f:
+            f.write(json.dumps(value, ensure_ascii=False))
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def pop(self, chapter_name, default=None):
+        """只移出缓存，不删除文件"""
+        with self._lock:
+            entry = self._cache.pop(chapter_name, None)
+            if entry is None:
+                return default
+            self._chars -= len(entry[2])
+            return entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._chars = 0
+
+    @property
+    def cached_chars(self):
+        return self._chars
@@ -0,0 +1,151 @@
+"""后台任务：在线程池中运行耗时操作，日志/进度/结果经队列交回调用方线程
+
+界面代码定时调用 TaskRunner.poll()（例如 root.after），所有回调都在 poll 所在线程执行，
+因此回调里可以直接操作 Tk 控件。任务函数的第一个参数是 TaskContext。
+"""
+import itertools
+import queue
+import threading
+
+from .logs import ERROR, INFO
+
+
+class Cancelled(Exception):
+    """任务被取消；由 TaskContext.check / progress 抛出"""
+
+
+class TaskContext:
+    def __init__(self, task):
+        self._task = task
+
+    @property
+    def cancelled(self):
+        return self._task.cancel_event.is_set()
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled(self._task.name)
+
+    def log(self, message, level=INFO):
+        self._task.runner._events.put(("log", self._task, (message, level)))
+
+    def progress(self, done, total=None):
+        """报告进度；任务已被取消时抛出 Cancelled，便于在循环中及时退出"""
+        self._task.runner._events.put(("progress", self._task, (done, total)))
+        self.check()
+
+
+class Task:
+    def __init__(self, runner, task_id, name, on_done, on_error):
+        self.runner = runner
+        self.id = task_id
+        self.name = name
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.done = False
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+
+class TaskRunner:
+    """max_workers 默认为 1：修改同一项目的任务按提交顺序串行执行"""
+
+    def __init__(self, max_workers=1, on_log=None, on_progress=None, on_idle=None):
+        self._max_workers = max_workers
+        self._executor = None  # 第一次提交任务时创建（concurrent.futures 延迟导入）
+        self._events = queue.Queue()
+        self._ids = itertools.count(1)
+        self._active = {}
+        self.on_log = on_log  # (task, message, level)
+        self.on_progress = on_progress  # (task, done, total)
+        self.on_idle = on_idle  # 所有任务结束时
+
+    @property
+    def busy(self):
+        return bool(self._active)
+
+    @property
+    def active(self):
+        return list(self._active.values())
+
+    def submit(self, fn, *args, name=None, on_done=None, on_error=None):
+        """提交任务 fn(ctx, *args)；on_done(result) / on_error(exc) 在 poll() 所在线程调用"""
+        task = Task(self, next(self._ids), name or getattr(fn, "__name__", "task"), on_done, on_error)
+        ctx = TaskContext(task)
+
+        def run():
+            try:
+                ctx.check()
+                result = fn(ctx, *args)
+            except BaseException as e:
+                self._events.put(("error", task, e))
+            else:
+                self._events.put(("done", task, result))
+
+        self._active[task.id] = task
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="novel-task")
+        task.future = self._executor.submit(run)
+        return task
+
+    def cancel_all(self):
+        for task in self.active:
+            task.cancel()
+
+    def wait(self, timeout=None):
+        """阻塞等待已提交的任务结束，返回是否全部结束；结果仍由之后的 poll() 交付"""
+        futures = [task.future for task in self._active.values() if task.future is not None]
+        if not futures:
+            return True
+        from concurrent.futures import wait
+
+        _, pending = wait(futures, timeout)
+        return not pending
+
+    def poll(self, max_events=500):
+        """处理已到达的事件，返回处理的条数；必须在界面线程调用"""
+        handled = 0
+        while handled < max_events:
+            try:
+                kind, task, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            handled += 1
+            if kind == "log":
+                if self.on_log:
+                    self.on_log(task, *payload)
+            elif kind == "progress":
+                if self.on_progress:
+                    self.on_progress(task, *payload)
+            else:
+                task.done = True
+                self._active.pop(task.id, None)
+                if kind == "done":
+                    if task.on_done:
+                        task.on_done(payload)
+                elif task.on_error:
+                    task.on_error(payload)
+                elif not isinstance(payload, Cancelled) and self.on_log:
+                    self.on_log(task, f"任务 {task.name} 出错: {payload}", ERROR)
+                if not self._active and self.on_idle:
+                    self.on_idle()
+        # 排队中就被取消的任务不会运行，也不会产生事件
+        for task in [t for t in self._active.values() if t.future is not None and t.future.cancelled()]:
+            self._active.pop(task.id, None)
+            if not self._active and self.on_idle:
+                self.on_idle()
+        return handled
+
+    def shutdown(self, cancel=True, wait=False):
+        """cancel 时通知运行中的任务退出；wait 时等待其结束（任务需在 progress/check 处响应取消）"""
+        if cancel:
+            self.cancel_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=cancel)
@@ -0,0 +1,180 @@
+"""大章节的分页查看与编辑：按行读取章节，修改以行为单位记在 piece table 中
+
+MmapSource 对章节文件做只读 mmap，只建立行起点索引，取哪几行才解码哪几行；
+TextSource 包装内存中的字符串（打包格式从 SQLite 读出的内容）。
+LinePieceTable 在原文之上叠加修改：替换某段行只新增一个片段，不复制原文，
+需要保存时再用 text() 拼出完整内容。
+select_window 按行数和字符数选出界面中实际插入的行，避免一次插入几 MB 的超长行。
+"""
+import mmap
+import os
+from array import array
+
+
+class LineBuffer:
+    """按行访问的内存缓冲区；piece table 中新增的行也存放在这里"""
+
+    def __init__(self, lines):
+        self._lines = list(lines)
+
+    @property
+    def line_count(self):
+        return len(self._lines)
+
+    def lines(self, start, end):
+        return self._lines[start:end]
+
+    def close(self):
+        pass
+
+
+class TextSource(LineBuffer):
+    """内存字符串按行访问"""
+
+    def __init__(self, text):
+        super().__init__(text.split('\n'))
+
+
+class MmapSource:
+    """UTF-8 章节文件的只读映射；行起点索引为 array，文件再大也只占 8 字节/行"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+        self._starts = array('q', [0])
+        find = self._map.find
+        pos = find(b'\n')
+        while pos != -1:
+            self._starts.append(pos + 1)
+            pos = find(b'\n', pos + 1)
+
+    @property
+    def line_count(self):
+        return len(self._starts)
+
+    def lines(self, start, end):
+        end = min(end, len(self._starts))
+        if start >= end:
+            return []
+        begin = self._starts[start]
+        stop = self._starts[end] - 1 if end < len(self._starts) else len(self._map)
+        text = self._map[begin:stop].decode('utf-8', errors='replace')
+        # 文本模式写出的章节在 Windows 上是 \r\n，与读取时的通用换行保持一致
+        return [line[:-1] if line.endswith('\r') else line for line in text.split('\n')]
+
+    def close(self):
+        # Windows 上映射中的文件不能被改写或删除，写入章节前必须先关闭
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+
+
+def open_source(path):
+    """打开章节文件；空文件无法 mmap，直接用空文本"""
+    if os.path.getsize(path) == 0:
+        return TextSource('')
+    return MmapSource(path)
+
+
+class LinePieceTable:
+    """以行为单位的 piece table：pieces 为 [(缓冲区, 起始行, 行数)]，缓冲区为原文或新增的行"""
+
+    def __init__(self, source):
+        self.source = source
+        count = source.line_count
+        self.pieces = [(source, 0, count)] if count else []
+        self.line_count = count
+        self.modified = False
+
+    def _split(self, line):
+        """保证有片段恰好从 line 行开始，返回该片段的下标"""
+        position = 0
+        for i, (buffer, start, count) in enumerate(self.pieces):
+            if line == position:
+                return i
+            if line < position + count:
+                offset = line - position
+                self.pieces[i:i + 1] = [(buffer, start, offset), (buffer, start + offset, count - offset)]
+                return i + 1
+            position += count
+        return len(self.pieces)
+
+    def lines(self, start, end):
+        end = min(end, self.line_count)
+        result = []
+        position = 0
+        for buffer, piece_start, count in self.pieces:
+            if position >= end:
+                break
+            if position + count > start:
+                lo = max(start, position) - position
+                hi = min(end, position + count) - position
+                result.extend(buffer.lines(piece_start + lo, piece_start + hi))
+            position += count
+        return result
+
+    def replace_lines(self, start, end, new_lines):
+        """把 [start, end) 行替换为 new_lines"""
+        end = min(end, self.line_count)
+        i = self._split(start)
+        j = self._split(end)
+        self.pieces[i:j] = [(LineBuffer(new_lines), 0, len(new_lines))] if new_lines else []
+        self.line_count += len(new_lines) - (end - start)
+        self.modified = True
+
+    def text(self):
+        return '\n'.join(self.lines(0, self.line_count))
+
+    def close(self):
+        self.source.close()
+
+
+def select_window(table, start, anchor, max_lines, max_chars, block=64):
+    """选出要显示的行：最多 max_lines 行、约 max_chars 个字符，且一定包含 anchor 行
+
+    返回 (起始行, 结束行, 行列表, 是否截断)。anchor 行本身超过 max_chars 时只取其开头，
+    此时窗口只有这一行，截断为 True（调用方应禁止编辑，否则保存时会丢掉被截去的部分）。
+    行按块读取，遇到超长的行不会把整个 max_lines 行都解码出来。
+    """
+    count = table.line_count
+    start = max(0, min(start, count - max_lines))
+    end = min(count, start + max_lines)
+    if start >= end:
+        return start, start, [], False
+    anchor = max(start, min(anchor, end - 1))
+    first = table.lines(anchor, anchor + 1)[0]
+    if len(first) > max_chars:
+        return anchor, anchor + 1, [first[:max_chars]], True
+
+    size = len(first)
+    lo, hi = anchor, anchor + 1
+    before, after = [], []
+
+    def extend(lines, into, limit):
+        """把 lines 依次加入 into，直到总字符数将超过 limit；返回加入的行数与是否已满"""
+        nonlocal size
+        for n, line in enumerate(lines):
+            if size + len(line) + 1 > limit:
+                return n, True
+            size += len(line) + 1
+            into.append(line)
+        return len(lines), False
+
+    # 先向上取至多一半的额度，再向下取，剩余的额度最后留给上方
+    for limit, backward in ((max_chars // 2, True), (max_chars, False), (max_chars, True)):
+        full = False
+        while not full and (lo > start if backward else hi < end):
+            if backward:
+                added, full = extend(table.lines(max(start, lo - block), lo)[::-1], before, limit)
+                lo -= added
+            else:
+                added, full = extend(table.lines(hi, min(end, hi + block)), after, limit)
+                hi += added
+    before.reverse()
+    return lo, hi, before + [first] + after, False
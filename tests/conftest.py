@@ -0,0 +1,5 @@
+"""测试直接导入仓库中的 novelcore（未安装为包）"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
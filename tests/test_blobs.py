@@ -0,0 +1,114 @@
+"""共享存储：项目文件夹移动/复制后引用仍然有效，事务回滚不丢对象，引用表丢失可重建"""
+import os
+import shutil
+
+import pytest
+
+from novelcore.blobs import BLOB_DIR_NAME, SharedStore, read_marker, share_folder, unshare_folder
+from novelcore.store import ChapterStore
+
+
+def make_project(projects, name, chapters):
+    store = SharedStore(os.path.join(projects, name))
+    with store.batch():
+        for chapter_name, content in chapters.items():
+            store.write(chapter_name, content)
+    store.write_config(list(chapters))
+    return store
+
+
+def test_move_projects_folder(tmp_path):
+    projects = str(tmp_path / "projects")
+    make_project(projects, "a", {"一": "甲", "二": "乙"}).close()
+
+    moved = str(tmp_path / "moved")
+    shutil.move(projects, moved)
+    store = SharedStore(os.path.join(moved, "a"))
+    assert store.get("一") == "甲"
+    assert store.get("二") == "乙"
+    # 移动后原位置已不存在，gc 不能把这个项目的引用当作已删除
+    assert store.pool.gc() == 0
+    assert store.get("二") == "乙"
+    store.close()
+
+
+def test_copied_project_is_independent(tmp_path):
+    projects = str(tmp_path / "projects")
+    original = make_project(projects, "a", {"一": "甲"})
+    shutil.copytree(original.project_folder, os.path.join(projects, "b"))
+
+    copy = SharedStore(os.path.join(projects, "b"))
+    assert copy.project_key != original.project_key
+    assert read_marker(copy.project_folder)["id"] == copy.project_key
+    copy.write("一", "改过")
+    assert original.versions() != copy.versions()
+    assert original.get("一") == "甲"
+    assert copy.get("一") == "改过"
+    original.close()
+    copy.close()
+
+
+def test_rollback_keeps_released_object(tmp_path):
+    store = make_project(str(tmp_path), "a", {"一": "旧内容"})
+    old_path = store.path("一")
+
+    with pytest.raises(RuntimeError):
+        with store.batch():
+            store.write("一", "新内容")
+            store.delete("一")
+            raise RuntimeError("中途失败")
+
+    assert store.path("一") == old_path
+    assert os.path.exists(old_path)
+    assert store.get("一") == "旧内容"
+    store.close()
+
+
+def test_released_object_removed_after_commit(tmp_path):
+    store = make_project(str(tmp_path), "a", {"一": "旧内容"})
+    old_path = store.path("一")
+    with store.batch():
+        store.write("一", "新内容")
+        assert os.path.exists(old_path)  # 提交前仍在
+    assert not os.path.exists(old_path)
+    assert store.get("一") == "新内容"
+    store.close()
+
+
+def test_rebuild_refs_from_config(tmp_path):
+    projects = str(tmp_path)
+    make_project(projects, "a", {"一": "甲", "二": "乙"}).close()  # 最后一个使用者关闭后引用表连接也关闭
+    root = os.path.join(projects, BLOB_DIR_NAME)
+    for name in os.listdir(root):
+        if name.startswith("refs.db"):
+            os.remove(os.path.join(root, name))
+
+    store = SharedStore(os.path.join(projects, "a"))
+    assert store.get("一") == "甲"
+    assert store.get("二") == "乙"
+    store.close()
+
+
+def test_share_and_unshare_migrate_metadata(tmp_path):
+    folder = str(tmp_path / "a")
+    os.makedirs(folder)
+    store = ChapterStore(folder)
+    for name in ("一", "二"):
+        store.write(name, f"{name}的内容")
+    store.write_config(["一", "二"])
+    versions = store.versions()
+    store.write_meta("merge_index", {"output_path": None, "signature": None, "code": None,
+                                     "entries": [[name, 0, 1, versions[name]] for name in ("一", "二")]})
+    store.write_meta("manifest", {"format": 1})
+
+    share_folder(folder)
+    shared = SharedStore(folder)
+    hashes = shared.versions()
+    assert [entry[3] for entry in shared.read_meta("merge_index")["entries"]] == [hashes["一"], hashes["二"]]
+    assert shared.read_meta("manifest") is None
+    shared.close()
+
+    unshare_folder(folder)
+    versions = ChapterStore(folder).versions()
+    entries = ChapterStore(folder).read_meta("merge_index")["entries"]
+    assert [entry[3] for entry in entries] == [versions["一"], versions["二"]]
@@ -0,0 +1,81 @@
+"""导入时的重复章节检测：flag / skip / off 三种策略，以及报告中的章节名"""
+import random
+
+import pytest
+
+from novelcore.dedup import fingerprint, similarity
+from novelcore.engine import Project
+
+
+def body(seed, count=40):
+    rng = random.Random(seed)
+    words = "天地玄黄宇宙洪荒日月盈昃辰宿列张寒来暑往秋收冬藏闰余成岁律吕调阳云腾致雨露结为霜"
+    return '\n'.join(''.join(rng.choice(words) for _ in range(12)) + "。" for _ in range(count))
+
+
+def with_ads(text):
+    return "本书首发某某网，请记住网址。\n" + text.replace("。\n", "！\n", 3) + "\n求月票求推荐票。"
+
+
+def new_project(tmp_path, packed, policy):
+    folder = tmp_path / "project"
+    folder.mkdir()
+    project = Project(str(folder), packed=packed)
+    project.import_chapters([("第1章 开始", body(1)), ("第2章 继续", body(2))])
+    project.duplicate_policy = policy
+    return project
+
+
+def test_near_duplicate_similarity():
+    assert fingerprint(body(1))[0] == fingerprint(body(1).replace("\n", "\n\n  "))[0]
+    assert similarity(fingerprint(body(1))[1], fingerprint(with_ads(body(1)))[1]) >= 0.8
+    assert similarity(fingerprint(body(1))[1], fingerprint(body(3))[1]) < 0.5
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_flag_keeps_chapter_and_reports_final_name(tmp_path, packed):
+    project = new_project(tmp_path, packed, "flag")
+    try:
+        added = project.add_chapters([("第1章 开始", with_ads(body(1))), ("第3章 新", body(3))])
+        assert added == ["开始-1", "新"]
+        assert [(new, old, skip) for new, old, _, skip in project.duplicates] == [("开始-1", "开始", False)]
+        assert project.chapter_order == ["开始", "继续", "开始-1", "新"]
+    finally:
+        project.close()
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_skip_does_not_write_or_claim_name(tmp_path, packed):
+    project = new_project(tmp_path, packed, "skip")
+    try:
+        added = project.add_chapters([("第2章 继续", body(2)), ("第2章 继续", body(4))])
+        assert added == ["继续-1"]  # 跳过的章节不占用 "继续-1"
+        assert [(new, old, skip) for new, old, _, skip in project.duplicates] == [("继续-1", "继续", True)]
+        assert project.chapter_order == ["开始", "继续", "继续-1"]
+        assert project.chapter_contents.get("继续-1") == body(4)
+    finally:
+        project.close()
+
+
+def test_off_adds_everything(tmp_path):
+    project = new_project(tmp_path, False, "off")
+    try:
+        assert project.add_chapters([("第1章 开始", body(1))]) == ["开始-1"]
+        assert project.duplicates == []
+    finally:
+        project.close()
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_fingerprints_persist_across_reopen(tmp_path, packed):
+    project = new_project(tmp_path, packed, "flag")
+    project.add_chapters([("第3章 新", body(3))])
+    project.close()
+
+    project = Project(str(tmp_path / "project"), packed=packed)
+    try:
+        project.duplicate_policy = "skip"
+        assert project.add_chapters([("第9章 又一次", with_ads(body(3)))]) == []
+        assert project.duplicates[0][1] == "新"
+    finally:
+        project.close()
@@ -0,0 +1,73 @@
+"""编码检测与缓存：常见编码的判断、按大小和修改时间失效、多进程批量导入后统一保存"""
+import codecs
+import os
+
+import pytest
+
+from novelcore import encoding
+from novelcore.batch import iter_split_files
+from novelcore.encoding import EncodingCache, detect_file_encoding
+from novelcore.headings import DEFAULT_MATCHER
+
+TEXT = "第1章 开始\n这是一段中文正文，用来检测编码。\n" * 20
+
+
+def write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return str(path)
+
+
+@pytest.mark.parametrize("data, expected", [
+    (TEXT.encode('utf-8'), 'utf-8'),
+    (codecs.BOM_UTF8 + TEXT.encode('utf-8'), 'utf-8-sig'),
+    (TEXT.encode('utf-16'), 'utf-16'),
+    (TEXT.encode('gb18030'), 'gb18030'),
+], ids=["utf-8", "bom", "utf-16", "gb18030"])
+def test_detect(tmp_path, data, expected):
+    path = write(tmp_path / "a.txt", data)
+    assert detect_file_encoding(path, EncodingCache()) == expected
+
+
+def test_cache_persists_and_invalidates(tmp_path):
+    cache_path = str(tmp_path / "encodings.json")
+    path = write(tmp_path / "a.txt", TEXT.encode('gb18030'))
+    detect_file_encoding(path, EncodingCache(cache_path))
+
+    reopened = EncodingCache(cache_path)
+    assert reopened.get(EncodingCache.key(path)) == 'gb18030'
+    write(path, TEXT.encode('utf-8') + b"x")  # 大小变了
+    assert reopened.get(EncodingCache.key(path)) is None
+    assert detect_file_encoding(path, reopened) == 'utf-8'
+
+
+def test_save_merges_other_writers(tmp_path):
+    cache_path = str(tmp_path / "encodings.json")
+    first, second = EncodingCache(cache_path), EncodingCache(cache_path)
+    a = write(tmp_path / "a.txt", b"a")
+    b = write(tmp_path / "b.txt", b"b")
+    first.put(EncodingCache.key(a), 'utf-8')
+    second.put(EncodingCache.key(b), 'gb18030')
+    merged = EncodingCache(cache_path)
+    assert merged.get(EncodingCache.key(a)) == 'utf-8'
+    assert merged.get(EncodingCache.key(b)) == 'gb18030'
+
+
+def test_deferred_saves_once(tmp_path):
+    cache_path = str(tmp_path / "encodings.json")
+    cache = EncodingCache(cache_path)
+    with cache.deferred():
+        cache.put(EncodingCache.key(write(tmp_path / "a.txt", b"a")), 'utf-8')
+        assert not os.path.exists(cache_path)
+    assert os.path.exists(cache_path)
+
+
+def test_batch_workers_report_encodings(tmp_path, monkeypatch):
+    monkeypatch.setattr(encoding, "default_cache", EncodingCache(str(tmp_path / "encodings.json")))
+    paths = [write(tmp_path / f"{i}.txt", TEXT.encode('gb18030' if i % 2 else 'utf-8')) for i in range(4)]
+    results = list(iter_split_files(paths, DEFAULT_MATCHER, workers=2))
+    assert all(len(chapters) == 20 for _, chapters in results)
+
+    saved = EncodingCache(str(tmp_path / "encodings.json"))
+    for i, path in enumerate(paths):
+        assert saved.get(EncodingCache.key(path)) == ('gb18030' if i % 2 else 'utf-8')
@@ -0,0 +1,62 @@
+"""章节标题规则：整块 finditer 与逐行判断一致，默认规则的清理结果与旧版一致"""
+import re
+
+import pytest
+
+from novelcore.engine import split_into_chapters
+from novelcore.headings import BUILTIN_RULES, DEFAULT_MATCHER, build_matcher, load_matcher
+
+LINES = ["第1章 开始", "  第二十章：标题", "正文", "正文：尾声", "第3卷 上", "第12节", "第五回 回目",
+         "Chapter 7", "chapter12: x", "CHAPTER\t3", "12. 列表", "3、 项", "123.", "99999. 超", "内容",
+         "第几章", "x第4章", "", " \t"]
+
+
+def legacy_clean(name):
+    """旧版 NovelMergerApp.clean_chapter_name"""
+    cleaned = re.sub(r"^第(\d+|[一二三四五六七八九十百千万]+)章[:：\s]*", "", name)
+    cleaned = re.sub(r"^正文[:：\s]*", "", cleaned)
+    cleaned = cleaned.strip()
+    if not cleaned:
+        cleaned = "未知章节"
+    return cleaned
+
+
+def per_line_split(content, matcher):
+    chapters = []
+    name, body = None, []
+    for line in content.split('\n'):
+        if matcher.is_heading(line.strip()):
+            if name is not None:
+                chapters.append((name, '\n'.join(body)))
+            name, body = line.strip(), []
+        else:
+            body.append(line)
+    if name is not None:
+        chapters.append((name, '\n'.join(body)))
+    return chapters
+
+
+@pytest.mark.parametrize("names", [("chapter", "zhengwen"), tuple(BUILTIN_RULES), ("english",), ("numbered", "volume")])
+def test_finditer_matches_per_line(names):
+    matcher = build_matcher(names)
+    content = '\n'.join(LINES * 2)
+    assert split_into_chapters(content, matcher) == per_line_split(content, matcher)
+
+
+def test_default_clean_matches_legacy():
+    for line in LINES:
+        assert DEFAULT_MATCHER.clean(line.strip()) == legacy_clean(line.strip())
+
+
+def test_custom_rule_from_config(tmp_path):
+    config = tmp_path / "config.ini"
+    config.write_text("[HeadingRules]\nenabled = chapter\npart = Part\\s+\\d+\n", encoding="utf-8")
+    matcher = load_matcher(str(config))
+    chapters = split_into_chapters("前言\nPart 1 起\n甲\n正文\n第2章 乙\n丙", matcher)
+    assert chapters == [("Part 1 起", "甲\n正文"), ("第2章 乙", "丙")]
+    assert matcher.clean("Part 1 起") == "起"
+
+
+def test_unknown_rule_rejected():
+    with pytest.raises(ValueError):
+        build_matcher(["nope"])
@@ -0,0 +1,68 @@
+"""追加导入：中途取消时已写入的章节仍然记入章节顺序"""
+import pytest
+
+from novelcore.engine import Project
+from novelcore.packed import open_store
+from novelcore.tasks import Cancelled
+
+
+def write_novel(path, count):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(1, count + 1):
+            f.write(f"第{i}章 标题{i}\n第{i}章的内容。\n")
+
+
+def cancel_after(limit):
+    def progress(done, total=None):
+        if total is None and done >= limit:
+            raise Cancelled("导入")
+    return progress
+
+
+@pytest.mark.parametrize("packed", [False, True])
+@pytest.mark.parametrize("autoflush", [True, False])
+def test_cancel_mid_file_keeps_order(tmp_path, packed, autoflush):
+    novel = tmp_path / "novel.txt"
+    write_novel(novel, 10)
+    (tmp_path / "project").mkdir()
+    project = Project(str(tmp_path / "project"), packed=packed)
+    project.import_chapters([("第0章 开头", "开头")])
+    project.autoflush = autoflush
+    project.progress = cancel_after(3)
+
+    with pytest.raises(Cancelled):
+        project.add_files([str(novel)], workers=1)
+
+    store = open_store(project.project_folder)
+    try:
+        chapter_order, _ = store.read_config()
+        assert len(chapter_order) == 4
+        assert chapter_order == list(project.chapter_order)
+        assert sorted(store.names()) == sorted(chapter_order)
+    finally:
+        store.close()
+    project.close()
+
+
+def test_packed_import_commits_in_segments(tmp_path):
+    # 导入过程中已写入的章节分段提交，其它连接（或线程）不必等到整个文件导入完
+    import sqlite3
+
+    from novelcore.engine import COMMIT_CHAPTERS
+
+    (tmp_path / "project").mkdir()
+    project = Project(str(tmp_path / "project"), packed=True)
+    project.import_chapters([("第0章 开头", "开头")])
+    seen = []
+
+    def chapters():
+        for i in range(1, COMMIT_CHAPTERS + 10):
+            if i == COMMIT_CHAPTERS + 5:
+                conn = sqlite3.connect(project.chapter_contents.db_path)
+                seen.append(conn.execute("SELECT COUNT(*) FROM chapters").fetchone()[0])
+                conn.close()
+            yield f"第{i}章 标题", f"内容{i}"
+
+    project.add_chapters(chapters())
+    assert seen == [COMMIT_CHAPTERS + 1]
+    project.close()
@@ -0,0 +1,23 @@
+"""项目清单：章节、顺序或 config 变化都使清单失效；合并偏移可由清单还原"""
+from novelcore.manifest import build_manifest, is_valid, merge_entries
+from novelcore.merge import MergeIndex, write_merged
+
+CODE = "0" * 24
+
+
+def test_manifest_roundtrip(tmp_path):
+    output = str(tmp_path / "merged.txt")
+    order = [f"第{i}章" for i in range(5)]
+    contents = {name: f"{name}的正文。" for name in order}
+    versions = {name: 1 for name in order}
+    index, _ = write_merged(output, order, contents, CODE, versions=versions)
+
+    manifest = build_manifest(order, {}, versions, [1, 2], index)
+    assert is_valid(manifest, versions, [1, 2])
+    assert merge_entries(manifest) == index.entries
+    restored = MergeIndex.from_dict(dict(manifest["merge"], entries=merge_entries(manifest)))
+    assert restored.matches(output)
+
+    assert not is_valid(manifest, versions, [1, 3])  # config 变了
+    assert not is_valid(manifest, dict(versions, **{order[0]: 2}), [1, 2])  # 章节改过
+    assert not is_valid(manifest, dict(versions, 多余的=1), [1, 2])  # 多了文件
@@ -0,0 +1,92 @@
+"""合并输出：增量写入（splice / tail / unchanged）的结果与全量重写逐字节相同"""
+from novelcore.merge import write_merged
+
+CODE = "0" * 24
+
+
+def full_bytes(tmp_path, chapter_order, contents, code=CODE):
+    reference = str(tmp_path / "reference.txt")
+    write_merged(reference, chapter_order, contents, code)
+    with open(reference, 'rb') as f:
+        return f.read()
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def setup(tmp_path, count=20):
+    output = str(tmp_path / "merged.txt")
+    order = [f"第{i}章" for i in range(count)]
+    contents = {name: f"{name}的正文。" * 20 for name in order}
+    versions = {name: 1 for name in order}
+    index, stats = write_merged(output, order, contents, CODE, versions=versions)
+    assert stats.mode == "full"
+    return output, order, contents, versions, index
+
+
+def test_unchanged(tmp_path):
+    output, order, contents, versions, index = setup(tmp_path)
+    _, stats = write_merged(output, order, contents, CODE, index, versions=versions)
+    assert stats.mode == "unchanged"
+    assert stats.bytes_written == 0
+
+
+def test_splice_same_length(tmp_path):
+    output, order, contents, versions, index = setup(tmp_path)
+    name = order[3]
+    contents[name] = contents[name].replace("正文", "内容")  # 字节数不变
+    versions[name] = 2
+    index, stats = write_merged(output, order, contents, "1" * 24, index, versions=versions)
+    assert stats.mode == "splice"
+    assert stats.chapters_written == 1
+    assert read(output) == full_bytes(tmp_path, order, contents, "1" * 24)
+
+
+def test_tail_rewrite(tmp_path):
+    output, order, contents, versions, index = setup(tmp_path, 100)
+    name = order[-2]
+    contents[name] += "多出来的一段。"
+    versions[name] = 2
+    order.append("新章")
+    contents["新章"] = "新章正文"
+    versions["新章"] = 1
+    index, stats = write_merged(output, order, contents, CODE, index, versions=versions)
+    assert stats.mode == "tail"
+    assert stats.rewrite_from == len(order) - 3
+    assert read(output) == full_bytes(tmp_path, order, contents)
+
+    # 末尾删除章节同样只截断尾部
+    del order[-1]
+    index, stats = write_merged(output, order, contents, CODE, index, versions=versions)
+    assert stats.mode == "tail"
+    assert read(output) == full_bytes(tmp_path, order, contents)
+
+
+def test_large_patch_is_atomic(tmp_path):
+    # 版本标记全部变化（例如改用共享存储后）时不能逐段原地覆盖整个文件
+    output, order, contents, versions, index = setup(tmp_path)
+    versions = {name: 2 for name in order}
+    _, stats = write_merged(output, order, contents, CODE, index, versions=versions)
+    assert stats.mode == "full"
+    assert read(output) == full_bytes(tmp_path, order, contents)
+
+    # 追加大量章节同样走全量重写
+    (tmp_path / "append").mkdir()
+    output, order, contents, versions, index = setup(tmp_path / "append")
+    for i in range(20, 40):
+        order.append(f"第{i}章")
+        contents[order[-1]] = "追加的正文。" * 20
+    _, stats = write_merged(output, order, contents, CODE, index, versions=versions)
+    assert stats.mode == "full"
+    assert read(output) == full_bytes(tmp_path, order, contents)
+
+
+def test_external_change_forces_full(tmp_path):
+    output, order, contents, versions, index = setup(tmp_path)
+    with open(output, 'ab') as f:
+        f.write(b"x")
+    _, stats = write_merged(output, order, contents, CODE, index, versions=versions)
+    assert stats.mode == "full"
+    assert read(output) == full_bytes(tmp_path, order, contents)
@@ -0,0 +1,33 @@
+"""章节名去重：NameRegistry 连续取名与逐次调用 handle_duplicate_names 的结果一致"""
+import random
+
+import pytest
+
+from novelcore.engine import handle_duplicate_names
+from novelcore.names import NameRegistry
+
+BASES = ["未知章节", "序章", "a-b", "a", "a-1", "章-3", "章-x", "-", "第1章-2"]
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_claim_matches_handle_duplicate_names(seed):
+    rng = random.Random(seed)
+    existing = [rng.choice(BASES) + rng.choice(["", "-1", "-7", "-0", "-12"]) for _ in range(rng.randint(0, 10))]
+    registry = NameRegistry(existing)
+    names = list(existing)
+    for _ in range(100):
+        base = rng.choice(BASES)
+        expected = handle_duplicate_names(base, names)
+        assert registry.unique(base) == expected
+        assert registry.claim(base) == expected
+        names.append(expected)
+    assert len(registry) == len(set(names))
+
+
+def test_discard_keeps_names_unique():
+    registry = NameRegistry(["序章", "序章-1", "序章-2"])
+    registry.discard("序章-2")
+    assert "序章-2" not in registry
+    # 后缀不回退：之后取的名字不会与曾经用过的名字重复
+    assert registry.claim("序章") == "序章-3"
+    assert registry.claim("序章-2") == "序章-2"
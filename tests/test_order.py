@@ -0,0 +1,44 @@
+"""章节顺序：ChapterIndex 的随机操作序列与 list 的结果一致，移动后 ID 不变"""
+import random
+
+from novelcore.order import ChapterIndex
+
+
+def test_matches_list():
+    rng = random.Random(3)
+    names = [f"第{i}章" for i in range(50)]
+    index = ChapterIndex(names, block_size=4)  # 小块，频繁触发分裂与合并
+    expected = list(names)
+    for step in range(3000):
+        op = rng.randrange(5)
+        if op == 0 or not expected:
+            position = rng.randint(0, len(expected))
+            name = f"新{step}"
+            index.insert(position, name)
+            expected.insert(position, name)
+        elif op == 1:
+            position = rng.randrange(len(expected))
+            assert index.pop(position) == expected.pop(position)
+        elif op == 2:
+            old, new = rng.randrange(len(expected)), rng.randrange(len(expected))
+            assert index.move(old, new) == expected[old]
+            expected.insert(new, expected.pop(old))
+        elif op == 3:
+            i, j = rng.randrange(len(expected)), rng.randrange(len(expected))
+            index.swap(i, j)
+            expected[i], expected[j] = expected[j], expected[i]
+        else:
+            position = rng.randrange(len(expected))
+            assert index[position] == expected[position]
+            assert index.index(expected[position]) == expected.index(expected[position])
+    assert index == expected
+    assert len(index) == len(expected)
+
+
+def test_move_keeps_id():
+    index = ChapterIndex(["一", "二", "三"])
+    chapter_id = index.id_of("一")
+    index.move(0, 2)
+    assert list(index) == ["二", "三", "一"]
+    assert index.id_of("一") == chapter_id
+    assert index.index_of_id(chapter_id) == 2
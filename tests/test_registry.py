@@ -0,0 +1,65 @@
+"""项目登记表：data.ini 一次性迁移到 data.db，之后两种后端的行为一致"""
+import random
+
+import pytest
+
+from novelcore.registry import IniRegistry, ProjectRegistry, open_registry
+
+
+def code(i):
+    return f"{i:024x}"
+
+
+def test_migrates_ini_once(tmp_path):
+    ini = IniRegistry(str(tmp_path / "data.ini"))
+    for i in range(20):
+        ini.save_project_code(str(tmp_path / f"小说{i % 15}.txt"), code(i))
+    history = ini.read_history()
+
+    registry = ProjectRegistry(str(tmp_path / "data.db"))
+    try:
+        assert registry.read_history() == history
+        assert list(registry.read_history()) == list(history)  # 顺序也一致
+        for i in range(20):
+            assert registry.get_project_by_code(code(i)) == ini.get_project_by_code(code(i))
+        # 已迁移过：data.ini 之后的改动不会再导入
+        ini.save_project_code(str(tmp_path / "新.txt"), code(99))
+        assert registry.migrate_from_ini(str(tmp_path / "data.ini")) == 0
+        assert registry.get_project_by_code(code(99)) is None
+    finally:
+        registry.close()
+
+    registry = ProjectRegistry(str(tmp_path / "data.db"))
+    try:
+        assert registry.read_history() == history
+    finally:
+        registry.close()
+
+
+def test_no_ini_to_migrate(tmp_path):
+    registry = open_registry(str(tmp_path / "data.db"))
+    try:
+        assert registry.read_history() == {}
+        assert not (tmp_path / "data.ini").exists()
+    finally:
+        registry.close()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_backends_agree(tmp_path, seed):
+    rng = random.Random(seed)
+    ini = open_registry(str(tmp_path / "data.ini"))
+    registry = open_registry(str(tmp_path / "data.db"))
+    try:
+        dirs = [tmp_path / "a", tmp_path / "b"]
+        for step in range(60):
+            path = str(rng.choice(dirs) / f"{rng.randint(0, 9)}.txt")  # 不同目录的同名文件共用一个段名
+            project_code = code(rng.randint(0, 12))
+            ini.save_project_code(path, project_code)
+            registry.save_project_code(path, project_code)
+            assert registry.read_history() == ini.read_history()
+            assert list(registry.read_history()) == list(ini.read_history())
+            probe = code(rng.randint(0, 12))
+            assert registry.get_project_by_code(probe) == ini.get_project_by_code(probe)
+    finally:
+        registry.close()
@@ -0,0 +1,119 @@
+"""全文检索：结果与逐个位置的子串比较一致（含空白、大小写、单字查询）"""
+import os
+import random
+import shutil
+
+import pytest
+
+from novelcore.search import SearchIndex, normalize
+
+ALPHABET = "ab \n\tA甲乙。"
+
+
+def substring_hits(texts, query):
+    query = normalize(query.strip())
+    hits = {}
+    for name, text in texts.items():
+        text = normalize(text)
+        positions = [p for p in range(len(text)) if text.startswith(query, p)]
+        if positions:
+            hits[name] = positions
+    return hits
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.db"))
+    yield index
+    index.close()
+
+
+def test_matches_substring_search(index):
+    rng = random.Random(7)
+    texts = {f"第{i}章": "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 120))) for i in range(40)}
+    for name, text in texts.items():
+        index.update(name, text)
+    for _ in range(2000):
+        query = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 6)))
+        if not query.strip():
+            continue
+        assert index.search(query, texts.get) == substring_hits(texts, query), repr(query)
+
+
+def test_whitespace_run_is_verified(index):
+    # 查询串 "a  b" 中第二个空格不在任何二元组中，只看索引会把 "a xb" 当作命中
+    texts = {"一": "a xb", "二": "a  b"}
+    for name, text in texts.items():
+        index.update(name, text)
+    assert index.search("a  b", texts.get) == {"二": [0]}
+    with pytest.raises(ValueError):
+        index.search("a  b")
+
+
+def test_update_and_remove(index):
+    index.update("一", "旧的内容")
+    index.update("一", "新的内容")
+    assert index.search("旧的") == {}
+    assert index.search("新的") == {"一": [0]}
+    index.remove("一")
+    assert index.search("内容") == {}
+
+
+class FailingStore:
+    """第 fail_at 章读取时出错的存储"""
+
+    def __init__(self, texts, fail_at):
+        self.texts = texts
+        self.fail_at = fail_at
+        self.reads = 0
+
+    def versions(self):
+        return {name: 1 for name in self.texts}
+
+    def get(self, name, default=None):
+        self.reads += 1
+        if self.reads == self.fail_at:
+            raise OSError("读取失败")
+        return self.texts[name]
+
+
+def test_sync_rolls_back_on_error(index):
+    texts = {f"第{i}章": f"第{i}章的内容" for i in range(5)}
+    with pytest.raises(OSError):
+        index.sync(FailingStore(texts, 3))
+    # 出错前未提交的章节不能记下新版本，否则以后不会再重建
+    changed, removed = index.stale({name: 1 for name in texts})
+    assert sorted(changed) == sorted(texts)
+    assert index.search("内容") == {}
+
+    assert index.sync(FailingStore(texts, 0)) == (5, 0)
+    assert len(index.search("内容")) == 5
+
+
+def _snapshot(folder):
+    # 只读打开 WAL 索引时 SQLite 自己会建 -wal / -shm，不算作改写项目
+    return {os.path.join(root, name): os.stat(os.path.join(root, name)).st_mtime_ns
+            for root, _, names in os.walk(folder) for name in names if not name.endswith(("-wal", "-shm"))}
+
+
+@pytest.mark.parametrize("packed", [False, True, "shared"])
+def test_search_projects_is_read_only(tmp_path, packed):
+    from novelcore.engine import open_novel, search_projects
+    from novelcore.registry import ProjectRegistry
+
+    registry = ProjectRegistry(str(tmp_path / "data.db"))
+    novel = tmp_path / "novel.txt"
+    novel.write_text("第1章 开始\n甲乙丙丁\n第2章 继续\n乙丙  丁\n", encoding='utf-8')
+    project = open_novel(str(novel), registry, str(tmp_path), packed=packed)
+    project.update_search_index()
+    project.close()
+
+    # 在另一份复制出来的项目文件夹中搜索：打开共享存储会把它当作新复制的项目登记，只读搜索不能这样做
+    copy = tmp_path / "copy"
+    shutil.copytree(tmp_path / "项目文件夹", copy / "项目文件夹")
+    projects = str(copy / "项目文件夹")
+    before = _snapshot(projects)
+    results = search_projects(registry, "乙丙  丁", str(copy))
+    assert [(name, positions) for _, _, hits in results for name, positions in hits] == [("继续", [0])]
+    assert _snapshot(projects) == before
+    registry.close()
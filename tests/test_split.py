@@ -0,0 +1,72 @@
+"""流式拆分章节：任意分块方式下都与旧版逐行拆分的结果一致"""
+import random
+import re
+
+import pytest
+
+from novelcore.engine import iter_split_chunks, split_into_chapters, strip_project_code
+
+
+def legacy_split(content):
+    """旧版 NovelMergerApp.split_into_chapters"""
+    chapters = []
+    chapter_name = None
+    chapter_content = []
+    for line in content.split('\n'):
+        stripped_line = line.strip()
+        if re.match(r"^第(\d+|[一二三四五六七八九十百千万]+)章.*", stripped_line) or re.match(r"^正文.*$", stripped_line):
+            if chapter_name:
+                chapters.append((chapter_name, "\n".join(chapter_content)))
+            chapter_name = stripped_line
+            chapter_content = []
+        else:
+            chapter_content.append(line)
+    if chapter_name:
+        chapters.append((chapter_name, "\n".join(chapter_content)))
+    return chapters
+
+
+PIECES = ["第1章 开始", "  第二十章：", "正文", "正文 尾声", "第3章", "内容", "第几章", "x第4章",
+          "", " ", "\t", "\r", "长" * 50, "a0b1c2d3e4f5a6b7c8d9e0f1"]
+
+
+def random_text(rng):
+    lines = [rng.choice(PIECES) for _ in range(rng.randint(0, 40))]
+    return '\n'.join(lines) + rng.choice(['', '\n', '\n\n'])
+
+
+def random_chunks(rng, text):
+    chunks = []
+    i = 0
+    while i < len(text):
+        size = rng.choice([1, 2, 3, 7, 64])
+        chunks.append(text[i:i + size])
+        i += size
+    return chunks
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_matches_legacy_splitter(seed):
+    rng = random.Random(seed)
+    text = random_text(rng)
+    expected = legacy_split(text)
+    assert split_into_chapters(text) == expected
+    assert list(iter_split_chunks(random_chunks(rng, text))) == expected
+    # 每个换行符都落在块边界上
+    assert list(iter_split_chunks(re.split(r'(?<=\n)', text))) == expected
+
+
+def test_strip_code_on_last_line():
+    code = "a0b1c2d3e4f5a6b7c8d9e0f1"
+    for text in ["第1章 一\n内容\n" + code, "第1章 一\n内容" + code, "第1章 一\n" + code + "\n"]:
+        expected = legacy_split(strip_project_code(text))
+        for size in (1, 5, 1 << 20):
+            chunks = [text[i:i + size] for i in range(0, len(text), size)]
+            assert list(iter_split_chunks(chunks, strip_code=True)) == expected
+
+
+def test_long_line_across_many_chunks():
+    line = "长" * 100000
+    text = f"第1章 一\n{line}\n第2章 二\n{line}"
+    chunks = [text[i:i + 1000] for i in range(0, len(text), 1000)]
+    assert list(iter_split_chunks(chunks)) == [("第1章 一", line), ("第2章 二", line)]
@@ -0,0 +1,120 @@
+"""后台任务：结果、错误和取消都在 poll() 所在线程交付"""
+import threading
+
+import pytest
+
+from novelcore.logs import ERROR, INFO
+from novelcore.tasks import Cancelled, TaskRunner
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+        self.threads = set()
+        self.idle = 0
+
+    def __call__(self, kind):
+        def record(*args):
+            self.threads.add(threading.get_ident())
+            self.events.append((kind,) + args)
+        return record
+
+    def on_idle(self):
+        self.idle += 1
+
+
+def make_runner(recorder):
+    return TaskRunner(on_log=recorder("log"), on_progress=recorder("progress"), on_idle=recorder.on_idle)
+
+
+def drain(runner):
+    assert runner.wait(10)
+    while runner.poll():
+        pass
+
+
+def test_result_log_and_progress_delivered_in_poll_thread():
+    recorder = Recorder()
+    runner = make_runner(recorder)
+
+    def work(ctx, n):
+        ctx.log("开始")
+        for i in range(n):
+            ctx.progress(i + 1, n)
+        return n * 2
+
+    try:
+        task = runner.submit(work, 3, name="work", on_done=recorder("done"))
+        assert runner.busy
+        drain(runner)
+        assert recorder.events == [("log", task, "开始", INFO)] + \
+            [("progress", task, i, 3) for i in (1, 2, 3)] + [("done", 6)]
+        assert recorder.threads == {threading.get_ident()}
+        assert task.done and not runner.busy and recorder.idle == 1
+    finally:
+        runner.shutdown(wait=True)
+
+
+def test_errors_go_to_on_error_or_log():
+    recorder = Recorder()
+    runner = make_runner(recorder)
+
+    def fail(ctx):
+        raise ValueError("坏了")
+
+    try:
+        runner.submit(fail, on_error=recorder("error"))
+        task = runner.submit(fail, name="无回调")
+        drain(runner)
+        kind, error = recorder.events[0]
+        assert kind == "error" and isinstance(error, ValueError)
+        assert recorder.events[1] == ("log", task, "任务 无回调 出错: 坏了", ERROR)
+        assert recorder.idle == 1
+    finally:
+        runner.shutdown(wait=True)
+
+
+def test_cancel_running_and_queued_tasks():
+    recorder = Recorder()
+    runner = make_runner(recorder)
+    started = threading.Event()
+
+    def loop(ctx):
+        started.set()
+        while True:
+            ctx.progress(0)
+
+    ran = []
+    try:
+        running = runner.submit(loop, name="loop")
+        queued = runner.submit(lambda ctx: ran.append(1), name="queued", on_done=recorder("done"))
+        assert started.wait(10)
+        runner.cancel_all()
+        drain(runner)
+        # Cancelled 没有 on_error 时不记为错误；排队中取消的任务不运行
+        assert not [e for e in recorder.events if e[0] != "progress"]
+        assert running.done and queued.future.cancelled() and ran == []
+        assert not runner.busy and recorder.idle == 1
+    finally:
+        runner.shutdown(wait=True)
+
+
+def test_cancelled_error_delivered_to_on_error():
+    recorder = Recorder()
+    runner = make_runner(recorder)
+    started = threading.Event()
+
+    def loop(ctx):
+        started.set()
+        while True:
+            ctx.check()
+
+    try:
+        task = runner.submit(loop, on_error=recorder("error"))
+        assert started.wait(10)
+        task.cancel()
+        drain(runner)
+        assert len(recorder.events) == 1
+        assert isinstance(recorder.events[0][1], Cancelled)
+    finally:
+        runner.shutdown(wait=True)
@@ -0,0 +1,52 @@
+"""章节查看窗口：同时按行数和字符数限制插入 Text 的内容"""
+import pytest
+
+from novelcore.viewer import LinePieceTable, MmapSource, TextSource, select_window
+
+
+def check(table, start, anchor, max_lines, max_chars):
+    lo, hi, lines, truncated = select_window(table, start, anchor, max_lines, max_chars, block=3)
+    assert lo <= anchor < hi
+    assert hi - lo <= max_lines
+    assert len('\n'.join(lines)) <= max_chars
+    if not truncated:
+        assert lines == table.lines(lo, hi)
+    return lo, hi, lines, truncated
+
+
+@pytest.mark.parametrize("anchor", [0, 5, 50, 99])
+def test_short_lines_capped_by_lines(anchor):
+    table = LinePieceTable(TextSource('\n'.join(f"第{i}行" for i in range(100))))
+    lo, hi, _, truncated = check(table, anchor - 10, anchor, 20, 10000)
+    assert hi - lo == 20 and not truncated
+
+
+def test_long_lines_capped_by_chars():
+    text = '\n'.join(("长" * 900 if i % 2 else "短") for i in range(200))
+    table = LinePieceTable(TextSource(text))
+    lo, hi, lines, truncated = check(table, 40, 100, 600, 5000)
+    assert not truncated
+    assert lo < 100  # 锚点上方也保留了内容，向上滚动时才能换页
+    assert hi - lo < 20
+
+
+def test_single_huge_line_is_truncated(tmp_path):
+    path = tmp_path / "章.txt"
+    huge = "长" * 100000
+    path.write_text(f"第一行\n{huge}\n末行", encoding='utf-8')
+    table = LinePieceTable(MmapSource(str(path)))
+    try:
+        lo, hi, lines, truncated = check(table, 0, 1, 600, 1000)
+        assert (lo, hi, truncated) == (1, 2, True)
+        assert lines == ["长" * 1000]
+        lo, hi, lines, truncated = check(table, 0, 2, 600, 1000)
+        assert (lo, hi, truncated) == (2, 3, False)
+        assert lines == ["末行"]
+    finally:
+        table.close()
+
+
+def test_empty_table():
+    table = LinePieceTable(TextSource(''))
+    table.replace_lines(0, 1, [])
+    assert select_window(table, 0, 0, 600, 1000) == (0, 0, [], False)
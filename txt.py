@@ -1,20 +1,363 @@
+import time
+STARTUP_STARTED = time.perf_counter()  # 启动计时（--startup-time）从这里开始
+
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from tkinter import ttk
-from tkinterdnd2 import TkinterDnD, DND_FILES
 import os
-import re
-import chardet
+import sys
 import ctypes
 from datetime import datetime
-import configparser
-import uuid
-import shutil
+
+from novelcore import engine, profiling
+from novelcore.logs import DEBUG, DEFAULT_LOG_FILE, ERROR, INFO, LEVEL_NAMES, WARNING, LogBuffer, emit, enable_file_log
+from novelcore.tasks import Cancelled, TaskRunner
+from novelcore.viewer import LinePieceTable, TextSource, select_window
+
+ORDER_FLUSH_DELAY = 1.0  # 秒
+LOG_PANEL_LINES = 1000  # 日志区最多保留的行数
+LOG_FLUSH_MS = 100  # 日志区批量刷新的间隔
+REPORT_DIR_NAME = "性能报告"
+SEARCH_RESULT_LIMIT = 500  # 搜索结果列表最多显示的章数
+STARTUP_TIME_FLAG = "--startup-time"  # 统计导入和首帧耗时，输出报告后退出
+
+
+def logging_tag(level):
+    return f"level{level}"
+
+
+class StartupTimer:
+    """--startup-time：按检查点把启动过程分段计时，结果是一份 profiling 报告"""
+
+    def __init__(self):
+        self.report = profiling.Report("startup")
+        self.last = STARTUP_STARTED
+
+    def checkpoint(self, name):
+        now = time.perf_counter()
+        self.report.add_stage(name, now - self.last)
+        self.report.seconds = now - STARTUP_STARTED
+        self.last = now
+
+
+class VirtualChapterList:
+    """只渲染可见行的章节列表：滚动、移动、删除的开销只与可见行数有关，与章节总数无关
+
+    接口与 tk.Listbox 的常用部分一致（curselection / selection_set / nearest / bind），
+    索引都是章节的绝对位置；label(i) 返回第 i 行显示的文本。
+    """
+
+    def __init__(self, master, label, **options):
+        self.label = label
+        self.count = 0
+        self.top = 0  # 第一可见行对应的章节位置
+        self.rows = options.get("height", 20)
+        self.selected = None
+        self.listbox = tk.Listbox(master, exportselection=False, **options)
+        self.scrollbar = ttk.Scrollbar(master, orient=tk.VERTICAL, command=self.yview)
+        self.listbox.config(yscrollcommand=lambda first, last: self.update_scrollbar())
+
+        self.listbox.bind("<<ListboxSelect>>", self._on_select)
+        self.listbox.bind("<Configure>", self._on_resize)
+        self.listbox.bind("<MouseWheel>", self._on_wheel)
+        self.listbox.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.listbox.bind("<Button-5>", lambda event: self.scroll(3))
+        for key, step in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page"),
+                          ("<Home>", "home"), ("<End>", "end")):
+            self.listbox.bind(key, lambda event, step=step: self._on_key(step))
+
+    def bind(self, sequence, func):
+        # 追加而不是替换，保留内部的选择/滚动处理
+        return self.listbox.bind(sequence, func, add="+")
+
+    def grid(self, **options):
+        self.listbox.grid(**options)
+
+    # 渲染
+    def render(self):
+        self.top = max(0, min(self.top, self.count - self.rows))
+        self.listbox.delete(0, tk.END)
+        end = min(self.count, self.top + self.rows + 1)  # 多渲染一行，填满半行的空隙
+        for i in range(self.top, end):
+            self.listbox.insert(tk.END, self.label(i))
+        self._show_selection()
+        self.update_scrollbar()
+
+    def rows_changed(self, start, end):
+        """章节 start..end（含）的显示文本变化，只重绘其中可见的行"""
+        visible_end = min(self.count, self.top + self.rows + 1) - 1
+        for i in range(max(start, self.top), min(end, visible_end) + 1):
+            row = i - self.top
+            self.listbox.delete(row)
+            self.listbox.insert(row, self.label(i))
+        self._show_selection()
+
+    def refresh(self, count):
+        """章节数变化（打开、添加、删除）后重绘可见部分"""
+        self.count = count
+        if self.selected is not None and self.selected >= count:
+            self.selected = None
+        self.render()
+
+    def moved(self, old_index, new_index):
+        """章节从 old_index 移到 new_index：只有两者之间的行序号和名称变化"""
+        self.rows_changed(min(old_index, new_index), max(old_index, new_index))
+
+    def clear(self):
+        self.selection_clear()
+        self.refresh(0)
+
+    def update_scrollbar(self):
+        if self.count <= 0:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.top / self.count, min(1.0, (self.top + self.rows) / self.count))
+
+    # 选择
+    def curselection(self):
+        selection = self.listbox.curselection()
+        if selection:
+            return (self.top + selection[0],)
+        return (self.selected,) if self.selected is not None else ()
+
+    def selection_set(self, index):
+        if not 0 <= index < self.count:
+            return
+        self.selected = index
+        if not self.see(index):
+            self._show_selection()
+
+    def selection_clear(self):
+        self.selected = None
+        self.listbox.selection_clear(0, tk.END)
+
+    def nearest(self, y):
+        return min(self.top + self.listbox.nearest(y), self.count - 1)
+
+    def _show_selection(self):
+        self.listbox.selection_clear(0, tk.END)
+        if self.selected is not None and self.top <= self.selected < self.top + self.rows + 1:
+            self.listbox.selection_set(self.selected - self.top)
+
+    def _on_select(self, event):
+        selection = self.listbox.curselection()
+        if selection:
+            self.selected = self.top + selection[0]
+
+    # 滚动
+    def see(self, index):
+        """滚动到 index 可见，返回是否重绘了"""
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.rows:
+            self.top = index - self.rows + 1
+        else:
+            return False
+        self.render()
+        return True
+
+    def scroll(self, rows):
+        top = max(0, min(self.top + rows, self.count - self.rows))
+        if top != self.top:
+            self.top = top
+            self.render()
+        return "break"
+
+    def yview(self, *args):
+        if args and args[0] == "moveto":
+            self.top = int(float(args[1]) * self.count)
+            self.render()
+        elif args and args[0] == "scroll":
+            step = int(args[1]) * (self.rows if args[2] == "pages" else 1)
+            self.scroll(step)
+
+    def _on_wheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def _on_resize(self, event):
+        row_height = None
+        if self.listbox.size() > 1:
+            first, second = self.listbox.bbox(0), self.listbox.bbox(1)
+            if first and second:
+                row_height = second[1] - first[1]
+        if row_height:
+            rows = max(1, event.height // row_height)
+            if rows != self.rows:
+                self.rows = rows
+                self.render()
+
+    def _on_key(self, step):
+        if not self.count:
+            return "break"
+        current = self.selected if self.selected is not None else self.top
+        if step == "home":
+            index = 0
+        elif step == "end":
+            index = self.count - 1
+        elif step in ("page", "-page"):
+            index = current + (self.rows if step == "page" else -self.rows)
+        else:
+            index = current + step
+        self.selection_set(max(0, min(index, self.count - 1)))
+        self.listbox.event_generate("<<ListboxSelect>>")
+        return "break"
+
+
+class ChapterViewer:
+    """分页显示章节：Text 中最多放 WINDOW_LINES 行、约 WINDOW_CHARS 个字符，滚动到窗口边缘时再换入相邻的行
+
+    内容来自章节存储的 open_source()（文件夹布局为 mmap），编辑在换页或保存时
+    以整段行的替换写入 LinePieceTable，不会把整章插入 Text 或从中读回。
+    单行超过 WINDOW_CHARS 时只显示开头，且该窗口只读。
+    """
+
+    WINDOW_LINES = 600
+    WINDOW_CHARS = 1 << 18
+
+    def __init__(self, master, **options):
+        self.text = tk.Text(master, **options)
+        self.scrollbar = ttk.Scrollbar(master, orient=tk.VERTICAL, command=self.yview)
+        self.text.config(yscrollcommand=self._on_text_scroll)
+        self.table = None
+        self.start = 0  # 窗口第一行在章节中的行号
+        self.end = 0
+        self.truncated = False  # 窗口中的行被截断（只读）
+        self._step_view = None  # 上次越过窗口边缘换页后的 yview，视图不动就不再换
+        self._shift_pending = False
+        self.text.tag_configure("search_hit", background="yellow")
+
+    def grid(self, **options):
+        self.text.grid(**options)
+
+    @property
+    def modified(self):
+        return self.table is not None and (self.table.modified or self.text.edit_modified())
+
+    def show(self, source, top_line=0):
+        """显示新的章节（放弃当前未保存的编辑）"""
+        self.release()
+        self.table = LinePieceTable(source)
+        self.load_window(top_line - self.WINDOW_LINES // 2, top_line)
+
+    def top_line(self):
+        """当前显示在顶部的行在章节中的行号"""
+        return self.start + int(self.text.index("@0,0").split('.')[0]) - 1
+
+    def release(self):
+        """关闭章节源（mmap），清空显示"""
+        if self.table is not None:
+            self.table.close()
+            self.table = None
+        self.start = self.end = 0
+        self.truncated = False
+        self.text.config(state=tk.NORMAL)
+        self.text.delete(1.0, tk.END)
+        self.text.edit_modified(False)
+        self.scrollbar.set(0.0, 1.0)
+
+    def commit(self):
+        """把窗口中的编辑写入 piece table"""
+        if self.table is None or not self.text.edit_modified():
+            return
+        new_lines = self.text.get(1.0, "end-1c").split('\n')
+        self.table.replace_lines(self.start, self.end, new_lines)
+        self.end = self.start + len(new_lines)
+        self.text.edit_modified(False)
+
+    def get_content(self):
+        """完整的章节内容（只在保存时拼接一次）"""
+        self.commit()
+        return self.table.text() if self.table is not None else ""
+
+    def load_window(self, start, top_line=None, anchor=None):
+        """换入从 start 行开始、包含 anchor 行（默认为 top_line）的窗口，并把 top_line（章节行号）滚动到顶部"""
+        self.commit()
+        if anchor is None:
+            anchor = start if top_line is None else top_line
+        self.start, self.end, lines, self.truncated = select_window(
+            self.table, start, anchor, self.WINDOW_LINES, self.WINDOW_CHARS)
+        self.text.config(state=tk.NORMAL)
+        self.text.delete(1.0, tk.END)
+        self.text.insert(1.0, '\n'.join(lines))
+        if self.truncated:
+            self.text.config(state=tk.DISABLED)
+        self.text.edit_modified(False)
+        self.text.edit_reset()
+        if top_line is not None:
+            self.text.yview(f"{min(max(top_line, self.start), self.end - 1) - self.start + 1}.0")
+
+    def highlight(self, line, column, length):
+        """标出章节中第 line 行 column 列起的 length 个字符（搜索命中）"""
+        self.text.tag_remove("search_hit", 1.0, tk.END)
+        if self.start <= line < self.end:
+            index = f"{line - self.start + 1}.{column}"
+            self.text.tag_add("search_hit", index, f"{index}+{length}c")
+            self.text.see(index)
+
+    def yview(self, *args):
+        if self.table is None:
+            return
+        if args and args[0] == "moveto":
+            count = self.table.line_count
+            line = max(0, min(int(float(args[1]) * count), count - 1))
+            margin = self.WINDOW_LINES // 8
+            inside = (self.start <= line < self.end
+                      and (line - self.start >= margin or self.start == 0)
+                      and (self.end - line >= margin or self.end == count))
+            if inside:
+                self.text.yview(f"{line - self.start + 1}.0")
+            else:
+                self.load_window(line - self.WINDOW_LINES // 2, line)
+        else:
+            self.text.yview(*args)
+
+    def _on_text_scroll(self, first, last):
+        first, last = float(first), float(last)
+        if self.table is None or not self.table.line_count:
+            self.scrollbar.set(first, last)
+            return
+        count = self.table.line_count
+        span = self.end - self.start
+        self.scrollbar.set((self.start + first * span) / count, (self.start + last * span) / count)
+        # 接近窗口边缘且前后还有内容时，空闲时换页（不在滚动回调中直接修改 Text）
+        near_end = last >= 0.95 and self.end < count
+        near_start = first <= 0.05 and self.start > 0
+        if (near_end or near_start) and not self._shift_pending:
+            self._shift_pending = True
+            self.text.after_idle(self._shift)
+
+    def _shift(self):
+        self._shift_pending = False
+        if self.table is None:
+            return
+        top_line = self.top_line()
+        start, end, _, _ = select_window(self.table, top_line - self.WINDOW_LINES // 2, top_line,
+                                         self.WINDOW_LINES, self.WINDOW_CHARS)
+        if (start, end) != (self.start, self.end):
+            self.load_window(start, top_line)
+            return
+        # 字符数已满、窗口换不动时，以窗口外相邻的一行为锚点换页
+        first, last = self.text.yview()
+        if (first, last) == self._step_view:
+            return
+        if first <= 0.05 and self.start > 0:
+            self.load_window(self.start - 1, top_line, anchor=self.start - 1)
+        elif last >= 0.95 and self.end < self.table.line_count:
+            self.load_window(self.end, top_line, anchor=self.end)
+        else:
+            return
+        self._step_view = self.text.yview()
+
 
 class NovelMergerApp:
-    def __init__(self, root):
+    def __init__(self, root, startup=None):
         self.root = root
+        self.startup = startup  # StartupTimer，只在 --startup-time 时使用
         self.root.title("小说整合工具")
+
+        # 日志：任意线程写入缓冲区，界面每 LOG_FLUSH_MS 批量显示；首帧之后同时写入轮转的日志文件
+        self.log_buffer = LogBuffer(LOG_PANEL_LINES)
+        self.log_level = tk.StringVar(value="INFO")
         
         # 设置窗口尺寸
         window_width = 1850
@@ -34,12 +377,21 @@ class NovelMergerApp:
 
         # 初始化变量
         self.loaded_file = None
-        self.project_folder = None  # 项目文件夹路径
-        self.chapter_order = []  # 章节顺序列表
-        self.chapter_contents = {}  # 章节内容
+        self.project = None  # 当前项目（章节顺序、内容、项目文件夹）
+        self._registry = None  # 项目登记（data.db，首次运行时从 data.ini 迁移），首次使用时打开
         self.drag_enabled_var = tk.BooleanVar(value=False)  # 拖动功能开关变量（关键修复）
         self.dragging_index = -1  # 正在拖动的索引
         self.include_filename = tk.BooleanVar(value=False)  # 是否包含文件名前缀的变量
+        self.skip_duplicates = tk.BooleanVar(value=False)  # 导入时跳过重复章节（否则只提示）
+        self.viewing = None  # 内容区正在显示的章节名
+        self.profiling_enabled = tk.BooleanVar(value=False)
+        self.cprofile_enabled = tk.BooleanVar(value=False)
+        self.search_all = tk.BooleanVar(value=False)  # 在所有已登记的项目中搜索
+        self.search_hits = []  # 搜索结果 [(小说路径, 章节名, 命中偏移)]
+        self.search_query = ""
+        # 后台任务：打开/拆分/保存/导入在工作线程中执行，界面线程每 50ms 取回日志和进度
+        self.tasks = TaskRunner(on_log=lambda task, message, level: self.log(message, level),
+                                on_progress=self.on_task_progress, on_idle=self.on_tasks_idle)
 
         # 布局：第一行 - 按钮和历史记录
         self.container_frame = ttk.Frame(root)
@@ -57,6 +409,18 @@ class NovelMergerApp:
         
         self.exit_button = ttk.Button(self.button_frame, text="退出", command=self.exit_app)
         self.exit_button.grid(row=0, column=2, padx=5)
+
+        self.progress_bar = ttk.Progressbar(self.button_frame, length=200, mode="determinate")
+        self.progress_bar.grid(row=0, column=3, padx=5)
+
+        self.cancel_button = ttk.Button(self.button_frame, text="取消", command=self.cancel_tasks, state=tk.DISABLED)
+        self.cancel_button.grid(row=0, column=4, padx=5)
+
+        # 性能统计：后台任务的各阶段耗时和计数写入日志，并保存 JSON 报告
+        self.profile_checkbox = ttk.Checkbutton(self.button_frame, text="性能统计", variable=self.profiling_enabled)
+        self.profile_checkbox.grid(row=0, column=5, padx=5)
+        self.cprofile_checkbox = ttk.Checkbutton(self.button_frame, text="cProfile", variable=self.cprofile_enabled)
+        self.cprofile_checkbox.grid(row=0, column=6, padx=5)
         
         # 历史记录
         self.history_label = ttk.Label(self.container_frame, text="历史记录:")
@@ -65,7 +429,22 @@ class NovelMergerApp:
         self.history_dropdown = ttk.Combobox(self.container_frame, state="readonly")
         self.history_dropdown.grid(row=0, column=2, padx=5, sticky="ew")
         self.history_dropdown.bind("<<ComboboxSelected>>", self.select_history)
-        self.update_history_dropdown()
+        # 历史记录在首帧之后加载（见 finish_startup）
+
+        # 全文搜索（项目文件夹中的 search.db，首次搜索时建立，之后随修改增量更新）
+        self.search_frame = ttk.Frame(self.container_frame)
+        self.search_frame.grid(row=1, column=0, columnspan=3, padx=10, sticky="ew")
+
+        self.search_entry = ttk.Entry(self.search_frame, font=font)
+        self.search_entry.grid(row=0, column=0, padx=5, sticky="ew")
+        self.search_entry.bind("<Return>", lambda event: self.search())
+
+        self.search_button = ttk.Button(self.search_frame, text="搜索", command=self.search)
+        self.search_button.grid(row=0, column=1, padx=5)
+
+        self.search_all_checkbox = ttk.Checkbutton(self.search_frame, text="所有项目", variable=self.search_all)
+        self.search_all_checkbox.grid(row=0, column=2, padx=5)
+        self.search_frame.grid_columnconfigure(0, weight=1)
 
         # 布局：第二行 - 章节列表和内容显示
         self.chapter_container_frame = ttk.Frame(root)
@@ -79,12 +458,12 @@ class NovelMergerApp:
         self.chapter_frame = ttk.Frame(self.chapter_controls_frame)
         self.chapter_frame.pack(fill="both", expand=True)
 
-        self.chapter_listbox = tk.Listbox(self.chapter_frame, height=20, width=40, font=font)
+        # 只渲染可见行，几万章时滚动和拖动排序也不会卡顿
+        self.chapter_listbox = VirtualChapterList(self.chapter_frame, self.chapter_label, height=20, width=40, font=font)
         self.chapter_listbox.grid(row=0, column=0, sticky="nsew")
 
-        self.chapter_scrollbar = ttk.Scrollbar(self.chapter_frame, orient=tk.VERTICAL, command=self.chapter_listbox.yview)
+        self.chapter_scrollbar = self.chapter_listbox.scrollbar
         self.chapter_scrollbar.grid(row=0, column=1, sticky="ns")
-        self.chapter_listbox.config(yscrollcommand=self.chapter_scrollbar.set)
         
         self.chapter_listbox.bind("<<ListboxSelect>>", self.show_chapter_content)
         self.chapter_listbox.bind("<Delete>", lambda event: self.delete_chapter())
@@ -121,16 +500,29 @@ class NovelMergerApp:
         )
         self.filename_prefix_checkbox.pack(side="left", padx=5)
 
+        self.skip_duplicates_checkbox = ttk.Checkbutton(
+            self.order_buttons_frame,
+            text="跳过重复章节",
+            variable=self.skip_duplicates
+        )
+        self.skip_duplicates_checkbox.pack(side="left", padx=5)
+
+        # 搜索结果
+        self.search_listbox = tk.Listbox(self.chapter_controls_frame, height=6, font=font, exportselection=False)
+        self.search_listbox.pack(fill="x", pady=5)
+        self.search_listbox.bind("<<ListboxSelect>>", self.open_search_hit)
+
         # 章节内容显示
         self.content_frame = ttk.Frame(self.chapter_container_frame)
         self.content_frame.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
 
-        self.content_text = tk.Text(self.content_frame, height=20, width=100, font=font)
-        self.content_text.grid(row=0, column=0, sticky="nsew")
+        # 分页显示，几 MB 的章节也只在 Text 中放一个窗口的行
+        self.viewer = ChapterViewer(self.content_frame, height=20, width=100, font=font, undo=True)
+        self.viewer.grid(row=0, column=0, sticky="nsew")
+        self.content_text = self.viewer.text
 
-        self.content_scrollbar = ttk.Scrollbar(self.content_frame, orient=tk.VERTICAL, command=self.content_text.yview)
+        self.content_scrollbar = self.viewer.scrollbar
         self.content_scrollbar.grid(row=0, column=1, sticky="ns")
-        self.content_text.config(yscrollcommand=self.content_scrollbar.set)
 
         # 布局：第三行 - 添加和删除章节按钮
         self.button_container_frame = ttk.Frame(root)
@@ -152,10 +544,15 @@ class NovelMergerApp:
         self.scrollbar = ttk.Scrollbar(self.log_frame, orient=tk.VERTICAL, command=self.log_text.yview)
         self.scrollbar.grid(row=0, column=1, sticky="ns")
         self.log_text.config(yscrollcommand=self.scrollbar.set)
+        self.log_text.tag_configure(logging_tag(DEBUG), foreground="gray")
+        self.log_text.tag_configure(logging_tag(WARNING), foreground="#b36b00")
+        self.log_text.tag_configure(logging_tag(ERROR), foreground="red")
 
-        # 启用拖放功能
-        self.root.drop_target_register(DND_FILES)
-        self.root.dnd_bind('<<Drop>>', self.on_file_drop)
+        # 日志级别（只影响日志区的显示，日志文件始终记录全部级别）
+        self.log_level_dropdown = ttk.Combobox(self.log_frame, state="readonly", width=8,
+                                               textvariable=self.log_level, values=list(LEVEL_NAMES))
+        self.log_level_dropdown.grid(row=0, column=2, padx=5, pady=10, sticky="n")
+        self.log_level_dropdown.bind("<<ComboboxSelected>>", lambda event: self.rerender_log())
 
         # 自适应窗口大小
         root.grid_rowconfigure(1, weight=1)
@@ -181,373 +578,244 @@ class NovelMergerApp:
         self.log_frame.grid_rowconfigure(0, weight=1)
         self.log_frame.grid_columnconfigure(0, weight=1)
 
-    # 项目管理核心功能（保持不变）
-    def generate_24bit_code(self):
-        return uuid.uuid4().hex[:24]
-
-    def read_project_code(self, file_path):
+        self.root.after(50, self.poll_tasks)
+        self.root.after(LOG_FLUSH_MS, self.flush_log)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        # 窗口画出来之后再加载拖放扩展和历史记录
+        self.root.after_idle(self.root.after, 0, self.finish_startup)
+
+    def finish_startup(self):
+        """首帧之后的初始化：日志文件、拖放、历史记录；--startup-time 时输出启动耗时报告并退出"""
+        if self.startup:
+            self.root.update_idletasks()
+            self.startup.checkpoint("first_paint")
+        enable_file_log(os.path.join(engine.BASE_DIR, DEFAULT_LOG_FILE))
+        self.enable_drag_and_drop()
+        self.update_history_dropdown()
+        if self.startup:
+            self.startup.checkpoint("deferred")
+            if sys.stdout:  # 打包的窗口程序没有 stdout，只看日志和报告文件
+                print(self.startup.report.summary())
+            self.save_report(self.startup.report)
+            self.root.after(0, self.on_close)
+
+    def enable_drag_and_drop(self):
+        """加载 tkdnd 扩展并启用拖放；没有安装 tkinterdnd2 时只是不能拖放"""
         try:
-            with open(file_path, 'rb') as f:
-                f.seek(-24, 2)
-                code = f.read(24).decode('utf-8')
-                if re.match(r'^[0-9a-fA-F]{24}$', code):
-                    return code
-                return None
-        except (OSError, UnicodeDecodeError):
-            return None
-
-    def get_project_by_code(self, code):
-        config = configparser.ConfigParser()
-        if os.path.exists("data.ini"):
-            try:
-                config.read("data.ini", encoding="utf-8")
-            except UnicodeDecodeError:
-                config.read("data.ini", encoding="gbk")
-        
-        for section in config.sections():
-            if config.get(section, "code") == code:
-                return config.get(section, "path")
-        return None
+            from tkinterdnd2 import TkinterDnD, DND_FILES  # 延迟导入：加载 Tcl 扩展较慢
+            # 根窗口按普通 tk.Tk 创建，这里补做 TkinterDnD.Tk 构造时的加载并换成它的类
+            self.root.TkdndVersion = TkinterDnD._require(self.root)
+        except (ImportError, RuntimeError) as e:
+            self.log(f"拖放功能不可用: {e}", WARNING)
+            return
+        self.root.__class__ = TkinterDnD.Tk
+        self.root.drop_target_register(DND_FILES)
+        self.root.dnd_bind('<<Drop>>', self.on_file_drop)
 
-    def save_project_code(self, file_path, code):
-        config = configparser.ConfigParser()
-        
-        if os.path.exists("data.ini"):
+    @property
+    def registry(self):
+        if self._registry is None:
+            from novelcore.encoding import use_cache_dir
+            from novelcore.registry import DEFAULT_REGISTRY, open_registry  # 延迟导入（sqlite3）
+
+            self._registry = open_registry()
+            # 编码检测缓存保存在登记表旁边，重启后仍然有效
+            use_cache_dir(os.path.dirname(os.path.abspath(DEFAULT_REGISTRY)))
+        return self._registry
+
+    # 项目管理核心功能（逻辑在 novelcore.engine 中）
+    def set_project(self, project):
+        """切换当前项目；旧项目未写入的章节顺序先写入，再关闭它的存储和索引连接"""
+        if self.project is not None and self.project is not project:
+            self.project.flush_order()
+            self.viewer.release()
+            self.viewing = None
+            self.project.close()
+        if project is not None:
+            project.autoflush = False  # 连续的上移/下移/删除合并为一次写入
+        self.project = project
+
+    @property
+    def chapter_order(self):
+        return self.project.chapter_order if self.project else []
+
+    @property
+    def chapter_contents(self):
+        return self.project.chapter_contents if self.project else {}
+
+    def chapter_label(self, index):
+        return f"第{index+1}章：{self.chapter_order[index]}"
+
+    def refresh_chapter_list(self):
+        with profiling.stage("list_refresh"):
+            self.chapter_listbox.selection_clear()
+            self.chapter_listbox.refresh(len(self.chapter_order))
+
+    # 后台任务
+    def run_task(self, name, fn, *args, on_done=None, on_error=None):
+        """在后台线程执行 fn(ctx, *args)；on_done(result) / on_error(exc) 在界面线程调用"""
+        self.progress_bar.config(mode="indeterminate")
+        self.progress_bar.start(10)
+        self.cancel_button.config(state=tk.NORMAL)
+        on_error = on_error or self.on_task_error
+        if self.profiling_enabled.get():
+            fn, on_done, on_error = self.profiled(name, fn, on_done, on_error)
+        return self.tasks.submit(fn, *args, name=name, on_done=on_done, on_error=on_error)
+
+    def profiled(self, name, fn, on_done, on_error):
+        """包装任务：后台部分用 profiling.profile 统计，界面更新计为 ui_update 阶段，结束后输出报告"""
+        cprofile = self.cprofile_enabled.get()
+        reports = []
+
+        def task(ctx, *args):
+            with profiling.profile(name, cprofile=cprofile) as report:
+                reports.append(report)
+                return fn(ctx, *args)
+
+        def finish(callback, value):
+            started = time.perf_counter()
+            if callback:
+                callback(value)
+            if reports:
+                report = reports[0]
+                report.add_stage("ui_update", time.perf_counter() - started)
+                self.save_report(report)
+
+        return task, lambda result: finish(on_done, result), lambda error: finish(on_error, error)
+
+    def save_report(self, report):
+        self.log(report.summary())
+        report_dir = os.path.join(engine.BASE_DIR, REPORT_DIR_NAME)
+        os.makedirs(report_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        path = report.save(os.path.join(report_dir, f"{stamp}-{report.operation}.json"))
+        self.log(f"性能报告已保存: {path}")
+
+    def project_task(self, project, fn):
+        """包装对项目的操作：执行期间项目的日志和进度转到任务上下文"""
+        def task(ctx, *args):
+            project.log, project.progress = ctx.log, ctx.progress
             try:
-                config.read("data.ini", encoding="utf-8")
-            except UnicodeDecodeError:
-                config.read("data.ini", encoding="gbk")
-        
-        for section in config.sections():
-            if config.get(section, "path") == file_path:
-                del config[section]
-        
-        section = os.path.basename(file_path)
-        config[section] = {
-            "path": file_path,
-            "code": code,
-            "last_modified": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
-        
-        with open("data.ini", "w", encoding="utf-8") as f:
-            config.write(f)
-
-    def create_project_folder(self, file_path):
-        """创建项目文件夹，统一放在脚本目录下的"项目文件夹"中"""
-        # 获取脚本所在目录
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        # 主项目文件夹（统一存放所有小说项目）
-        main_project_dir = os.path.join(script_dir, "项目文件夹")
-        # 单个小说项目的文件夹名（基于文件名）
-        file_name = os.path.splitext(os.path.basename(file_path))[0]
-        # 完整项目路径
-        project_folder = os.path.join(main_project_dir, file_name)
-        
-        # 确保主项目文件夹存在
-        if not os.path.exists(main_project_dir):
-            os.makedirs(main_project_dir)
-            self.log(f"创建主项目文件夹: {main_project_dir}")
-        
-        # 创建单个项目文件夹
-        if not os.path.exists(project_folder):
-            os.makedirs(project_folder)
-            self.log(f"创建项目文件夹: {project_folder}")
+                return fn(ctx, *args)
+            finally:
+                project.log, project.progress = self.log, engine._noop_progress
+        return task
+
+    def ensure_idle(self):
+        if self.tasks.busy:
+            self.log("后台任务进行中，请稍候")
+            return False
+        return True
+
+    def poll_tasks(self):
+        self.tasks.poll()
+        # 章节顺序延迟写回：停止修改 ORDER_FLUSH_DELAY 秒后、没有后台任务和拖动时写入一次
+        project = self.project
+        if project and project.order_dirty and not self.tasks.busy and self.dragging_index == -1 \
+                and time.monotonic() - project.order_changed_at >= ORDER_FLUSH_DELAY:
+            project.flush_order()
+        self.root.after(50, self.poll_tasks)
+
+    def on_task_progress(self, task, done, total):
+        if total:
+            if str(self.progress_bar["mode"]) != "determinate":
+                self.progress_bar.stop()
+                self.progress_bar.config(mode="determinate")
+            self.progress_bar.config(maximum=total, value=done)
+
+    def on_task_error(self, error):
+        if isinstance(error, Cancelled):
+            self.log("任务已取消")
         else:
-            self.log(f"项目文件夹已存在: {project_folder}")
-            
-        return project_folder
-
-    def split_into_chapters(self, content):
-        chapters = []
-        chapter_name = None
-        chapter_content = []
-        
-        lines = content.split('\n')
-        for line in lines:
-            stripped_line = line.strip()
-            if re.match(r"^第(\d+|[一二三四五六七八九十百千万]+)章.*", stripped_line) or re.match(r"^正文.*$", stripped_line):
-                if chapter_name:
-                    chapters.append((chapter_name, "\n".join(chapter_content)))
-                chapter_name = stripped_line
-                chapter_content = []
-            else:
-                chapter_content.append(line)
-        
-        if chapter_name:
-            chapters.append((chapter_name, "\n".join(chapter_content)))
-            
-        return chapters
-
-    def clean_chapter_name(self, name):
-        cleaned = re.sub(r"^第(\d+|[一二三四五六七八九十百千万]+)章[:：\s]*", "", name)
-        cleaned = re.sub(r"^正文[:：\s]*", "", cleaned)
-        cleaned = cleaned.strip()
-        if not cleaned:
-            cleaned = "未知章节"
-        return cleaned
-
-    def handle_duplicate_names(self, base_name, existing_names):
-        if base_name not in existing_names:
-            return base_name
-            
-        count = 1
-        pattern = re.compile(f"^{re.escape(base_name)}-(\\d+)$")
-        for name in existing_names:
-            match = pattern.match(name)
-            if match:
-                num = int(match.group(1))
-                if num >= count:
-                    count = num + 1
-                    
-        return f"{base_name}-{count}"
-
-    def save_chapter_files(self, chapters):
-        chapter_files = []
-        cleaned_names = []
-        for _, chapter_content in chapters:
-            raw_name = chapters[chapters.index((_, chapter_content))][0]
-            cleaned_name = self.clean_chapter_name(raw_name)
-            cleaned_name = self.handle_duplicate_names(cleaned_name, cleaned_names)
-            cleaned_names.append(cleaned_name)
-        
-        for i, (raw_name, chapter_content) in enumerate(chapters):
-            cleaned_name = cleaned_names[i]
-            chapter_filename = f"{cleaned_name}.txt"
-            chapter_path = os.path.join(self.project_folder, chapter_filename)
-            
-            with open(chapter_path, 'w', encoding='utf-8') as f:
-                f.write(chapter_content)
-                
-            chapter_files.append((cleaned_name, chapter_path))
-            self.log(f"保存章节: {cleaned_name}")
-        
-        return chapter_files
+            self.log(f"任务出错: {error}")
 
-    def create_config_ini(self, chapter_names):
-        config = configparser.ConfigParser()
-        config["ChapterOrder"] = {}
-        
-        for i, name in enumerate(chapter_names):
-            config["ChapterOrder"][str(i+1)] = name
-            
-        config_path = os.path.join(self.project_folder, "config.ini")
-        with open(config_path, 'w', encoding='utf-8') as f:
-            config.write(f)
-            
-        self.log(f"创建配置文件: {config_path}")
-        return config_path
-
-    def load_config_ini(self):
-        config_path = os.path.join(self.project_folder, "config.ini")
-        if not os.path.exists(config_path):
-            return []
-            
-        config = configparser.ConfigParser()
-        config.read(config_path, encoding='utf-8')
-        
-        if "ChapterOrder" not in config:
-            return []
-            
-        chapter_order = []
-        for key in sorted(config["ChapterOrder"], key=lambda k: int(k)):
-            chapter_order.append(config["ChapterOrder"][key])
-            
-        return chapter_order
-
-    def update_config_ini(self):
-        if not self.project_folder or not self.chapter_order:
-            return
-            
-        config_path = os.path.join(self.project_folder, "config.ini")
-        config = configparser.ConfigParser()
-        config["ChapterOrder"] = {}
-        
-        for i, name in enumerate(self.chapter_order):
-            config["ChapterOrder"][str(i+1)] = name
-            
-        with open(config_path, 'w', encoding='utf-8') as f:
-            config.write(f)
-            
-        self.log("配置文件已更新")
-
-    def load_chapter_contents(self):
-        contents = {}
-        for chapter_name in self.chapter_order:
-            chapter_path = os.path.join(self.project_folder, f"{chapter_name}.txt")
-            if os.path.exists(chapter_path):
-                with open(chapter_path, 'r', encoding='utf-8') as f:
-                    contents[chapter_name] = f.read()
-        return contents
+    def on_tasks_idle(self):
+        self.progress_bar.stop()
+        self.progress_bar.config(mode="determinate", value=0)
+        self.cancel_button.config(state=tk.DISABLED)
 
-    def refresh_chapter_list(self):
-        self.chapter_listbox.delete(0, tk.END)
-        for i, chapter_name in enumerate(self.chapter_order):
-            self.chapter_listbox.insert(tk.END, f"第{i+1}章：{chapter_name}")
-
-    # 历史记录相关（保持不变）
-    def read_history(self):
-        if not os.path.exists("data.ini"):
-            return {}
-        
-        config = configparser.ConfigParser()
-        config.read("data.ini", encoding="utf-8")
-        history = {}
-        
-        for section in config.sections():
-            history[section] = {
-                "path": config.get(section, "path"),
-                "code": config.get(section, "code")
-            }
-        
-        return history
-    
+    def cancel_tasks(self):
+        self.tasks.cancel_all()
+
+    # 历史记录相关
     def save_history(self, file_path, code):
-        self.save_project_code(file_path, code)
+        self.registry.save_project_code(file_path, code)
         self.update_history_dropdown()
-    
+
     def update_history_dropdown(self):
-        history = self.read_history()
+        history = self.registry.read_history()
         history_list = list(history.keys())
         self.history_dropdown["values"] = history_list
         if history_list:
             self.history_dropdown.current(0)
-            
+
     def select_history(self, event):
         selected_file = self.history_dropdown.get()
         if selected_file:
-            history = self.read_history()
+            history = self.registry.read_history()
             file_info = history.get(selected_file)
-            if file_info:
+            if file_info and self.ensure_idle():
                 self.open_file2(file_info["path"])
 
-    # 文件操作相关（保持不变）
-    def record_file_times(self, file_path):
-        try:
-            creation_time = os.path.getctime(file_path)
-            modification_time = os.path.getmtime(file_path)
-            return (
-                datetime.fromtimestamp(creation_time).strftime('%Y-%m-%d %H:%M:%S'),
-                datetime.fromtimestamp(modification_time).strftime('%Y-%m-%d %H:%M:%S')
-            )
-        except Exception as e:
-            self.log(f"无法获取文件时间: {e}")
-            return None, None
-
-    def restore_file_times(self, file_path, creation_time, modification_time):
-        try:
-            if creation_time and modification_time:
-                creation_timestamp = datetime.strptime(creation_time, '%Y-%m-%d %H:%M:%S').timestamp()
-                modification_timestamp = datetime.strptime(modification_time, '%Y-%m-%d %H:%M:%S').timestamp()
-                os.utime(file_path, (creation_timestamp, modification_timestamp))
-        except Exception as e:
-            pass
-
-    def convert_to_utf8(self, file_path):
-        with open(file_path, 'rb') as f:
-            raw_data = f.read()
-            result = chardet.detect(raw_data)
-            encoding = result['encoding']
-
-        if not encoding or encoding.lower() != 'utf-8':
-            filecreation_time, filemodification_time = self.record_file_times(file_path)
-            encodings = [encoding, 'utf-8', 'gbk', 'gb2312', 'big5']
-            text = None
-
-            for enc in encodings:
-                try:
-                    if enc:
-                        with open(file_path, 'r', encoding=enc, errors='ignore') as f:
-                            text = f.read()
-                        self.log(f"成功使用编码 {enc} 读取文件")
-                        break
-                except (UnicodeDecodeError, TypeError):
-                    self.log(f"使用编码 {enc} 读取文件失败")
-
-            if text is None:
-                self.log("所有编码尝试均失败，无法读取文件")
-                return False
-
-            temp_file = file_path + ".tmp"
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                f.write(text)
-            
-            os.remove(file_path)
-            shutil.move(temp_file, file_path)
-            
-            self.restore_file_times(file_path, filecreation_time, filemodification_time)
-            return True
-        return True
-
-    # 核心功能实现（保持不变）
+    # 文件操作相关
     def open_file(self):
+        if not self.ensure_idle():
+            return
         file_path = filedialog.askopenfilename(filetypes=[("Text Files", "*.txt")])
         if not file_path:
             return
-            
-        self.loaded_file = file_path
-        
-        if not self.convert_to_utf8(file_path):
-            return
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        code = self.read_project_code(file_path)
-        project_path = None
-        
-        if code:
-            project_path = self.get_project_by_code(code)
-            self.log(f"检测到项目编码: {code}")
-        
-        if project_path and os.path.exists(project_path):
-            self.project_folder = self.create_project_folder(file_path)
-            self.chapter_order = self.load_config_ini()
-            self.chapter_contents = self.load_chapter_contents()
+
+        def task(ctx):
+            project = engine.open_novel(file_path, self.registry, log=ctx.log, progress=ctx.progress)
+            if project is not None:
+                project.log = self.log
+                project.progress = engine._noop_progress
+            return project
+
+        def done(project):
+            if project is None:
+                return
+            self.loaded_file = file_path
+            self.set_project(project)
             self.refresh_chapter_list()
-            self.log(f"加载已有项目: {os.path.basename(file_path)}")
-            self.save_history(file_path, code)
-            return
-        
-        self.project_folder = self.create_project_folder(file_path)
-        
-        if len(content) >= 24 and re.match(r'^[0-9a-fA-F]{24}$', content[-24:]):
-            content = content[:-24]
-        
-        chapters = self.split_into_chapters(content)
-        if not chapters:
-            self.log("未检测到任何章节，可能格式不符合要求")
-            return
-            
-        chapter_files = self.save_chapter_files(chapters)
-        chapter_names = [name for name, _ in chapter_files]
-        
-        self.create_config_ini(chapter_names)
-        
-        self.chapter_order = chapter_names
-        self.chapter_contents = self.load_chapter_contents()
-        
-        self.refresh_chapter_list()
-        
-        new_code = self.generate_24bit_code()
-        self.save_project_code(file_path, new_code)
-        self.log(f"新项目创建完成，编码: {new_code}")
-        
-        self.save_history(file_path, new_code)
+            self.update_history_dropdown()
+
+        self.run_task("打开文件", task, on_done=done)
 
-    def open_file2(self, file_path):
-        if not os.path.exists(file_path):
-            self.log(f"文件不存在: {file_path}")
+    def open_file2(self, file_path, on_opened=None):
+        project = engine.open_cached(file_path, log=self.log)
+        if project is not None:
+            # 按清单立即显示章节列表，清单在后台校验，过期时重新加载
+            self.loaded_file = file_path
+            self.set_project(project)
+            self.refresh_chapter_list()
+
+            def validated(valid):
+                if not valid and self.project is project:
+                    self.refresh_chapter_list()
+                if on_opened:
+                    on_opened()
+
+            self.run_task("校验项目", self.project_task(project, lambda ctx: project.validate_manifest()),
+                          on_done=validated)
             return
-            
-        self.loaded_file = file_path
-        
-        code = self.read_project_code(file_path)
-        
-        self.project_folder = self.create_project_folder(file_path)
-        self.chapter_order = self.load_config_ini()
-        self.chapter_contents = self.load_chapter_contents()
-        self.refresh_chapter_list()
-        self.log(f"加载项目: {os.path.basename(file_path)}")
+
+        def task(ctx):
+            project = engine.open_existing(file_path, log=ctx.log)
+            if project is not None:
+                project.log = self.log
+            return project
+
+        def done(project):
+            if project is None:
+                return
+            self.loaded_file = file_path
+            self.set_project(project)
+            self.refresh_chapter_list()
+            if on_opened:
+                on_opened()
+
+        self.run_task("打开项目", task, on_done=done)
 
     def show_chapter_content(self, event):
         selection = self.chapter_listbox.curselection()
@@ -555,178 +823,239 @@ class NovelMergerApp:
             index = selection[0]
             if 0 <= index < len(self.chapter_order):
                 chapter_name = self.chapter_order[index]
-                self.content_text.delete(1.0, tk.END)
-                self.content_text.insert(tk.END, self.chapter_contents.get(chapter_name, ""))
+                if chapter_name == self.viewing and self.viewer.table is not None:
+                    return
+                if self.project.packed and self.tasks.busy:
+                    # 打包格式的后台写入事务占着存储的锁，这时在界面线程读取会卡住界面
+                    self.log("后台任务进行中，请稍候再查看章节")
+                    return
+                # 只映射章节文件并显示开头一页，章节再大也能立即显示
+                self.viewer.show(self.chapter_contents.open_source(chapter_name))
+                self.viewing = chapter_name
 
     def save_file(self):
-        if not self.loaded_file or not self.project_folder or not self.chapter_order:
+        if not self.loaded_file or not self.project or not self.chapter_order:
             self.log("没有加载文件或项目，无法保存!")
             return
-        
-        selection = self.chapter_listbox.curselection()
-        if selection:
-            index = selection[0]
-            if 0 <= index < len(self.chapter_order):
-                chapter_name = self.chapter_order[index]
-                content = self.content_text.get(1.0, tk.END).rstrip('\n')
-                self.chapter_contents[chapter_name] = content
-                
-                chapter_path = os.path.join(self.project_folder, f"{chapter_name}.txt")
-                with open(chapter_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                self.log(f"已更新章节内容: {chapter_name}")
-        
-        with open(self.loaded_file, 'w', encoding='utf-8') as f:
-            for i, chapter_name in enumerate(self.chapter_order):
-                chapter_title = f"第{i+1}章：{chapter_name}"
-                f.write(f"{chapter_title}\n")
-                f.write(f"{self.chapter_contents.get(chapter_name, '')}\n\n")
-            
-            code = self.generate_24bit_code()
-            f.write(code)
-        
-        self.save_project_code(self.loaded_file, code)
-        self.log(f"文件已保存，新编码: {code}")
+        if not self.ensure_idle():
+            return
+
+        # 编辑内容只能在界面线程读取；只有改过的章节才写回
+        edited = None
+        if self.viewing and self.viewer.modified:
+            edited = (self.viewing, self.viewer.get_content())
+            # 改为显示内存中的副本并关闭映射，章节文件才能被改写
+            self.viewer.show(TextSource(edited[1]), self.viewer.top_line())
+
+        project = self.project
+        project.loaded_file = self.loaded_file
+
+        def task(ctx):
+            if edited:
+                project.write_chapter(*edited)
+                ctx.log(f"已更新章节内容: {edited[0]}")
+            engine.save_novel(project, self.registry)
+
+        def failed(error):
+            self.on_task_error(error)
+            # 没有保存成功，编辑内容仍算作未保存
+            if edited and edited[0] == self.viewing and self.viewer.table is not None:
+                self.viewer.table.modified = True
+
+        def done(_):
+            self.update_history_dropdown()
+
+        self.run_task("保存", self.project_task(project, task), on_done=done, on_error=failed)
 
     def exit_app(self):
+        # 取消后台任务并等它们在 progress/check 处退出，之后写入章节顺序不会与任务冲突
+        self.tasks.cancel_all()
+        self.tasks.wait()
+        while self.tasks.poll():
+            pass
         if self.loaded_file:
             pass
             #self.save_file()
-        
+
+        if self.project:
+            self.project.flush_order()
+            stats = self.project.order_stats()
+            self.log(f"章节顺序: {stats['mutations']} 次修改，{stats['flushes']} 次写入")
+
+        self.set_project(None)
         self.loaded_file = None
-        self.project_folder = None
-        self.chapter_order = []
-        self.chapter_contents = {}
-        self.chapter_listbox.delete(0, tk.END)
-        self.content_text.delete(1.0, tk.END)
+        self.chapter_listbox.clear()
+        self.viewer.release()
+        self.viewing = None
 
         self.log("应用已退出")
 
-    # 章节操作（保持不变）
+    def on_close(self):
+        """关闭窗口：等后台任务响应取消，写入未保存的章节顺序后退出"""
+        self.tasks.shutdown(wait=True)
+        if self.project:
+            self.project.flush_order()
+            self.project.close()
+        self.root.destroy()
+
+    # 章节操作
     def add_chapter(self):
         """添加新章节（支持多选文件，每个文件先拆分再加入）"""
-        if not self.loaded_file or not self.project_folder:
+        if not self.loaded_file or not self.project:
             self.log("没有加载文件，无法添加章节!")
             return
-        
+
         # 允许选择多个文件
         file_paths = filedialog.askopenfilenames(filetypes=[("Text Files", "*.txt")])
         if not file_paths:
             return
-        
-        # 遍历每个选中的文件
-        for file_path in file_paths:
-            self.process_multiple_chapters(file_path)  # 处理单个文件的章节拆分
-
-    def process_multiple_chapters(self, file_path):
-        """处理单个文件：先拆分章节，再逐个添加（包含文件名前缀逻辑）"""
-        try:
-            # 获取文件名（不含扩展名）作为前缀
-            file_prefix = os.path.splitext(os.path.basename(file_path))[0]
-            
-            # 读取文件内容（自动处理编码）
-            with open(file_path, 'rb') as f:
-                raw_data = f.read()
-                encoding = chardet.detect(raw_data)['encoding']
-            
-            # 尝试解码（兼容多种编码）
-            try:
-                if encoding:
-                    content = raw_data.decode(encoding, errors='ignore')
-                else:
-                    content = raw_data.decode('utf-8', errors='ignore')
-            except UnicodeDecodeError:
-                self.log(f"无法解码文件 {os.path.basename(file_path)}，添加失败")
-                return
 
-            # 去除文件末尾可能存在的24位编码
-            if len(content) >= 24 and re.match(r'^[0-9a-fA-F]{24}$', content[-24:]):
-                content = content[:-24]
+        self.process_multiple_chapters(list(file_paths))
 
-            # 使用现有方法拆分章节
-            chapters = self.split_into_chapters(content)
-            if not chapters:
-                self.log(f"文件 {os.path.basename(file_path)} 中未检测到章节")
-                return
+    def process_multiple_chapters(self, file_paths):
+        """在后台批量处理文件：先拆分章节，再按选择顺序添加（包含文件名前缀逻辑）"""
+        if not self.ensure_idle():
+            return
+        project = self.project
+        include_filename = self.include_filename.get()
+        project.duplicate_policy = "skip" if self.skip_duplicates.get() else "flag"
+        found_before = len(project.duplicates)
+
+        def task(ctx):
+            # 多个文件在进程池中并行拆分，config.ini 和列表只在最后更新一次
+            results = project.add_files(file_paths, include_filename)
+            return sum(len(added) for added in results.values())
+
+        def report_duplicates():
+            found = project.duplicates[found_before:]
+            if found:
+                skipped = sum(1 for *_, skip in found if skip)
+                self.log(f"发现 {len(found)} 个重复或近似重复的章节，跳过 {skipped} 个", WARNING)
+
+        def done(added):
+            if added and project is self.project:
+                self.refresh_chapter_list()
+            report_duplicates()
 
-            self.log(f"文件 {os.path.basename(file_path)} 中检测到 {len(chapters)} 个章节，开始添加...")
-
-            # 逐个添加拆分后的章节
-            for raw_name, chapter_content in chapters:
-                # 清理章节名称
-                cleaned_name = self.clean_chapter_name(raw_name)
-                
-                # 如果勾选了包含文件名，则添加前缀
-                if self.include_filename.get():
-                    cleaned_name = f"{file_prefix}-{cleaned_name}"
-                
-                # 处理重复名称
-                final_name = self.handle_duplicate_names(cleaned_name, self.chapter_order)
-                
-                # 保存章节内容到项目文件夹
-                chapter_path = os.path.join(self.project_folder, f"{final_name}.txt")
-                with open(chapter_path, 'w', encoding='utf-8') as f:
-                    f.write(chapter_content)
-                
-                # 更新章节数据
-                self.chapter_order.append(final_name)
-                self.chapter_contents[final_name] = chapter_content
-                self.log(f"添加章节: {final_name}")
-
-            # 更新配置文件和列表显示
-            self.update_config_ini()
-            self.refresh_chapter_list()
-            self.log(f"文件 {os.path.basename(file_path)} 的章节添加完成")
+        def failed(error):
+            # 取消时已加入的章节仍然有效，同样刷新列表
+            self.on_task_error(error)
+            if project is self.project:
+                self.refresh_chapter_list()
+            report_duplicates()
 
-        except Exception as e:
-            self.log(f"处理文件 {os.path.basename(file_path)} 时出错: {str(e)}")
+        self.run_task("添加章节", self.project_task(project, task), on_done=done, on_error=failed)
 
     def delete_chapter(self):
-        if not self.project_folder:
+        if not self.project:
             self.log("没有加载项目，无法删除章节!")
             return
-            
+        if not self.ensure_idle():
+            return
+
         selection = self.chapter_listbox.curselection()
         if selection:
             index = selection[0]
             if 0 <= index < len(self.chapter_order):
-                chapter_name = self.chapter_order[index]
-                
-                chapter_path = os.path.join(self.project_folder, f"{chapter_name}.txt")
-                if os.path.exists(chapter_path):
-                    os.remove(chapter_path)
-                
-                del self.chapter_contents[chapter_name]
-                self.chapter_order.pop(index)
-                
-                self.update_config_ini()
+                # 先关闭内容区的映射，章节文件才能删除
+                self.viewer.release()
+                self.viewing = None
+                chapter_name = self.project.delete_chapter(index)
+
                 self.refresh_chapter_list()
-                self.content_text.delete(1.0, tk.END)
-                
+
                 self.log(f"章节 '{chapter_name}' 已删除")
         else:
             self.log("请选择一个章节进行删除")
 
+    # 全文搜索
+    def search(self):
+        query = self.search_entry.get().strip()
+        if not query:
+            return
+        if not self.project and not self.search_all.get():
+            self.log("没有加载项目，无法搜索!")
+            return
+        if not self.ensure_idle():
+            return
+        project = self.project
+        loaded_file = self.loaded_file
+        search_all = self.search_all.get()
+
+        def task(ctx):
+            hits = []
+            if project is not None:
+                # 首次搜索时建立索引，之后只在章节内容改过时重建改过的章节
+                project.update_search_index()
+            started = time.perf_counter()
+            if project is not None:
+                hits = [(loaded_file, name, positions) for name, positions in project.search(query)]
+            if search_all:
+                for novel_path, _, result in engine.search_projects(self.registry, query):
+                    if novel_path != loaded_file:
+                        hits.extend((novel_path, name, positions) for name, positions in result)
+            ctx.log(f"搜索 '{query}': {len(hits)} 章，{(time.perf_counter() - started) * 1000:.1f} ms")
+            return hits
+
+        def done(hits):
+            self.search_hits = hits[:SEARCH_RESULT_LIMIT]
+            self.search_listbox.delete(0, tk.END)
+            for novel_path, name, positions in self.search_hits:
+                prefix = "" if novel_path == self.loaded_file else f"{os.path.basename(novel_path)} / "
+                self.search_listbox.insert(tk.END, f"{prefix}{name}（{len(positions)} 处）")
+            if len(hits) > SEARCH_RESULT_LIMIT:
+                self.log(f"只显示前 {SEARCH_RESULT_LIMIT} 章的结果")
+            self.search_query = query
+
+        task_fn = self.project_task(project, task) if project is not None else task
+        self.run_task("搜索", task_fn, on_done=done)
+
+    def open_search_hit(self, event):
+        selection = self.search_listbox.curselection()
+        if not selection or selection[0] >= len(self.search_hits):
+            return
+        novel_path, name, positions = self.search_hits[selection[0]]
+        if novel_path == self.loaded_file and self.project:
+            self.show_search_hit(name, positions)
+        elif self.ensure_idle():
+            self.open_file2(novel_path, on_opened=lambda: self.show_search_hit(name, positions))
+
+    def show_search_hit(self, name, positions):
+        """在章节列表中选中命中的章节，内容区跳到第一处命中并标出"""
+        from novelcore.search import line_of
+
+        if name not in self.chapter_order:
+            self.log(f"章节 '{name}' 不在当前项目中")
+            return
+        index = self.chapter_order.index(name)
+        self.chapter_listbox.selection_set(index)
+        line, column = line_of(self.chapter_contents.get(name) or "", positions[0])
+        self.viewer.show(self.chapter_contents.open_source(name), line)
+        self.viewer.highlight(line, column, len(self.search_query))
+        self.viewing = name
+
     # 章节排序（修复拖动功能）
     def move_up(self):
+        if not self.ensure_idle():
+            return
         selection = self.chapter_listbox.curselection()
         if selection and len(selection) == 1:
             index = selection[0]
             if index > 0 and index < len(self.chapter_order):
-                self.chapter_order[index], self.chapter_order[index-1] = self.chapter_order[index-1], self.chapter_order[index]
-                self.update_config_ini()
-                self.refresh_chapter_list()
+                self.project.swap_chapters(index, index-1)
+                self.chapter_listbox.moved(index, index-1)
                 self.chapter_listbox.selection_set(index-1)
                 self.log(f"章节上移: {self.chapter_order[index-1]}")
 
     def move_down(self):
+        if not self.ensure_idle():
+            return
         selection = self.chapter_listbox.curselection()
         if selection and len(selection) == 1:
             index = selection[0]
             if index < len(self.chapter_order) - 1:
-                self.chapter_order[index], self.chapter_order[index+1] = self.chapter_order[index+1], self.chapter_order[index]
-                self.update_config_ini()
-                self.refresh_chapter_list()
+                self.project.swap_chapters(index, index+1)
+                self.chapter_listbox.moved(index, index+1)
                 self.chapter_listbox.selection_set(index+1)
                 self.log(f"章节下移: {self.chapter_order[index+1]}")
 
@@ -737,9 +1066,9 @@ class NovelMergerApp:
 
     def start_drag(self, event):
         # 关键修复：检查self.drag_enabled_var的状态
-        if not self.drag_enabled_var.get():
+        if not self.drag_enabled_var.get() or self.tasks.busy:
             return
-        
+
         # 获取点击位置的索引
         index = self.chapter_listbox.nearest(event.y)
         if 0 <= index < len(self.chapter_order):
@@ -750,22 +1079,26 @@ class NovelMergerApp:
         # 关键修复：检查self.drag_enabled_var的状态
         if not self.drag_enabled_var.get() or self.dragging_index == -1:
             return
-        
+
+        # 拖到列表上下边缘之外时自动滚动
+        if event.y < 0:
+            self.chapter_listbox.scroll(-1)
+        elif event.y > event.widget.winfo_height():
+            self.chapter_listbox.scroll(1)
+
         # 获取当前位置的索引
         current_index = self.chapter_listbox.nearest(event.y)
         if 0 <= current_index < len(self.chapter_order) and current_index != self.dragging_index:
-            # 移动章节
-            chapter = self.chapter_order.pop(self.dragging_index)
-            self.chapter_order.insert(current_index, chapter)
-            # 更新拖动索引
+            # 移动章节（松开鼠标时再写入配置）
+            self.project.move_chapter(self.dragging_index, current_index, persist=False)
+            # 只重绘两个位置之间的可见行，并保持选中
+            self.chapter_listbox.moved(self.dragging_index, current_index)
             self.dragging_index = current_index
-            # 刷新列表并保持选中
-            self.refresh_chapter_list()
             self.chapter_listbox.selection_set(current_index)
 
     def end_drag(self, event):
         if self.dragging_index != -1:
-            self.update_config_ini()
+            # 顺序由 poll_tasks 稍后统一写入
             self.log("章节顺序已更新")
             self.dragging_index = -1
 
@@ -775,61 +1108,70 @@ class NovelMergerApp:
         if not file_paths:
             return
 
+        accepted = []
         for file_path in file_paths:
             if file_path.startswith('{') and file_path.endswith('}'):
                 file_path = file_path[1:-1]
-            
-            if file_path.endswith(".txt") and self.project_folder:
-                self.process_multiple_chapters(file_path)  # 复用多章节处理逻辑
+
+            if file_path.endswith(".txt") and self.project:
+                accepted.append(file_path)
             else:
                 self.log(f"跳过非txt文件或未加载项目: {os.path.basename(file_path)}")
 
+        if accepted:
+            self.process_multiple_chapters(accepted)  # 复用多章节处理逻辑
+
     def add_chapter_from_file(self, file_path):
         """从拖放的文件添加章节"""
         try:
-            with open(file_path, 'rb') as f:
-                raw_data = f.read()
-                encoding = chardet.detect(raw_data)['encoding']
-            
-            try:
-                if encoding:
-                    content = raw_data.decode(encoding, errors='ignore')
-                else:
-                    content = raw_data.decode('utf-8', errors='ignore')
-            except UnicodeDecodeError:
-                self.log("无法解码文件，添加失败")
+            new_name = self.project.add_file_as_chapter(file_path, self.include_filename.get())
+            if new_name is None:
                 return
-            
-            base_name = os.path.splitext(os.path.basename(file_path))[0]
-            base_name = self.clean_chapter_name(base_name)
-            
-            # 如果勾选了包含文件名，则添加前缀
-            if self.include_filename.get():
-                base_name = f"{os.path.splitext(os.path.basename(file_path))[0]}-{base_name}"
-            
-            new_name = self.handle_duplicate_names(base_name, self.chapter_order)
-            
-            chapter_path = os.path.join(self.project_folder, f"{new_name}.txt")
-            with open(chapter_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
-            self.chapter_order.append(new_name)
-            self.chapter_contents[new_name] = content
-            self.update_config_ini()
             self.refresh_chapter_list()
-            
             self.log(f"从拖放添加章节: {new_name}")
         except Exception as e:
             self.log(f"添加章节失败: {str(e)}")
 
-    def log(self, message):
-        timestamp = datetime.now().strftime('%H:%M:%S')
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
+    def log(self, message, level=INFO):
+        """任意线程可调用：写入日志文件，并放入缓冲区等待 flush_log 批量显示"""
+        emit(message, level)
+        self.log_buffer.append(message, level)
+
+    def insert_log_entries(self, entries):
+        threshold = LEVEL_NAMES[self.log_level.get()]
+        chunks = []
+        for timestamp, level, message in entries:
+            if level >= threshold:
+                chunks.extend((f"[{timestamp}] {message}\n", logging_tag(level)))
+        if not chunks:
+            return
+        self.log_text.insert(tk.END, *chunks)
+        # 只保留最近 LOG_PANEL_LINES 行
+        lines = int(self.log_text.index("end-1c").split('.')[0])
+        if lines > LOG_PANEL_LINES:
+            self.log_text.delete(1.0, f"{lines - LOG_PANEL_LINES}.0")
         self.log_text.yview(tk.END)
 
+    def flush_log(self):
+        self.insert_log_entries(self.log_buffer.drain())
+        self.root.after(LOG_FLUSH_MS, self.flush_log)
+
+    def rerender_log(self):
+        """切换显示级别后按缓冲区重新显示"""
+        self.log_buffer.drain()
+        self.log_text.delete(1.0, tk.END)
+        self.insert_log_entries(self.log_buffer.snapshot())
+
 
 if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()  # 批量导入使用进程池，打包为 exe 时需要
     ttk.Checkbutton.var = property(lambda self: self._var, lambda self, v: setattr(self, '_var', v))
-    root = TkinterDnD.Tk()
-    app = NovelMergerApp(root)
+    startup = StartupTimer() if STARTUP_TIME_FLAG in sys.argv[1:] else None
+    if startup:
+        startup.checkpoint("imports")
+    root = tk.Tk()
+    app = NovelMergerApp(root, startup)
+    if startup:
+        startup.checkpoint("window")
     root.mainloop()
\ No newline at end of file